@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import io
 import os
 import json
 
@@ -26,6 +27,7 @@ from bridge.vars import JOB_ROLES
 from bridge.utils import KleverTestCase
 
 from users.models import User, PreferableView
+from jobs.configuration import KLEVER_CORE_DEF_MODES, GetConfiguration
 from jobs.models import Job, JobFile, FileSystem
 
 
@@ -634,3 +636,19 @@ class TestJobs(KleverTestCase):
         if os.path.exists(os.path.join(settings.MEDIA_ROOT, self.test_conf)):
             os.remove(os.path.join(settings.MEDIA_ROOT, self.test_conf))
         super().tearDown()
+
+
+class TestConfiguration(KleverTestCase):
+    def test_weaving_parallelism(self):
+        for mode in KLEVER_CORE_DEF_MODES:
+            configuration = GetConfiguration(conf_name=mode['id']).for_json()
+            self.assertGreater(configuration['parallelism']['Weaving'], 1)
+
+            # Weaving parallelism is kept when decisions are restarted with configurations from files
+            file_conf = io.BytesIO(json.dumps(configuration).encode('utf8'))
+            self.assertEqual(GetConfiguration(file_conf=file_conf).for_json(), configuration)
+
+            # Configurations without weaving parallelism result in sequential weaving
+            del configuration['parallelism']['Weaving']
+            file_conf = io.BytesIO(json.dumps(configuration).encode('utf8'))
+            self.assertEqual(GetConfiguration(file_conf=file_conf).for_json()['parallelism']['Weaving'], 1)
@@ -18,9 +18,11 @@
 import re
 import json
 from collections import OrderedDict
+from itertools import islice
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Count
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Case, CharField, Count, Prefetch, Q, Value, When
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
@@ -33,34 +35,37 @@ from reports.models import (
 )
 from marks.models import MarkUnsafeReport, MarkSafeReport, MarkUnknownReport
 
+# Number of comparison objects and links created by a single query
+COMPARISON_BATCH_SIZE = 10000
+
 
 class GetComparisonObjects:
     def __init__(self, decision, names):
         self._decision = decision
         self._names = names
 
-    def __fill_leaf_objects(self, data, leaf_type):
-        qs = ReportAttr.objects.filter(report__decision=self._decision, compare=True)\
-            .exclude(**{'report__report{}'.format(leaf_type): None})
-        for attr in qs:
-            if attr.report_id not in data:
-                data[attr.report_id] = {
-                    'type': leaf_type,
-                    'values': OrderedDict(list((attr_name, '-') for attr_name in self._names))
-                }
-            data[attr.report_id]['values'][attr.name] = attr.value
+    def __get_leaves(self):
+        # Values of compared attributes of each leaf are aggregated by the single query
+        leaf_type = Case(
+            When(report__reportsafe__isnull=False, then=Value('safe')),
+            When(report__reportunsafe__isnull=False, then=Value('unsafe')),
+            When(report__reportunknown__isnull=False, then=Value('unknown')),
+            output_field=CharField()
+        )
+        return ReportAttr.objects.filter(report__decision=self._decision, compare=True)\
+            .annotate(leaf_type=leaf_type).filter(leaf_type__isnull=False)\
+            .values('report_id', 'leaf_type')\
+            .annotate(names=ArrayAgg('name', ordering=('name', 'id')),
+                      values=ArrayAgg('value', ordering=('name', 'id')))\
+            .values_list('report_id', 'leaf_type', 'names', 'values')
 
     def get_leaf_values(self):
-        data = {}
-        self.__fill_leaf_objects(data, 'safe')
-        self.__fill_leaf_objects(data, 'unsafe')
-        self.__fill_leaf_objects(data, 'unknown')
-
         attr_data = {}
-        for r_id in data:
-            values_tuple = tuple(data[r_id]['values'].values())
+        for r_id, leaf_type, names, values in self.__get_leaves().iterator():
+            report_values = dict(zip(names, values))
+            values_tuple = tuple(report_values.get(attr_name, '-') for attr_name in self._names)
             attr_data.setdefault(values_tuple, [])
-            attr_data[values_tuple].append({'id': r_id, 'type': data[r_id]['type']})
+            attr_data[values_tuple].append({'id': r_id, 'type': leaf_type})
         return attr_data
 
 
@@ -75,9 +80,9 @@ class FillComparisonCache:
 
     def __get_attr_names(self):
         names1 = set(ReportAttr.objects.filter(report__decision=self._decision1, compare=True)
-                     .values_list('name', flat=True))
+                     .values_list('name', flat=True).distinct())
         names2 = set(ReportAttr.objects.filter(report__decision=self._decision2, compare=True)
-                     .values_list('name', flat=True))
+                     .values_list('name', flat=True).distinct())
         if names1 != names2:
             raise BridgeException(_("Jobs with different sets of attributes to compare can't be compared"))
         return list(sorted(names1))
@@ -89,51 +94,39 @@ class FillComparisonCache:
 
     def __fill_data(self):
         ct_map = {
-            'safe': ContentType.objects.get_for_model(ReportSafe),
-            'unsafe': ContentType.objects.get_for_model(ReportUnsafe),
-            'unknown': ContentType.objects.get_for_model(ReportUnknown),
+            'safe': ContentType.objects.get_for_model(ReportSafe).id,
+            'unsafe': ContentType.objects.get_for_model(ReportUnsafe).id,
+            'unknown': ContentType.objects.get_for_model(ReportUnknown).id,
         }
-        data1 = GetComparisonObjects(self._decision1, self._names).get_leaf_values()
-        data2 = GetComparisonObjects(self._decision2, self._names).get_leaf_values()
 
         # Calculate total verdicts for each batch of attributes values
         verdicts_data = {}
-        for values_tuple in data1:
-            verdicts_data[values_tuple] = {
-                'verdict1': self.__calc_verdict(data1[values_tuple]),
-                'verdict2': COMPARE_VERDICT[4][0]
-            }
-        for values_tuple in data2:
-            verdict2 = self.__calc_verdict(data2[values_tuple])
-            if values_tuple in verdicts_data:
-                verdicts_data[values_tuple]['verdict2'] = verdict2
-            else:
-                verdicts_data[values_tuple] = {'verdict1': COMPARE_VERDICT[4][0], 'verdict2': verdict2}
+        for verdict_name, decision in (('verdict1', self._decision1), ('verdict2', self._decision2)):
+            leaf_values = GetComparisonObjects(decision, self._names).get_leaf_values()
+            for values_tuple in leaf_values:
+                verdicts_data.setdefault(values_tuple, {
+                    'verdict1': COMPARE_VERDICT[4][0], 'verdict2': COMPARE_VERDICT[4][0], 'reports': []
+                })
+                verdicts_data[values_tuple][verdict_name] = self.__calc_verdict(leaf_values[values_tuple])
+                verdicts_data[values_tuple]['reports'].extend(
+                    (report['id'], ct_map[report['type']]) for report in leaf_values[values_tuple]
+                )
 
         # Create new comparison objects
         res = ComparisonObject.objects.bulk_create(list(ComparisonObject(
             info=self._info, values=list(values_tuple),
             verdict1=verdicts_data[values_tuple]['verdict1'],
             verdict2=verdicts_data[values_tuple]['verdict2']
-        ) for values_tuple in sorted(verdicts_data)))
-        for new_obj in res:
-            verdicts_data[tuple(new_obj.values)]['pk'] = new_obj.pk
-
-        # Create new comparison links
-        new_links = []
-        for values_tuple in data1:
-            for report in data1[values_tuple]:
-                new_links.append(ComparisonLink(
-                    object_id=report['id'], content_type=ct_map[report['type']],
-                    comparison_id=verdicts_data[values_tuple]['pk']
-                ))
-        for values_tuple in data2:
-            for report in data2[values_tuple]:
-                new_links.append(ComparisonLink(
-                    object_id=report['id'], content_type=ct_map[report['type']],
-                    comparison_id=verdicts_data[values_tuple]['pk']
-                ))
-        ComparisonLink.objects.bulk_create(new_links)
+        ) for values_tuple in sorted(verdicts_data)), batch_size=COMPARISON_BATCH_SIZE)
+
+        # Create new comparison links by chunks to avoid keeping all of them in memory
+        links = (ComparisonLink(object_id=r_id, content_type_id=ct_id, comparison_id=new_obj.pk)
+                 for new_obj in res for r_id, ct_id in verdicts_data[tuple(new_obj.values)]['reports'])
+        while True:
+            batch = list(islice(links, COMPARISON_BATCH_SIZE))
+            if not batch:
+                break
+            ComparisonLink.objects.bulk_create(batch)
 
     def __calc_verdict(self, reports):
         if len(reports) == 1:
@@ -255,15 +248,71 @@ class ComparisonData:
         self.pages['forward'] = (self.pages['page'] < self.pages['total'])
         return queryset[self.pages['page'] - 1]
 
+    def __get_leaves(self):
+        # Get all leaves of the comparison object with their attributes and associated marks by several queries
+        ids_by_type = {}
+        for ct_id, object_id in ComparisonLink.objects.filter(comparison=self.comparison)\
+                .values_list('content_type_id', 'object_id'):
+            ids_by_type.setdefault(ct_id, []).append(object_id)
+
+        attrs_prefetch = Prefetch('attrs', queryset=ReportAttr.objects.order_by('name'))
+        leaves_querysets = {
+            ReportSafe: ReportSafe.objects.select_related('cache').prefetch_related(
+                attrs_prefetch, Prefetch(
+                    'markreport_set', to_attr='associated_marks',
+                    queryset=MarkSafeReport.objects.filter(associated=True).select_related('mark').order_by('id')
+                )
+            ),
+            ReportUnsafe: ReportUnsafe.objects.select_related('cache').prefetch_related(
+                attrs_prefetch, Prefetch(
+                    'markreport_set', to_attr='associated_marks',
+                    queryset=MarkUnsafeReport.objects.filter(associated=True).select_related('mark').order_by('id')
+                )
+            ),
+            ReportUnknown: ReportUnknown.objects.prefetch_related(
+                attrs_prefetch, Prefetch(
+                    'markreport_set', to_attr='associated_marks',
+                    queryset=MarkUnknownReport.objects.filter(associated=True).order_by('id')
+                )
+            )
+        }
+
+        leaves = []
+        for model, queryset in leaves_querysets.items():
+            ids = ids_by_type.get(ContentType.objects.get_for_model(model).id)
+            if ids:
+                leaves.extend(queryset.filter(id__in=ids))
+        return sorted(leaves, key=lambda r: r.pk)
+
+    def __get_ancestors(self, leaves):
+        # Get components of all branches by a single MPTT range query
+        if not leaves:
+            return {}
+        branches_filter = Q()
+        for report in leaves:
+            branches_filter |= Q(tree_id=report.tree_id, lft__lt=report.lft, rght__gt=report.rght)
+        components = list(
+            ReportComponent.objects.filter(branches_filter).prefetch_related(
+                Prefetch('attrs', queryset=ReportAttr.objects.order_by('name'))
+            ).order_by('id')
+        )
+
+        ancestors = {}
+        for report in leaves:
+            ancestors[report.pk] = list(
+                comp for comp in components
+                if comp.tree_id == report.tree_id and comp.lft < report.lft and comp.rght > report.rght
+            )
+        return ancestors
+
     def __get_trees(self):
         tree1 = ComparisonTree()
         tree2 = ComparisonTree()
-        for link in ComparisonLink.objects.filter(comparison=self.comparison).order_by('object_id'):
-            report = link.content_object
-            if report.decision_id == self.info.decision1_id:
-                tree1.update_tree(report, self.hide_components)
-            else:
-                tree2.update_tree(report, self.hide_components)
+        leaves = self.__get_leaves()
+        ancestors = {} if self.hide_components else self.__get_ancestors(leaves)
+        for report in leaves:
+            tree = tree1 if report.decision_id == self.info.decision1_id else tree2
+            tree.update_tree(report, ancestors.get(report.pk, []))
 
         blocks1 = tree1.blocks
         blocks2 = tree2.blocks
@@ -316,13 +365,15 @@ class CompareBlock:
         child.parent = self
 
     def get_attrs(self, report):
-        attrs_list = list(ReportAttr.objects.filter(report=report).order_by('name').values('name', 'value', 'compare'))
-        for attr in attrs_list:
-            attr['type'] = 'compared' if attr['compare'] else 'normal'
-        return attrs_list
+        # Attributes are prefetched ordered by name
+        return list({
+            'name': attr.name, 'value': attr.value, 'compare': attr.compare,
+            'type': 'compared' if attr.compare else 'normal'
+        } for attr in report.attrs.all())
 
     def get_tags(self, mark):
-        return list(mark.versions.order_by('-version').first().tags.values_list('tag__name', flat=True))
+        # Cached tags of the last mark version
+        return list(mark.cache_tags)
 
     @property
     def ascendants(self):
@@ -424,10 +475,9 @@ class ComparisonTree:
         self._blocks = {}
         self._leaves = []
 
-    def __get_reports_branch(self, report):
+    def __get_reports_branch(self, ancestors):
         curr_parent = None
-        parents_ids = list(r.pk for r in report.get_ancestors())
-        for report in ReportComponent.objects.filter(id__in=parents_ids).order_by('id'):
+        for report in ancestors:
             if report.pk not in self._blocks:
                 self._blocks[report.pk] = ComponentBlock(report)
                 if curr_parent:
@@ -435,25 +485,20 @@ class ComparisonTree:
             curr_parent = self._blocks[report.pk]
         return curr_parent
 
-    def update_tree(self, report, hide_components):
-        # Get parents branch if components are shown
-        parent = None
-        if not hide_components:
-            parent = self.__get_reports_branch(report)
+    def update_tree(self, report, ancestors):
+        # Get parents branch if components are shown (ancestors are ordered by id)
+        parent = self.__get_reports_branch(ancestors)
 
-        # Create new leaf block with marks children
+        # Create new leaf block with marks children (associated marks are prefetched)
         if isinstance(report, ReportSafe):
             new_block = SafeBlock(report)
-            mr_qs = MarkSafeReport.objects.filter(report=report, associated=True).select_related('mark')
-            children = list(SafeMarkBlock(mr) for mr in mr_qs)
+            children = list(SafeMarkBlock(mr) for mr in report.associated_marks)
         elif isinstance(report, ReportUnsafe):
             new_block = UnsafeBlock(report)
-            mr_qs = MarkUnsafeReport.objects.filter(report=report, associated=True).select_related('mark')
-            children = list(UnsafeMarkBlock(mr) for mr in mr_qs)
+            children = list(UnsafeMarkBlock(mr) for mr in report.associated_marks)
         else:
             new_block = UnknownBlock(report)
-            mr_qs = MarkUnknownReport.objects.filter(report=report, associated=True)
-            children = list(UnknownMarkBlock(mr) for mr in mr_qs)
+            children = list(UnknownMarkBlock(mr) for mr in report.associated_marks)
 
         # Link new block with parent and children
         if parent:
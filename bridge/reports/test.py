@@ -18,21 +18,36 @@
 import os
 import re
 import json
+from collections import OrderedDict
 from multiprocessing import Process, Pipe
 import random
 import requests
 import time
 from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.db.models import Q
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.timezone import now
 
-from bridge.vars import SCHEDULER_TYPE, JOB_ROLES
+from bridge.vars import SCHEDULER_TYPE, JOB_ROLES, PRESET_JOB_TYPE, PRIORITY, COMPARE_VERDICT, MARK_SAFE
 from bridge.utils import KleverTestCase, logger, RMQConnect
 
+from users.models import User
+from jobs.models import PresetJob, Job, JobFile, Decision, Scheduler
+from reports.models import (
+    Computer, ReportAttr, ReportComponent, ReportSafe, ReportUnsafe, ReportUnknown,
+    CompareDecisionsInfo, ComparisonObject, ComparisonLink
+)
+from marks.models import MarkSafe, MarkSafeReport
+from caches.models import ReportSafeCache, ReportUnsafeCache
+from reports.comparison import FillComparisonCache, ComparisonData
+
 
 LINUX_ATTR = {'name': 'Linux kernel', 'value': [
     {'name': 'Version', 'value': '3.5.0'},
@@ -1042,6 +1057,186 @@ class TestReports(KleverTestCase):
         super().tearDown()
 
 
+def random_leaves(rnd, number):
+    leaves = []
+    for _ in range(number):
+        attrs = [('Program fragment', 'drivers/module{}.ko'.format(rnd.randrange(5)), True),
+                 ('Verifier', 'CPAchecker', False)]
+        # Some leaves do not have all compared attributes
+        if rnd.random() < 0.9:
+            attrs.append(('Requirement', rnd.choice(('linux:mutex', 'linux:spinlock')), True))
+        leaves.append((rnd.choice(('safe', 'unsafe', 'unsafe', 'unknown')), attrs))
+
+    # Leaves without compared attributes are not compared at all
+    leaves.append(('safe', [('Verifier', 'CPAchecker', False)]))
+    return leaves
+
+
+def get_comparison_cache(decision1, decision2, names):
+    # Reference implementation that gets all compared attributes of leaves and calculates verdicts in Python
+    def get_leaf_values(decision):
+        data = {}
+        for leaf_type in ('safe', 'unsafe', 'unknown'):
+            qs = ReportAttr.objects.filter(report__decision=decision, compare=True)\
+                .exclude(**{'report__report{}'.format(leaf_type): None})
+            for attr in qs:
+                if attr.report_id not in data:
+                    data[attr.report_id] = {
+                        'type': leaf_type,
+                        'values': OrderedDict(list((attr_name, '-') for attr_name in names))
+                    }
+                data[attr.report_id]['values'][attr.name] = attr.value
+
+        attr_data = {}
+        for r_id in data:
+            attr_data.setdefault(tuple(data[r_id]['values'].values()), []).append((r_id, data[r_id]['type']))
+        return attr_data
+
+    def calc_verdict(reports):
+        if len(reports) == 1:
+            if reports[0][1] == 'safe':
+                return COMPARE_VERDICT[0][0]
+            elif reports[0][1] == 'unknown':
+                return COMPARE_VERDICT[3][0]
+            return COMPARE_VERDICT[1][0]
+        has_unknown = False
+        for _, leaf_type in reports:
+            if leaf_type == 'safe':
+                return COMPARE_VERDICT[5][0]
+            elif leaf_type == 'unknown':
+                if has_unknown:
+                    return COMPARE_VERDICT[5][0]
+                has_unknown = True
+        return COMPARE_VERDICT[2][0] if has_unknown else COMPARE_VERDICT[1][0]
+
+    data1 = get_leaf_values(decision1)
+    data2 = get_leaf_values(decision2)
+    objects = []
+    links = []
+    for values_tuple in set(data1) | set(data2):
+        objects.append((
+            list(values_tuple),
+            calc_verdict(data1[values_tuple]) if values_tuple in data1 else COMPARE_VERDICT[4][0],
+            calc_verdict(data2[values_tuple]) if values_tuple in data2 else COMPARE_VERDICT[4][0]
+        ))
+        for r_id, _ in data1.get(values_tuple, []) + data2.get(values_tuple, []):
+            links.append((r_id, list(values_tuple)))
+    return sorted(objects), sorted(links)
+
+
+class TestComparison(KleverTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_superuser('superuser', '', 'top_secret')
+        self.scheduler = Scheduler.objects.create(type=SCHEDULER_TYPE[0][0])
+        self.configuration = JobFile.objects.create(hash_sum='0' * 64, file='Job/configuration.json')
+        preset = PresetJob.objects.create(name='Preset job', type=PRESET_JOB_TYPE[1][0], check_date=now())
+        self.job = Job.objects.create(preset=preset, name='Job', author=self.user)
+        self.computer = Computer.objects.create(identifier='computer', display='computer', data=[])
+
+    def create_decision(self, leaves):
+        decision = Decision.objects.create(
+            job=self.job, scheduler=self.scheduler, priority=PRIORITY[2][0], configuration=self.configuration
+        )
+        core = ReportComponent.objects.create(
+            decision=decision, identifier='/', component='Core', computer=self.computer
+        )
+        # Compared attributes of components are not compared
+        ReportAttr.objects.create(report=core, name='Requirement', value='all', compare=True)
+
+        for i, (leaf_type, attrs) in enumerate(leaves):
+            parent = ReportComponent.objects.create(
+                decision=decision, parent=core, identifier='/{}'.format(i), component='VRP',
+                computer=self.computer, verification=True
+            )
+            identifier = '/{}/{}'.format(i, leaf_type)
+            if leaf_type == 'safe':
+                leaf = ReportSafe.objects.create(decision=decision, parent=parent, identifier=identifier)
+            elif leaf_type == 'unsafe':
+                leaf = ReportUnsafe.objects.create(decision=decision, parent=parent, identifier=identifier)
+            else:
+                leaf = ReportUnknown.objects.create(
+                    decision=decision, parent=parent, identifier=identifier, component='CPAchecker'
+                )
+            ReportAttr.objects.bulk_create(list(
+                ReportAttr(report=leaf, name=name, value=value, compare=compare) for name, value, compare in attrs
+            ))
+        return decision
+
+    def test_comparison_cache(self):
+        rnd = random.Random(0)
+        decision1 = self.create_decision(random_leaves(rnd, 40))
+        decision2 = self.create_decision(random_leaves(rnd, 40))
+        names = ['Program fragment', 'Requirement']
+
+        # Comparison is the same as one calculated by the reference implementation in both directions and does not
+        # depend on the size of batches
+        for d1, d2, batch_size in ((decision1, decision2, 10000), (decision2, decision1, 3)):
+            objects, links = get_comparison_cache(d1, d2, names)
+            with mock.patch('reports.comparison.COMPARISON_BATCH_SIZE', batch_size):
+                FillComparisonCache(self.user, d1, d2)
+
+            info = CompareDecisionsInfo.objects.get(user=self.user, decision1=d1, decision2=d2)
+            self.assertEqual(info.names, names)
+            self.assertEqual(sorted(
+                ComparisonObject.objects.filter(info=info).values_list('values', 'verdict1', 'verdict2')
+            ), objects)
+            self.assertEqual(sorted(
+                ComparisonLink.objects.filter(comparison__info=info).values_list('object_id', 'comparison__values')
+            ), links)
+
+    def test_comparison_tree(self):
+        leaves = []
+        for fragment, number in (('drivers/small.ko', 3), ('drivers/large.ko', 30)):
+            attrs = [('Program fragment', fragment, True), ('Requirement', 'linux:mutex', True),
+                     ('Verifier', 'CPAchecker', False)]
+            leaves.extend((('safe', 'unsafe', 'unknown')[i % 3], attrs) for i in range(number))
+        decision1 = self.create_decision(leaves)
+        decision2 = self.create_decision(leaves)
+        for decision in (decision1, decision2):
+            ReportSafeCache.objects.bulk_create(list(
+                ReportSafeCache(decision=decision, report=report)
+                for report in ReportSafe.objects.filter(decision=decision)
+            ))
+            ReportUnsafeCache.objects.bulk_create(list(
+                ReportUnsafeCache(decision=decision, report=report)
+                for report in ReportUnsafe.objects.filter(decision=decision)
+            ))
+        mark = MarkSafe.objects.create(verdict=MARK_SAFE[1][0], cache_tags=['tag1', 'tag2'])
+        MarkSafeReport.objects.bulk_create(list(
+            MarkSafeReport(mark=mark, report=report) for report in ReportSafe.objects.all()
+        ))
+        FillComparisonCache(self.user, decision1, decision2)
+        info = CompareDecisionsInfo.objects.get(user=self.user, decision1=decision1, decision2=decision2)
+
+        def get_comparison_data(fragment, hide_components=0):
+            return ComparisonData(info, 1, 0, hide_components, attrs=json.dumps([fragment, 'linux:mutex']))
+
+        # The number of queries does not depend on the number of compared reports
+        get_comparison_data('drivers/small.ko')
+        with CaptureQueriesContext(connection) as small_queries:
+            get_comparison_data('drivers/small.ko')
+        with CaptureQueriesContext(connection) as large_queries:
+            data = get_comparison_data('drivers/large.ko')
+        self.assertEqual(len(small_queries), len(large_queries))
+
+        for tree in (data.tree1, data.tree2):
+            blocks = tree.blocks
+            self.assertEqual(sum(block.type == 'component' for block in blocks), 31)
+            self.assertEqual(sum(block.type in {'safe', 'unsafe', 'unknown'} for block in blocks), 30)
+            self.assertEqual(list(block.tags for block in blocks if block.type == 'mark'), [['tag1', 'tag2']] * 10)
+            core = list(tree.levels())[0]
+            self.assertEqual(list(block.title for block in core), ['Core'])
+            self.assertEqual(len(core[0].children), 30)
+            for block in blocks:
+                if block.type != 'mark':
+                    self.assertEqual(block.attrs, sorted(block.attrs, key=lambda attr: attr['name']))
+
+        # Leaves are roots of trees without components
+        data = get_comparison_data('drivers/large.ko', hide_components=1)
+        self.assertEqual(list(block.type for block in list(data.tree1.levels())[0]), ['safe', 'unsafe', 'unknown'] * 10)
+
+
 class ResponseError(Exception):
     pass
 
@@ -38,7 +38,10 @@ from service.serializers import (
     TaskSerializer, SolutionSerializer, SchedulerUserSerializer, DecisionSerializer,
     UpdateToolsSerializer, SchedulerSerializer, NodeConfSerializer
 )
-from service.utils import FinishDecision, TaskArchiveGenerator, SolutionArchiveGenerator, ReadDecisionConfiguration
+from service.utils import (
+    FinishDecision, TaskArchiveGenerator, TaskMembersArchiveGenerator, SolutionArchiveGenerator,
+    ReadDecisionConfiguration, UpdateTasksStatuses, get_task_manifest
+)
 
 
 class TaskAPIViewset(LoggedCallMixin, ModelViewSet):
@@ -75,16 +78,46 @@ class TaskAPIViewset(LoggedCallMixin, ModelViewSet):
         instance.delete()
 
 
+class TasksStatusesAPIView(LoggedCallMixin, APIView):
+    unparallel = [Decision]
+    permission_classes = (ServicePermission,)
+
+    def post(self, request):
+        res = UpdateTasksStatuses(request.data)
+        return Response({'errors': res.errors})
+
+
+def get_downloadable_task(pk):
+    task = get_object_or_404(Task, pk=pk)
+    if Decision.objects.only('status').get(id=task.decision_id).status != DECISION_STATUS[2][0]:
+        raise exceptions.APIException('The decision is not processing')
+    if task.status not in {TASK_STATUS[0][0], TASK_STATUS[1][0]}:
+        raise exceptions.APIException('The task status is {}'.format(task.status))
+    return task
+
+
 class DownloadTaskArchiveView(StreamingResponseAPIView):
     permission_classes = (ServicePermission,)
 
     def get_generator(self):
-        task = get_object_or_404(Task, pk=self.kwargs['pk'])
-        if Decision.objects.only('status').get(id=task.decision_id).status != DECISION_STATUS[2][0]:
-            raise exceptions.APIException('The decision is not processing')
-        if task.status not in {TASK_STATUS[0][0], TASK_STATUS[1][0]}:
-            raise exceptions.APIException('The task status is {}'.format(task.status))
-        return TaskArchiveGenerator(task)
+        return TaskArchiveGenerator(get_downloadable_task(self.kwargs['pk']))
+
+
+class DownloadTaskMembersView(StreamingResponseAPIView):
+    permission_classes = (ServicePermission,)
+    http_method = 'post'
+
+    def get_generator(self):
+        task = get_downloadable_task(self.kwargs['pk'])
+        members = self.request.data.get('members') if isinstance(self.request.data, dict) else None
+        return TaskMembersArchiveGenerator(task, members)
+
+
+class TaskManifestAPIView(APIView):
+    permission_classes = (ServicePermission,)
+
+    def get(self, request, pk):
+        return Response({'members': get_task_manifest(get_downloadable_task(pk))})
 
 
 class SolutionCreateView(LoggedCallMixin, CreateAPIView):
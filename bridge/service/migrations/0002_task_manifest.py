@@ -0,0 +1,10 @@
+from django.contrib.postgres.fields import jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [('service', '0001_initial')]
+
+    operations = [
+        migrations.AddField(model_name='task', name='manifest', field=jsonb.JSONField(null=True)),
+    ]
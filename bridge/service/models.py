@@ -77,6 +77,8 @@ class Task(WithFilesMixin, models.Model):
     filename = models.CharField(max_length=256)
     archive = models.FileField(upload_to=SERVICE_DIR)
     description = JSONField()
+    # Names, SHA256 and sizes of archive members, see get_archive_manifest()
+    manifest = JSONField(null=True)
 
     class Meta:
         db_table = 'task'
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import hashlib
 import pika
 import zipfile
 
@@ -38,12 +39,33 @@ from jobs.serializers import decision_status_changed
 
 
 def on_task_change(task_id, task_status, scheduler_type):
+    on_tasks_change([(task_id, task_status, scheduler_type)])
+
+
+def on_tasks_change(changes):
     with RMQConnect() as channel:
-        channel.basic_publish(
-            exchange='', routing_key=settings.RABBIT_MQ_QUEUE,
-            properties=pika.BasicProperties(delivery_mode=2),
-            body="task {} {} {}".format(task_id, task_status, scheduler_type)
-        )
+        for task_id, task_status, scheduler_type in changes:
+            channel.basic_publish(
+                exchange='', routing_key=settings.RABBIT_MQ_QUEUE,
+                properties=pika.BasicProperties(delivery_mode=2),
+                body="task {} {} {}".format(task_id, task_status, scheduler_type)
+            )
+
+
+def get_archive_manifest(archive):
+    # Clients of schedulers download only files which they have not cached yet
+    members = []
+    with zipfile.ZipFile(archive) as zfp:
+        for info in zfp.infolist():
+            if info.is_dir():
+                members.append({'name': info.filename, 'sha256': None, 'size': 0})
+                continue
+            sha256 = hashlib.sha256()
+            with zfp.open(info) as member_fp:
+                for chunk in iter(lambda: member_fp.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+            members.append({'name': info.filename, 'sha256': sha256.hexdigest(), 'size': info.file_size})
+    return members
 
 
 class VerificationToolSerializer(serializers.ModelSerializer):
@@ -160,7 +182,7 @@ class TaskSerializer(DynamicFieldsModelSerializer):
                 raise exceptions.ValidationError({'priority': 'Task priority is too big'})
         return attrs
 
-    def update_decision(self, decision, new_status, old_status=None):
+    def update_decision(self, decision, new_status, old_status=None, save=True):
         status_map = {
             TASK_STATUS[0][0]: 'tasks_pending',
             TASK_STATUS[1][0]: 'tasks_processing',
@@ -186,11 +208,14 @@ class TaskSerializer(DynamicFieldsModelSerializer):
         incr_field = status_map[new_status]
         new_num = getattr(decision, incr_field)
         setattr(decision, incr_field, new_num + 1)
-        decision.save()
+        if save:
+            decision.save()
 
     def create(self, validated_data):
         validated_data['filename'] = validated_data['archive'].name[:256]
         validated_data['decision'] = validated_data.pop('job')
+        # Calculate the manifest once rather than on each download of the task
+        validated_data['manifest'] = get_archive_manifest(validated_data['archive'])
         instance = super().create(validated_data)
         self.update_decision(instance.decision, instance.status)
         on_task_change(instance.id, instance.status, instance.decision.scheduler.type)
@@ -206,8 +231,12 @@ class TaskSerializer(DynamicFieldsModelSerializer):
 
         old_status = instance.status
         instance = super().update(instance, validated_data)
-        self.update_decision(instance.decision, instance.status, old_status=old_status)
-        on_task_change(instance.id, instance.status, instance.decision.scheduler.type)
+        if self.context.get('bulk'):
+            # Decisions are saved and notifications are sent once for all changed tasks
+            self.update_decision(instance.decision, instance.status, old_status=old_status, save=False)
+        else:
+            self.update_decision(instance.decision, instance.status, old_status=old_status)
+            on_task_change(instance.id, instance.status, instance.decision.scheduler.type)
         return instance
 
     def to_representation(self, instance):
@@ -217,7 +246,7 @@ class TaskSerializer(DynamicFieldsModelSerializer):
 
     class Meta:
         model = Task
-        exclude = ('decision', 'filename')
+        exclude = ('decision', 'filename', 'manifest')
         extra_kwargs = {'archive': {'write_only': True}}
 
 
@@ -17,19 +17,27 @@
 
 import os
 import json
+import hashlib
+import zipfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
 from django.test import Client
 from django.urls import reverse
+from django.utils.timezone import now
 
-from bridge.vars import SCHEDULER_TYPE, SCHEDULER_STATUS, PRIORITY, NODE_STATUS
+from bridge.vars import (
+    SCHEDULER_TYPE, SCHEDULER_STATUS, PRIORITY, NODE_STATUS, PRESET_JOB_TYPE, DECISION_STATUS, TASK_STATUS, USER_ROLES
+)
 from bridge.utils import KleverTestCase
 
 from users.models import User, SchedulerUser
-from jobs.models import Job, Scheduler
+from jobs.models import PresetJob, Job, JobFile, Decision, Scheduler
 from service.models import Task, Solution, VerificationTool, Node, NodesConfiguration, Workload
+from service.utils import UpdateTasksStatuses
 
 from reports.test import COMPUTER
 
@@ -903,3 +911,152 @@ class TestService(KleverTestCase):
             SchedulerUser.objects.get(user__username='manager', login='sch_user', password='sch_passwd')
         except ObjectDoesNotExist:
             self.fail()
+
+
+def create_processing_decisions(number):
+    user = User.objects.create_superuser('superuser', '', 'top_secret')
+    scheduler = Scheduler.objects.create(type=SCHEDULER_TYPE[0][0])
+    configuration = JobFile.objects.create(hash_sum='0' * 64, file='Job/configuration.json')
+    preset = PresetJob.objects.create(name='Preset job', type=PRESET_JOB_TYPE[1][0], check_date=now())
+    job = Job.objects.create(preset=preset, name='Job', author=user)
+    return list(Decision.objects.create(
+        job=job, scheduler=scheduler, priority=PRIORITY[2][0], configuration=configuration,
+        status=DECISION_STATUS[2][0]
+    ) for _ in range(number))
+
+
+class TestTasksStatuses(KleverTestCase):
+    def setUp(self):
+        super().setUp()
+        self.decisions = create_processing_decisions(2)
+        self.scheduler = self.decisions[0].scheduler
+
+    def create_task(self, decision, status):
+        task = Task.objects.create(
+            decision=decision, status=status, filename='task.zip', archive='Service/task.zip',
+            description={'priority': PRIORITY[2][0]}
+        )
+        field = 'tasks_{}'.format(status.lower())
+        Decision.objects.filter(id=decision.id).update(**{field: getattr(decision, field) + 1})
+        decision.refresh_from_db()
+        return task
+
+    def test_update_statuses(self):
+        pending = self.create_task(self.decisions[0], TASK_STATUS[0][0])
+        processing = self.create_task(self.decisions[0], TASK_STATUS[1][0])
+        finished = self.create_task(self.decisions[0], TASK_STATUS[2][0])
+        other = self.create_task(self.decisions[1], TASK_STATUS[1][0])
+
+        decision_save = Decision.save
+        with mock.patch('service.utils.on_tasks_change') as notify, \
+                mock.patch.object(Decision, 'save', autospec=True, side_effect=decision_save) as save:
+            res = UpdateTasksStatuses([
+                {'id': pending.id, 'status': TASK_STATUS[1][0]},
+                {'id': processing.id, 'status': TASK_STATUS[3][0], 'error': 'Verifier failed'},
+                {'id': finished.id, 'status': TASK_STATUS[3][0]},
+                {'id': other.id, 'status': TASK_STATUS[3][0]},
+                {'id': other.id + 1000, 'status': TASK_STATUS[1][0]}
+            ])
+
+        # Tasks that can not be changed are reported while other ones are changed
+        self.assertEqual(set(res.errors), {str(finished.id), str(other.id + 1000)})
+        self.assertEqual(Task.objects.get(id=pending.id).status, TASK_STATUS[1][0])
+        self.assertEqual(Task.objects.get(id=processing.id).error, 'Verifier failed')
+        self.assertEqual(Task.objects.get(id=finished.id).status, TASK_STATUS[2][0])
+        self.assertEqual(Task.objects.get(id=other.id).error, "The scheduler hasn't given error description")
+
+        # Each decision is saved once with all changes and all notifications are sent at once
+        self.assertEqual(sorted(call[0][0].id for call in save.call_args_list), sorted(d.id for d in self.decisions))
+        decision = Decision.objects.get(id=self.decisions[0].id)
+        self.assertEqual((decision.tasks_pending, decision.tasks_processing, decision.tasks_finished,
+                          decision.tasks_error), (0, 1, 1, 1))
+        decision = Decision.objects.get(id=self.decisions[1].id)
+        self.assertEqual((decision.tasks_processing, decision.tasks_error), (0, 1))
+        notify.assert_called_once_with([
+            (pending.id, TASK_STATUS[1][0], self.scheduler.type),
+            (processing.id, TASK_STATUS[3][0], self.scheduler.type),
+            (other.id, TASK_STATUS[3][0], self.scheduler.type)
+        ])
+
+    def test_single_transaction(self):
+        tasks = list(self.create_task(decision, TASK_STATUS[0][0]) for decision in self.decisions)
+
+        def failing_save(decision, *args, **kwargs):
+            if decision.id == self.decisions[1].id:
+                raise RuntimeError('Database error')
+            decision_save(decision, *args, **kwargs)
+
+        decision_save = Decision.save
+        with mock.patch('service.utils.on_tasks_change') as notify, \
+                mock.patch.object(Decision, 'save', autospec=True, side_effect=failing_save):
+            with self.assertRaises(RuntimeError):
+                UpdateTasksStatuses(list({'id': task.id, 'status': TASK_STATUS[1][0]} for task in tasks))
+
+        # Nothing is changed if statuses can not be changed all together
+        for task in tasks:
+            self.assertEqual(Task.objects.get(id=task.id).status, TASK_STATUS[0][0])
+        self.assertEqual(Decision.objects.get(id=self.decisions[0].id).tasks_pending, 1)
+        notify.assert_not_called()
+
+
+class TestTaskFiles(KleverTestCase):
+    def setUp(self):
+        super().setUp()
+        self.decision = create_processing_decisions(1)[0]
+        self.client.force_login(User.objects.create(username='service', role=USER_ROLES[4][0]))
+
+        self.files = {'task.c': b'int var;\n' * 1000, 'dir/header.h': b'#define VAR 1\n', 'benchmark.xml': b'<xml/>'}
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, mode='w', compression=zipfile.ZIP_DEFLATED) as zfp:
+            for name, content in self.files.items():
+                zfp.writestr(name, content)
+        self.archive = archive.getvalue()
+        archive.seek(0)
+        archive.name = 'task.zip'
+        with mock.patch('service.serializers.on_tasks_change'):
+            response = self.client.post('/service/tasks/', {
+                'job': str(self.decision.identifier), 'description': json.dumps({'priority': PRIORITY[2][0]}),
+                'archive': archive
+            })
+        self.assertEqual(response.status_code, 201)
+        self.task = Task.objects.get(id=response.json()['id'])
+
+    def tearDown(self):
+        self.task.delete()
+        super().tearDown()
+
+    def test_manifest(self):
+        manifest = list({'name': name, 'sha256': hashlib.sha256(content).hexdigest(), 'size': len(content)}
+                        for name, content in self.files.items())
+
+        # The manifest is calculated on uploading the task and it is not calculated again on downloading
+        self.assertEqual(self.task.manifest, manifest)
+        with mock.patch('service.utils.get_archive_manifest') as get_archive_manifest:
+            response = self.client.get('/service/tasks/{}/manifest/'.format(self.task.id))
+        get_archive_manifest.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'members': manifest})
+
+        # Manifests of tasks uploaded before are calculated once
+        Task.objects.filter(id=self.task.id).update(manifest=None)
+        response = self.client.get('/service/tasks/{}/manifest/'.format(self.task.id))
+        self.assertEqual(response.json(), {'members': manifest})
+        self.assertEqual(Task.objects.get(id=self.task.id).manifest, manifest)
+
+    def test_download_members(self):
+        response = self.client.post('/service/tasks/{}/download-members/'.format(self.task.id),
+                                    {'members': ['dir/header.h', 'task.c']}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as zfp:
+            self.assertIsNone(zfp.testzip())
+            self.assertEqual(zfp.namelist(), ['dir/header.h', 'task.c'])
+            for name in zfp.namelist():
+                self.assertEqual(zfp.read(name), self.files[name])
+            # Members keep their timestamps
+            with zipfile.ZipFile(BytesIO(self.archive)) as src_zfp:
+                for name in zfp.namelist():
+                    self.assertEqual(zfp.getinfo(name).date_time, src_zfp.getinfo(name).date_time)
+
+        response = self.client.post('/service/tasks/{}/download-members/'.format(self.task.id),
+                                    {'members': ['missing.c']}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
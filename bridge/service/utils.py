@@ -16,10 +16,15 @@
 #
 
 import json
+import shutil
+import tempfile
+import zipfile
 from wsgiref.util import FileWrapper
 
+from django.db import transaction
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
 
 from bridge.vars import DECISION_STATUS, SCHEDULER_TYPE, TASK_STATUS
 from bridge.utils import logger, BridgeException
@@ -30,7 +35,7 @@ from reports.models import ReportUnknown, ReportComponent
 from service.models import Task, Solution, Node, NodesConfiguration, Workload
 
 from jobs.serializers import decision_status_changed
-from service.serializers import SchedulerUserSerializer
+from service.serializers import SchedulerUserSerializer, TaskSerializer, on_tasks_change, get_archive_manifest
 
 
 def cancel_decision(decision):
@@ -156,6 +161,54 @@ class FinishDecision:
                 raise ServiceError("Subjobs solving progress is not finished")
 
 
+class UpdateTasksStatuses:
+    def __init__(self, data):
+        self.errors = {}
+        self._changes = []
+        with transaction.atomic():
+            self.__update(self.__get_items(data))
+        if self._changes:
+            on_tasks_change(self._changes)
+
+    def __get_items(self, data):
+        if not isinstance(data, list):
+            raise exceptions.ValidationError('The list of tasks statuses is expected')
+        items = []
+        for item in data:
+            try:
+                items.append((int(item['id']), item))
+            except (TypeError, KeyError, ValueError):
+                raise exceptions.ValidationError('Each item should be a dictionary with a task id')
+        return items
+
+    def __update(self, items):
+        tasks = Task.objects.select_for_update().select_related('decision__scheduler')\
+            .in_bulk(list(task_id for task_id, _item in items))
+
+        # Share decisions between tasks to update their counters in place and save each of them once
+        decisions = {}
+        for task_id, item in items:
+            task = tasks.get(task_id)
+            if task is None:
+                self.errors[str(task_id)] = {'detail': 'Not found.'}
+                continue
+            task.decision = decisions.setdefault(task.decision_id, task.decision)
+
+            serializer = TaskSerializer(
+                instance=task, data=item, fields={'id', 'status', 'error'}, context={'bulk': True}
+            )
+            try:
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            except exceptions.ValidationError as e:
+                self.errors[str(task_id)] = e.detail
+                continue
+            self._changes.append((task.id, task.status, task.decision.scheduler.type))
+
+        for decision in decisions.values():
+            decision.save()
+
+
 class ReadDecisionConfiguration:
     tasks_file = 'tasks.json'
 
@@ -241,6 +294,41 @@ class TaskArchiveGenerator(FileWrapper):
         super().__init__(self._task.archive, 8192)
 
 
+def get_task_manifest(task: Task):
+    if task.manifest is None:
+        # The task was uploaded before manifests were stored
+        with task.archive.file as fp:
+            task.manifest = get_archive_manifest(fp)
+        task.save(update_fields=['manifest'])
+    return task.manifest
+
+
+class TaskMembersArchiveGenerator(FileWrapper):
+    def __init__(self, task: Task, members):
+        if not isinstance(members, list) or not all(isinstance(name, str) for name in members):
+            raise exceptions.ValidationError({'members': 'List of archive members is expected'})
+        self._task = task
+        self.name = self._task.filename
+        archive = tempfile.TemporaryFile()
+        with task.archive.file as fp, zipfile.ZipFile(fp) as zfp, \
+                zipfile.ZipFile(archive, mode='w', compression=zipfile.ZIP_DEFLATED) as new_zfp:
+            for name in members:
+                try:
+                    info = zfp.getinfo(name)
+                except KeyError:
+                    raise exceptions.ValidationError({'members': 'Archive member {!r} not found'.format(name)})
+                # Members keep their timestamps and attributes, and zipfile uses ZIP64 extensions for large ones
+                new_info = zipfile.ZipInfo(info.filename, info.date_time)
+                new_info.external_attr = info.external_attr
+                new_info.compress_type = zipfile.ZIP_DEFLATED
+                new_info.file_size = info.file_size
+                with zfp.open(info) as src, new_zfp.open(new_info, mode='w') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+        self.size = archive.tell()
+        archive.seek(0)
+        super().__init__(archive, 8192)
+
+
 class SolutionArchiveGenerator(FileWrapper):
     def __init__(self, solution: Solution):
         self._solution = solution
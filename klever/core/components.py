@@ -15,9 +15,11 @@
 # limitations under the License.
 #
 
+import collections
 import glob
 import json
 import multiprocessing
+import multiprocessing.connection
 import os
 import shutil
 import signal
@@ -162,16 +164,12 @@ def launch_workers(logger, workers, monitoring_list=None):
             w.start()
 
         logger.info('Wait for components')
-        while True:
-            operating_subcomponents_num = 0
-
-            for p in workers:
-                p.join(1.0 / len(workers))
-                operating_subcomponents_num += p.is_alive()
+        operating = {p.sentinel: p for p in workers}
+        while operating:
+            for sentinel in wait_for_events(operating, monitoring_list):
+                if sentinel in operating:
+                    operating.pop(sentinel).join()
             check_components(logger, monitoring_list)
-
-            if not operating_subcomponents_num:
-                break
     finally:
         for p in workers:
             if p.is_alive():
@@ -194,8 +192,9 @@ def launch_queue_workers(logger, queue, constructor, number, fail_tolerant, moni
     """
     logger.info("Start children set with {!r} workers".format(number))
     active = True
-    elements = []
-    components = []
+    elements = collections.deque()
+    # Running components by their sentinels
+    components = {}
     try:
         while True:
             # Fetch all new elements
@@ -203,62 +202,68 @@ def launch_queue_workers(logger, queue, constructor, number, fail_tolerant, moni
                 active = klever.core.utils.drain_queue(elements, queue)
 
             # Then run new workers
-            diff = number - len(components)
-            if len(components) < number and len(elements) > 0:
-                logger.debug("Going to start {} new workers".format(diff))
-                for _ in range(min(number - len(components), len(elements))):
-                    element = elements.pop(0)
-                    worker = constructor(element)
+            if len(components) < number and elements:
+                logger.debug("Going to start {} new workers".format(min(number - len(components), len(elements))))
+                while len(components) < number and elements:
+                    worker = constructor(elements.popleft())
                     if isinstance(worker, Component):
-                        components.append(worker)
                         worker.start()
+                        components[worker.sentinel] = worker
                     else:
                         raise TypeError("Incorrect constructor, expect Component but get {}".
                                         format(type(worker).__name__))
 
-            # Wait for components termination
+            # Check that we can quit or must wait
+            if not components and not elements and not active:
+                break
+
+            # Sleep until some worker finishes or a new element comes. There is no public way to get the queue file
+            # descriptor, so use its reader connection directly. Note that it is closed after the last element.
             finished = 0
-            # Becouse we use i for deletion we always delete the element near the end to not break order of
-            # following of the rest unprocessed elements
-            for i, p in reversed(list(enumerate(list(components)))):
+            for sentinel in wait_for_events(components, monitoring_list, [queue._reader] if active else ()):
+                if sentinel not in components:
+                    continue
+
+                p = components.pop(sentinel)
                 try:
-                    p.join(1.0 / len(components))
+                    p.join()
                 except ComponentError:
                     # Ignore or terminate the rest
                     if not fail_tolerant:
                         raise
-                # If all is OK
-                if not p.is_alive():
-                    # Make to be sure to execute join the last time
-                    try:
-                        p.join()
-                    except ComponentError:
-                        # Ignore or terminate the rest
-                        if not fail_tolerant:
-                            raise
-
-                    # Just remove it
-                    components.pop(i)
-                    finished += 1
+                finished += 1
+
             # Check additional components, actually they should not terminate or finish during this funciton run so
             # just check that they are OK
             check_components(logger, monitoring_list)
 
             if finished > 0:
                 logger.debug("Finished {} workers".format(finished))
-
-            # Check that we can quit or must wait
-            if len(components) == 0 and len(elements) == 0:
-                if not active:
-                    break
-                else:
-                    time.sleep(1)
     finally:
-        for p in components:
+        for p in components.values():
             if p.is_alive():
                 p.terminate()
 
 
+def wait_for_events(sentinels, monitoring_list=None, extra_objects=()):
+    """
+    Block until some of given processes or monitored components exits or some of extra objects becomes ready.
+
+    :param sentinels: Iterable with process sentinels.
+    :param monitoring_list: List with already started Components which exit should be also waited for.
+    :param extra_objects: Iterable with additional objects supported by multiprocessing.connection.wait().
+    :return: List of ready objects.
+    """
+    objects = list(sentinels)
+    objects.extend(extra_objects)
+    # Components that have already finished successfully are not interesting anymore, otherwise their sentinels would
+    # be always ready.
+    if isinstance(monitoring_list, list):
+        objects.extend(m.sentinel for m in monitoring_list if m.exitcode is None)
+
+    return multiprocessing.connection.wait(objects)
+
+
 def check_components(logger, components):
     """
     Check that all given processes are alive and raise an exception if it is not so.
@@ -22,10 +22,13 @@ from pygments.token import Comment, Error, Keyword, Literal, Name, Operator, Pun
 
 
 class Highlight:
+    # Lexers do not keep any state between runs, so there is no need to create them for each source.
+    lexer = CLexer()
+
     def __init__(self, logger, src):
         self.logger = logger
 
-        self.tokens = lex(src, CLexer())
+        self.tokens = lex(src, self.lexer)
 
         # Current token line number.
         self.cur_line_numb = 1
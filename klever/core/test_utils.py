@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import os
+import zipfile
+
+from klever.core.utils import ResultsCache, make_zip_archive, get_parallel_threads_num
+
+
+def fill_entry(cache, key, content):
+    with cache.entry(key) as (entry_dir, hit):
+        if not hit:
+            with open(os.path.join(entry_dir, 'out'), 'w') as fp:
+                fp.write(content)
+
+        with open(os.path.join(entry_dir, 'out')) as fp:
+            return fp.read(), hit
+
+
+def test_results_cache(tmpdir):
+    cache = ResultsCache(logging.getLogger('test'), str(tmpdir), size_limit=250)
+    first = cache.get_key('file', ['-O2'])
+    assert first == cache.get_key('file', ['-O2'])
+    assert first != cache.get_key('file', ['-O', '2'])
+
+    assert fill_entry(cache, first, 'a' * 100) == ('a' * 100, False)
+    assert fill_entry(cache, first, 'b' * 100) == ('a' * 100, True)
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+    # Entry that was used least recently is evicted when the size limit is exceeded.
+    second = cache.get_key('second')
+    third = cache.get_key('third')
+    fill_entry(cache, second, 'c' * 100)
+    fill_entry(cache, first, '')
+    fill_entry(cache, third, 'd' * 100)
+    assert fill_entry(cache, first, '') == ('a' * 100, True)
+    assert fill_entry(cache, second, 'e' * 100) == ('e' * 100, False)
+
+    # Just entries kept in the cache have files besides the index.
+    assert sorted(os.listdir(str(tmpdir))) == sorted(['index.json', 'index.json.tmp'] + [
+        key + suffix for key in (first, second) for suffix in ('', '.done', '.tmp')
+    ])
+
+
+def test_results_cache_failure(tmpdir):
+    cache = ResultsCache(logging.getLogger('test'), str(tmpdir))
+    key = cache.get_key('file')
+
+    try:
+        with cache.entry(key) as (entry_dir, hit):
+            assert not hit
+            raise RuntimeError('Tool failed')
+    except RuntimeError:
+        pass
+    assert not os.path.exists(os.path.join(str(tmpdir), key + '.tmp'))
+
+    # Incomplete entries are not used.
+    assert fill_entry(cache, key, 'a') == ('a', False)
+
+
+def test_make_zip_archive(tmpdir, monkeypatch):
+    files = {
+        'large.c': b''.join(b'int var%d = %d;\n' % (i, i) for i in range(300000)),
+        'small.c': b'int main(void) { return 0; }\n',
+        'archive.zip': os.urandom(2 * 1024 * 1024)
+    }
+    with tmpdir.as_cwd():
+        for file, content in files.items():
+            with open(file, 'wb') as fp:
+                fp.write(content)
+
+        make_zip_archive('task files.zip', [(file, None) for file in files] + [('small.c', 'dir/small.c')])
+
+        with zipfile.ZipFile('task files.zip') as zfp:
+            assert zfp.testzip() is None
+            assert zfp.namelist() == ['large.c', 'small.c', 'archive.zip', 'dir/small.c']
+            for file, content in files.items():
+                assert zfp.read(file) == content
+            assert zfp.getinfo('archive.zip').compress_type == zipfile.ZIP_STORED
+            assert zfp.getinfo('large.c').compress_size < len(files['large.c'])
+
+        # ZIP64 extensions are used for large members and archives
+        monkeypatch.setattr('klever.core.utils.ZIP64_LIMIT', 1000)
+        make_zip_archive('zip64.zip', [(file, None) for file in files] + [('small.c', 'каталог/small.c')])
+        with zipfile.ZipFile('zip64.zip') as zfp:
+            assert zfp.testzip() is None
+            assert zfp.namelist() == ['large.c', 'small.c', 'archive.zip', 'каталог/small.c']
+            for file, content in files.items():
+                assert zfp.read(file) == content
+
+
+def test_weaving_threads_num():
+    # This is how Klever Bridge configures parallelism in the development mode
+    conf = {
+        'task resource limits': {},
+        'number of CPU cores': 4,
+        'parallelism': {'Sub-jobs processing': 1, 'Tasks generation': 2, 'Results processing': 1, 'Weaving': 2}
+    }
+    logger = logging.getLogger('test')
+    assert get_parallel_threads_num(logger, conf, 'Weaving', default=1) == 2
+
+    # Configurations of decisions started before weaving became parallel
+    del conf['parallelism']['Weaving']
+    assert get_parallel_threads_num(logger, conf, 'Weaving', default=1) == 1
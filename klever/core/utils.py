@@ -15,23 +15,29 @@
 # limitations under the License.
 #
 
+import collections
+import concurrent.futures
+import contextlib
 import fcntl
 import json
 import hashlib
 import logging
 import os
 import re
+import selectors
 import subprocess
 import sys
 import zipfile
-import threading
+import zlib
 import time
 import queue
 import tempfile
 import shutil
 import resource
 import random
+import sqlite3
 import string
+import struct
 
 
 class Cd:
@@ -80,48 +86,103 @@ class LockedOpen(object):
             pass
 
 
-class StreamQueue:
+class OutputStream:
     def __init__(self, stream, stream_name, collect_all_output=False):
         self.stream = stream
         self.stream_name = stream_name
         self.collect_all_output = collect_all_output
-        self.queue = queue.Queue()
-        self.finished = False
-        self.traceback = None
-        self.thread = threading.Thread(target=self.__put_lines_from_stream_to_queue)
         self.output = []
+        # Lines that were not logged yet.
+        self.lines = []
+        self.__incomplete_line = b''
+
+    def read(self):
+        """
+        Read data available in the stream without blocking.
+
+        :return: False if the stream was closed and True otherwise.
+        """
+        data = os.read(self.stream.fileno(), 65536)
+        if not data:
+            if self.__incomplete_line:
+                self.__add_lines([self.__incomplete_line])
+                self.__incomplete_line = b''
+            return False
+
+        lines = (self.__incomplete_line + data).split(b'\n')
+        self.__incomplete_line = lines.pop()
+        self.__add_lines(lines)
+        return True
 
-    def get(self):
-        try:
-            return self.queue.get_nowait()
-        except queue.Empty:
-            return None
+    def pop_lines(self):
+        lines = self.lines
+        self.lines = []
+        return lines
 
-    def join(self):
-        self.thread.join()
+    def __add_lines(self, lines):
+        lines = [line.decode('utf8').rstrip() for line in lines]
+        self.lines.extend(lines)
+        if self.collect_all_output:
+            self.output.extend(lines)
 
-    def start(self):
-        self.thread.start()
 
-    def __put_lines_from_stream_to_queue(self):
-        try:
-            # This will put lines from stream to queue until stream will be closed. For instance it will happen when
-            # execution of command will be completed.
-            for line in self.stream:
-                line = line.decode('utf8').rstrip()
-                self.queue.put(line)
-                if self.collect_all_output:
-                    self.output.append(line)
-
-            # Nothing will be put to queue from now.
-            self.finished = True
-        except Exception:
-            import traceback
-            self.traceback = traceback.format_exc().rstrip()
+def pump_output(streams, log, timeout=0):
+    """
+    Read given output streams until all of them are closed, e.g. when the command finishes. This sleeps until some
+    output appears, so there are no periodic wakeups.
+
+    :param streams: List of OutputStream objects.
+    :param log: Function that accepts the stream and the list of its new lines.
+    :param timeout: Minimal interval between passing new lines to log in seconds. Lines that are printed within this
+                    interval are passed at once.
+    """
+    last_log_time = 0
+    with selectors.DefaultSelector() as selector:
+        for stream in streams:
+            selector.register(stream.stream, selectors.EVENT_READ, stream)
+
+        while selector.get_map():
+            if any(stream.lines for stream in streams):
+                wait = max(last_log_time + timeout - time.monotonic(), 0)
+            else:
+                wait = None
+
+            for key, _ in selector.select(wait):
+                if not key.data.read():
+                    selector.unregister(key.fileobj)
+
+            if time.monotonic() - last_log_time >= timeout:
+                for stream in streams:
+                    if stream.lines:
+                        log(stream, stream.pop_lines())
+                last_log_time = time.monotonic()
+
+    for stream in streams:
+        if stream.lines:
+            log(stream, stream.pop_lines())
+
+
+def wait_with_resources(p, start_time):
+    """
+    Wait for the process and get resources consumed by it and its children.
+
+    :param p: subprocess.Popen object.
+    :param start_time: Time of the process start.
+    :return: Dictionary with wall time and CPU time in ms and memory in B like for component reports.
+    """
+    _, status, rusage = os.wait4(p.pid, 0)
+    # Like subprocess.Popen does.
+    p.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+    return {
+        'wall_time': round(1000 * (time.time() - start_time)),
+        'cpu_time': round(1000 * (rusage.ru_utime + rusage.ru_stime)),
+        'memory': 1000 * rusage.ru_maxrss
+    }
 
 
 def execute(logger, args, env=None, cwd=None, timeout=0.1, collect_all_stdout=False, filter_func=None,
-            enforce_limitations=False):
+            enforce_limitations=False, resources=None):
     cmd = args[0]
     logger.debug('Execute:\n{0}{1}{2}'.format(cmd,
                                               '' if len(args) == 1 else ' ',
@@ -136,52 +197,41 @@ def execute(logger, args, env=None, cwd=None, timeout=0.1, collect_all_stdout=Fa
         soft_mem, hard_mem = resource.getrlimit(resource.RLIMIT_AS)
         logger.debug('Got the following limitations: time={}s, memory={}B'.format(timelimit, memlimit))
 
+    start_time = time.time()
     p = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
     if enforce_limitations:
         resource.prlimit(p.pid, resource.RLIMIT_CPU, [timelimit, hard_time])
         resource.prlimit(p.pid, resource.RLIMIT_AS, [memlimit, hard_mem])
 
-    out_q, err_q = (StreamQueue(p.stdout, 'STDOUT', collect_all_stdout), StreamQueue(p.stderr, 'STDERR', True))
-
-    for stream_q in (out_q, err_q):
-        stream_q.start()
-
-    # Print to logs everything that is printed to STDOUT and STDERR each timeout seconds. Last try is required to
-    # print last messages queued before command finishes.
-    last_try = True
-    while not out_q.finished or not err_q.finished or last_try:
-        if out_q.traceback:
-            raise RuntimeError('STDOUT reader thread failed with the following traceback:\n{0}'.format(out_q.traceback))
-        if err_q.traceback:
-            raise RuntimeError('STDERR reader thread failed with the following traceback:\n{0}'.format(err_q.traceback))
-        last_try = not out_q.finished or not err_q.finished
-        time.sleep(timeout)
-
-        for stream_q in (out_q, err_q):
-            output = []
-            while True:
-                line = stream_q.get()
-                if line is None:
-                    break
-                output.append(line)
-            if output:
-                m = '"{0}" outputted to {1}:\n{2}'.format(cmd, stream_q.stream_name, '\n'.join(output))
-                if stream_q is out_q:
-                    logger.debug(m)
-                else:
-                    logger.warning(m)
-
-    for stream_q in (out_q, err_q):
-        stream_q.join()
+    out_s, err_s = (OutputStream(p.stdout, 'STDOUT', collect_all_stdout), OutputStream(p.stderr, 'STDERR', True))
 
-    if p.poll():
-        logger.error('"{0}" exitted with "{1}"'.format(cmd, p.poll()))
+    def log(stream, lines):
+        m = '"{0}" outputted to {1}:\n{2}'.format(cmd, stream.stream_name, '\n'.join(lines))
+        if stream is out_s:
+            logger.debug(m)
+        else:
+            logger.warning(m)
+
+    # Print to logs everything that is printed to STDOUT and STDERR at most each timeout seconds.
+    pump_output((out_s, err_s), log, timeout)
+    p.stdout.close()
+    p.stderr.close()
+
+    consumed_resources = wait_with_resources(p, start_time)
+    logger.debug('"{0}" consumed {1} ms of wall time, {2} ms of CPU time and {3} B of memory'
+                 .format(cmd, consumed_resources['wall_time'], consumed_resources['cpu_time'],
+                         consumed_resources['memory']))
+    if resources is not None:
+        resources.update(consumed_resources)
+
+    if p.returncode:
+        logger.error('"{0}" exitted with "{1}"'.format(cmd, p.returncode))
         with open('problem desc.txt', 'a', encoding='utf8') as fp:
-            out = filter(filter_func, err_q.output) if filter_func else err_q.output
+            out = filter(filter_func, err_s.output) if filter_func else err_s.output
             fp.write('\n'.join(out))
         sys.exit(1)
     elif collect_all_stdout:
-        return out_q.output
+        return out_s.output
 
 
 def reliable_rmtree(logger, directory):
@@ -373,7 +423,7 @@ def get_logger(name, conf):
     return logger
 
 
-def get_parallel_threads_num(logger, conf, action=None):
+def get_parallel_threads_num(logger, conf, action=None, default=None):
     logger.info('Get the number of parallel threads for "{0}"'.format(action if action else "Default"))
 
     if 'CPU Virtual cores' in conf['task resource limits']\
@@ -384,7 +434,11 @@ def get_parallel_threads_num(logger, conf, action=None):
 
     # Without specified action the number of parallel threads equals to the number of CPU cores.
     if action:
-        raw_parallel_threads_num = conf['parallelism'][action]
+        # Some actions are not configured by users and they are performed like before unless this is done explicitly.
+        if default is not None and action not in conf['parallelism']:
+            raw_parallel_threads_num = default
+        else:
+            raw_parallel_threads_num = conf['parallelism'][action]
     else:
         raw_parallel_threads_num = 1.0
 
@@ -445,24 +499,198 @@ class ArchiveFiles:
 
     def make_archive(self, archive):
         self.archive = archive
+        make_zip_archive(self.archive, self.__get_files_and_arcnames())
+
+    def __get_files_and_arcnames(self):
+        for file_or_dir in self.files_and_dirs:
+            # Archive file using specified archive name if so.
+            if os.path.isfile(file_or_dir):
+                yield file_or_dir, self.arcnames.get(file_or_dir, None)
+            # Archive all files from directory cutting that directory from file names.
+            elif os.path.isdir(file_or_dir):
+                for root, dirs, files in os.walk(file_or_dir):
+                    for file in files:
+                        file = os.path.join(root, file)
+                        yield file, make_relative_path([file_or_dir], file)
+            else:
+                raise NotImplementedError("Cannot interprete a kind of an object {!r}".format(file_or_dir))
+
+
+# Files that are compressed already are stored as is.
+COMPRESSED_FILE_SUFFIXES = ('.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.png', '.jpg')
+# Larger files are compressed in parallel.
+PARALLEL_COMPRESSION_MIN_SIZE = 1024 * 1024
+
+
+# Members and archives that are larger need ZIP64 extensions. This is the same limit as zipfile uses.
+ZIP64_LIMIT = (1 << 31) - 1
+
+
+def __deflate(file):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    chunks = []
+    with open(file, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            chunks.append(compressor.compress(chunk))
+    chunks.append(compressor.flush())
+
+    return b''.join(chunks), crc, size
+
+
+class ZipWriter:
+    """
+    Writer of ZIP archives with members that are compressed in advance, e.g. in parallel, which zipfile.ZipFile can not
+    add. Archives follow version 4.5 of the .ZIP File Format Specification (APPNOTE.TXT). ZIP64 extensions are used
+    for large members and archives.
+    """
+
+    VERSION = 20
+    ZIP64_VERSION = 45
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.__members = []
+
+    def write_deflated(self, file, arcname, data, crc, size):
+        """
+        Add the file that was compressed by __deflate() to the archive.
+
+        :param file: File name.
+        :param arcname: Name within the archive or None if it should be the same.
+        :param data: Raw deflated data.
+        :param crc: CRC-32 of the file.
+        :param size: File size.
+        """
+        self.__write_header(file, arcname, zipfile.ZIP_DEFLATED, crc, len(data), size)
+        self.fp.write(data)
+
+    def write_stored(self, file, arcname):
+        """
+        Add the file to the archive without compression.
+
+        :param file: File name.
+        :param arcname: Name within the archive or None if it should be the same.
+        """
+        crc = 0
+        size = 0
+        with open(file, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+            self.__write_header(file, arcname, zipfile.ZIP_STORED, crc, size, size)
+            fp.seek(0)
+            shutil.copyfileobj(fp, self.fp, 1024 * 1024)
+
+    def close(self):
+        """Write the central directory."""
+        cd_offset = self.fp.tell()
+        for zinfo, name, flags, compress_type, crc, compress_size, size, offset in self.__members:
+            zip64_fields = []
+            if size > ZIP64_LIMIT:
+                zip64_fields.append(size)
+                size = 0xFFFFFFFF
+            if compress_size > ZIP64_LIMIT:
+                zip64_fields.append(compress_size)
+                compress_size = 0xFFFFFFFF
+            if offset > ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset = 0xFFFFFFFF
+            extra = b''
+            if zip64_fields:
+                extra = struct.pack('<2H{}Q'.format(len(zip64_fields)), 1, 8 * len(zip64_fields), *zip64_fields)
+            version = self.ZIP64_VERSION if zip64_fields else self.VERSION
+
+            dos_time, dos_date = self.__dos_date_time(zinfo.date_time)
+            self.fp.write(struct.pack('<4s4B4HL2L5H2L', b'PK\x01\x02', version, zinfo.create_system, version, 0, flags,
+                                      compress_type, dos_time, dos_date, crc, compress_size, size, len(name),
+                                      len(extra), 0, 0, 0, zinfo.external_attr, offset))
+            self.fp.write(name + extra)
+
+        cd_end = self.fp.tell()
+        entries = len(self.__members)
+        cd_size = cd_end - cd_offset
+        if entries > 0xFFFF or cd_size > ZIP64_LIMIT or cd_offset > ZIP64_LIMIT:
+            self.fp.write(struct.pack('<4sQ2H2L4Q', b'PK\x06\x06', 44, self.ZIP64_VERSION, self.ZIP64_VERSION, 0, 0,
+                                      entries, entries, cd_size, cd_offset))
+            self.fp.write(struct.pack('<4sLQL', b'PK\x06\x07', 0, cd_end, 1))
+            entries = min(entries, 0xFFFF)
+            cd_size = min(cd_size, 0xFFFFFFFF)
+            cd_offset = min(cd_offset, 0xFFFFFFFF)
+        self.fp.write(struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, entries, entries, cd_size, cd_offset, 0))
+
+    def __write_header(self, file, arcname, compress_type, crc, compress_size, size):
+        # Get the member name, the modification time and file attributes like zipfile.ZipFile.write() does.
+        zinfo = zipfile.ZipInfo.from_file(file, arcname)
+        try:
+            name = zinfo.filename.encode('ascii')
+            flags = 0
+        except UnicodeEncodeError:
+            name = zinfo.filename.encode('utf8')
+            # Names are encoded in UTF-8.
+            flags = 0x800
+
+        # Local headers of ZIP64 members should have both sizes in the extra field.
+        extra = b''
+        version = self.VERSION
+        if size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            extra = struct.pack('<2H2Q', 1, 16, size, compress_size)
+            version = self.ZIP64_VERSION
+
+        dos_time, dos_date = self.__dos_date_time(zinfo.date_time)
+        offset = self.fp.tell()
+        self.fp.write(struct.pack('<4s2B4HL2L2H', b'PK\x03\x04', version, 0, flags, compress_type, dos_time, dos_date,
+                                  crc, 0xFFFFFFFF if extra else compress_size, 0xFFFFFFFF if extra else size,
+                                  len(name), len(extra)))
+        self.fp.write(name + extra)
+        self.__members.append((zinfo, name, flags, compress_type, crc, compress_size, size, offset))
+
+    @staticmethod
+    def __dos_date_time(date_time):
+        year, month, day, hour, minute, second = date_time
+        return hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day
+
+
+def make_zip_archive(archive, files_and_arcnames):
+    """
+    Make ZIP archive. Large files are compressed in parallel while they are written to the archive in the given order.
+    Already compressed files are stored without compression.
 
-        with open(self.archive, mode='w+b', buffering=0) as f:
-            with zipfile.ZipFile(f, mode='w', compression=zipfile.ZIP_DEFLATED) as zfp:
-                for file_or_dir in self.files_and_dirs:
-                    # Archive file using specified archive name if so.
-                    if os.path.isfile(file_or_dir):
-                        arcname = self.arcnames.get(file_or_dir, None)
-                        zfp.write(file_or_dir, arcname=arcname)
-                    # Archive all files from directory cutting that directory from file names.
-                    elif os.path.isdir(file_or_dir):
-                        for root, dirs, files in os.walk(file_or_dir):
-                            for file in files:
-                                file = os.path.join(root, file)
-                                zfp.write(file, arcname=make_relative_path([file_or_dir], file))
-                    else:
-                        raise NotImplementedError("Cannot interprete a kind of an object {!r}".format(file_or_dir))
-
-                os.fsync(zfp.fp)
+    :param archive: Archive file name.
+    :param files_and_arcnames: Iterable of pairs of file names and their names within the archive or None if names
+                               should be the same.
+    """
+    workers_num = min(os.cpu_count() or 1, 4)
+    with open(archive, mode='w+b', buffering=0) as f, \
+            concurrent.futures.ThreadPoolExecutor(workers_num) as pool:
+        writer = ZipWriter(f)
+        # Keep the limited number of compressed files in memory.
+        pending = collections.deque()
+
+        def write_pending(limit):
+            while len(pending) > limit:
+                pending_file, pending_arcname, future = pending.popleft()
+                if future:
+                    writer.write_deflated(pending_file, pending_arcname, *future.result())
+                elif pending_file.endswith(COMPRESSED_FILE_SUFFIXES):
+                    writer.write_stored(pending_file, pending_arcname)
+                else:
+                    writer.write_deflated(pending_file, pending_arcname, *__deflate(pending_file))
+
+        for file, arcname in files_and_arcnames:
+            if not file.endswith(COMPRESSED_FILE_SUFFIXES) and \
+                    os.path.getsize(file) >= PARALLEL_COMPRESSION_MIN_SIZE:
+                pending.append((file, arcname, pool.submit(__deflate, file)))
+            else:
+                pending.append((file, arcname, None))
+            write_pending(2 * workers_num)
+        write_pending(0)
+        writer.close()
+
+        os.fsync(f.fileno())
 
 
 class ExtendedJSONEncoder(json.JSONEncoder):
@@ -728,6 +956,87 @@ def save_program_fragment_description(program_fragment_desc, file_name):
         fp.writelines('\n'.join(sorted(f for grp in program_fragment_desc['grps'] for f in grp['files'])))
 
 
+class ProgramFragmentStore:
+    """
+    Storage of program fragment descriptions keyed by their identifiers. It is backed by SQLite, so different
+    processes can load descriptions on demand while just identifiers are passed through queues.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.__connection = None
+        self.__pid = None
+
+    @property
+    def connection(self):
+        # SQLite connections must not be shared between processes, so establish a new one after fork.
+        if self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(self.file_name, timeout=60, isolation_level=None)
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            # Descriptions are intermediate data that can be restored from program fragment description files.
+            self.__connection.execute('PRAGMA synchronous=OFF')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS program_fragments '
+                                      '(id TEXT PRIMARY KEY, description TEXT NOT NULL)')
+            self.__pid = os.getpid()
+
+        return self.__connection
+
+    def add_files(self, program_fragment_desc_files, remove=False):
+        """
+        Load program fragment descriptions from given files one by one and put them to the store.
+
+        :param program_fragment_desc_files: List of program fragment description files.
+        :param remove: Remove files after loading.
+        :return: List of program fragment identifiers in the order of given files.
+        """
+        program_fragment_ids = []
+
+        # Insert all descriptions within the single transaction while keeping at most one of them in memory.
+        connection = self.connection
+        connection.execute('BEGIN')
+        try:
+            for program_fragment_desc_file in program_fragment_desc_files:
+                with open(program_fragment_desc_file, encoding='utf8') as fp:
+                    program_fragment_desc = json.load(fp)
+
+                connection.execute('INSERT OR REPLACE INTO program_fragments VALUES (?, ?)',
+                                   (program_fragment_desc['id'], json.dumps(program_fragment_desc)))
+                program_fragment_ids.append(program_fragment_desc['id'])
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+        if remove:
+            for program_fragment_desc_file in program_fragment_desc_files:
+                os.remove(program_fragment_desc_file)
+
+        return program_fragment_ids
+
+    def get(self, program_fragment_id):
+        row = self.connection.execute('SELECT description FROM program_fragments WHERE id = ?',
+                                      (program_fragment_id,)).fetchone()
+        if not row:
+            raise KeyError('There is no description of program fragment {!r}'.format(program_fragment_id))
+
+        return json.loads(row[0])
+
+    def remove(self, program_fragment_id):
+        self.connection.execute('DELETE FROM program_fragments WHERE id = ?', (program_fragment_id,))
+
+
+def get_tool_identity(tool):
+    """
+    Get identity of the given tool executable that changes when the tool is updated. This is cheaper than calculating
+    a checksum of the tool executable and it is useful for keys of caches of tool results.
+
+    :param tool: Name of the tool executable that is searched for in PATH.
+    :return: List with the real path, size and modification time of the tool executable.
+    """
+    tool = os.path.realpath(shutil.which(tool))
+    return [tool, os.path.getsize(tool), os.path.getmtime(tool)]
+
+
 def get_file_checksum(file_name):
     hash_sha256 = hashlib.sha256()
 
@@ -736,3 +1045,129 @@ def get_file_checksum(file_name):
             hash_sha256.update(chunk)
 
     return hash_sha256.hexdigest()
+
+
+class ResultsCache:
+    """
+    Cache of files produced by external tools that is shared by all processes of the job. Each entry is a directory
+    named by a hash of everything that affects its content, so entries never need to be invalidated. Entries are
+    filled in and read under exclusive locks. When total size of entries exceeds the limit, least recently used ones are
+    removed.
+    """
+
+    def __init__(self, logger, directory, size_limit=None):
+        self.logger = logger
+        self.directory = directory
+        self.size_limit = memory_units_converter(size_limit)[0] if size_limit else None
+        # Statistics of this process.
+        self.hits = 0
+        self.misses = 0
+        # Statistics of all processes that is obtained at last access to the index.
+        self.total_hits = 0
+        self.total_misses = 0
+        self.__index_file = os.path.join(self.directory, 'index.json')
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(*parts):
+        hash_sha256 = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = json.dumps(part, sort_keys=True).encode('utf8')
+            # Hash parts separately to distinguish, say, ("ab", "c") from ("a", "bc").
+            hash_sha256.update(hashlib.sha256(part).digest())
+
+        return hash_sha256.hexdigest()
+
+    @contextlib.contextmanager
+    def entry(self, key):
+        """
+        Lock the cache entry and yield its directory and whether it was found. If the entry was not found, the caller
+        should fill in the directory. The entry is dropped if this fails.
+
+        :param key: Key of the entry, see get_key().
+        """
+        entry_dir = os.path.join(self.directory, key)
+        entry_size = None
+
+        with LockedOpen(entry_dir + '.tmp', 'w'):
+            hit = os.path.isfile(entry_dir + '.done')
+            if not hit:
+                # Get rid of remnants of processes that failed to fill in the entry.
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.makedirs(entry_dir)
+
+            try:
+                yield entry_dir, hit
+            except BaseException:
+                if not hit:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    os.remove(entry_dir + '.tmp')
+                raise
+
+            if not hit:
+                entry_size = sum(os.path.getsize(os.path.join(root, file))
+                                 for root, _, files in os.walk(entry_dir) for file in files)
+                with open(entry_dir + '.done', 'w'):
+                    pass
+
+        # Update the index after releasing the entry lock since eviction acquires entry locks while holding the index
+        # one.
+        self.__update_index(key, entry_size)
+
+    @property
+    def hit_rate(self):
+        accesses = self.total_hits + self.total_misses
+        return self.total_hits / accesses if accesses else 0
+
+    def __update_index(self, key, entry_size):
+        with LockedOpen(self.__index_file + '.tmp', 'w'):
+            if os.path.isfile(self.__index_file):
+                with open(self.__index_file, encoding='utf8') as fp:
+                    index = json.load(fp)
+            else:
+                index = {'clock': 0, 'hits': 0, 'misses': 0, 'entries': {}}
+
+            # Use logical clock for ordering accesses rather than time that can be the same for concurrent processes.
+            index['clock'] += 1
+            if entry_size is None:
+                self.hits += 1
+                index['hits'] += 1
+                # Entries that were not put into the index yet can not be evicted.
+                if key in index['entries']:
+                    index['entries'][key][1] = index['clock']
+            else:
+                self.misses += 1
+                index['misses'] += 1
+                index['entries'][key] = [entry_size, index['clock']]
+                self.__evict(index, key)
+
+            self.total_hits = index['hits']
+            self.total_misses = index['misses']
+
+            with open(self.__index_file + '.new', 'w', encoding='utf8') as fp:
+                json.dump(index, fp)
+            os.replace(self.__index_file + '.new', self.__index_file)
+
+    def __evict(self, index, new_key):
+        if not self.size_limit:
+            return
+
+        entries = index['entries']
+        total_size = sum(entry_size for entry_size, _ in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total_size <= self.size_limit:
+                break
+
+            if key == new_key:
+                continue
+
+            self.logger.debug('Remove least recently used cache entry "{0}"'.format(key))
+            entry_dir = os.path.join(self.directory, key)
+            with LockedOpen(entry_dir + '.tmp', 'w'):
+                if os.path.isfile(entry_dir + '.done'):
+                    os.remove(entry_dir + '.done')
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                # Locks are held by "<entry>.tmp.lock" files, so the entry file can be removed while it is open.
+                os.remove(entry_dir + '.tmp')
+            total_size -= entries.pop(key)[0]
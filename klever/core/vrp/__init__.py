@@ -180,7 +180,7 @@ class VRP(klever.core.components.Component):
                 break
 
             status, data, attempt, source_paths = element
-            pf = data[2]['id']
+            pf = data[2]
             requirement = data[3]
             attrs = None
             if attempt:
@@ -253,8 +253,8 @@ class RP(klever.core.components.Component):
         self.logger.info("VRP instance is ready to work")
         element = self.element
         status, data = element
-        task_id, opts, program_fragment_desc, req_spec_id, verifier, additional_srcs, verification_task_files = data
-        self.program_fragment_id = program_fragment_desc['id']
+        task_id, opts, program_fragment_id, req_spec_id, verifier, additional_srcs, verification_task_files = data
+        self.program_fragment_id = program_fragment_id
         self.req_spec_id = req_spec_id
         self.results_key = '{}:{}'.format(self.program_fragment_id, self.req_spec_id)
         self.additional_srcs = additional_srcs
@@ -262,6 +262,8 @@ class RP(klever.core.components.Component):
         self.logger.debug("Process results of task {}".format(task_id))
 
         files_list_file = 'files list.txt'
+        program_fragment_desc = klever.core.utils.ProgramFragmentStore(self.conf['program fragments store'])\
+            .get(program_fragment_id)
         klever.core.utils.save_program_fragment_description(program_fragment_desc, files_list_file)
         klever.core.utils.report(self.logger,
                           'patch',
@@ -388,10 +390,16 @@ class RP(klever.core.components.Component):
         else:
             witnesses = glob.glob(os.path.join('output', 'witness.*.graphml'))
             self.logger.info("Found {} witnesses".format(len(witnesses)))
+            truncated_witnesses = [f for f in decision_results.get('truncated files', [])
+                                   if re.search(r'witness\.(.+)\.graphml', f)]
+            if truncated_witnesses:
+                self.logger.warning('Witnesses "{0}" were not uploaded since they exceed the solution file size limit'
+                                    .format('", "'.join(truncated_witnesses)))
 
             # Create unsafe reports independently on status. Later we will create unknown report in addition if status
             # is not "unsafe".
-            if "expect several witnesses" in opts and opts["expect several witnesses"] and len(witnesses) != 0:
+            if "expect several witnesses" in opts and opts["expect several witnesses"] and \
+                    len(witnesses) + len(truncated_witnesses) != 0:
                 self.verdict = 'unsafe'
                 for witness in witnesses:
                     try:
@@ -408,6 +416,17 @@ class RP(klever.core.components.Component):
                                 self.__exception = e
                         else:
                             self.__exception = e
+
+                if truncated_witnesses:
+                    self.verdict = 'non-verifier unknown'
+                    e = RuntimeError('Witnesses were truncated: "{0}"'.format('", "'.join(truncated_witnesses)))
+                    if self.__exception:
+                        try:
+                            raise e from self.__exception
+                        except Exception as e:
+                            self.__exception = e
+                    else:
+                        self.__exception = e
             if re.search('false', decision_results['status']) and \
                     ("expect several witnesses" not in opts or not opts["expect several witnesses"]):
                 self.verdict = 'unsafe'
@@ -415,6 +434,8 @@ class RP(klever.core.components.Component):
                     if len(witnesses) != 1:
                         NotImplementedError('Just one witness is supported (but "{0}" are given)'.
                                             format(len(witnesses)))
+                    if not witnesses and truncated_witnesses:
+                        raise RuntimeError('Witness was truncated: "{0}"'.format(truncated_witnesses[0]))
 
                     error_trace_file, attrs = self.process_witness(witnesses[0])
                     self.report_unsafe(error_trace_file, attrs)
@@ -527,7 +548,9 @@ class RP(klever.core.components.Component):
 
         # Remember exception and raise it if verdict is not unknown
         exception = None
-        if opts['code coverage details'] != "None":
+        if os.path.join('output', 'coverage.info') in decision_results.get('truncated files', []):
+            self.logger.warning('Code coverage was not uploaded since it exceeds the solution file size limit')
+        elif opts['code coverage details'] != "None":
             try:
                 LCOV(self.conf, self.logger, os.path.join('output', 'coverage.info'),
                      self.clade, self.source_paths,
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import collections
 import re
 import os
 import json
@@ -26,12 +27,19 @@ from klever.core.highlight import Highlight
 class ErrorTrace:
     MODEL_COMMENT_TYPES = 'NOTE|ASSERT|CIF|EMG_WRAPPER'
     ERROR_TRACE_FORMAT_VERSION = 1
+    HIGHLIGHT_CACHE_SIZE = 100000
+
+    # Many statements repeat both within error traces and across them, e.g. ones from environment model wrappers and
+    # models, so highlight each source just once.
+    _highlight_cache = collections.OrderedDict()
 
     def __init__(self, logger):
         self._attrs = list()
         self._nodes = dict()
         self._files = list()
+        self._file_ids = dict()
         self._funcs = list()
+        self._func_ids = dict()
         self._logger = logger
         self._entry_node_id = None
         self._violation_node_ids = set()
@@ -39,6 +47,7 @@ class ErrorTrace:
         self._notes = dict()
         self._asserts = dict()
         self._actions = list()
+        self._action_ids = dict()
         self._callback_actions = list()
         self.emg_comments = dict()
         self.displays = dict()
@@ -69,6 +78,21 @@ class ErrorTrace:
         # also does not show them well.
         src = src.replace('\n', ' ')
 
+        key = (src, func_name)
+        if key in self._highlight_cache:
+            self._highlight_cache.move_to_end(key)
+            highlights = self._highlight_cache[key]
+        else:
+            highlights = self._highlight_cache[key] = self._highlight(src, func_name)
+            if len(self._highlight_cache) > self.HIGHLIGHT_CACHE_SIZE:
+                self._highlight_cache.popitem(last=False)
+
+        return {
+            'source': src,
+            'highlight': [list(h) for h in highlights]
+        }
+
+    def _highlight(self, src, func_name):
         highlight = Highlight(self._logger, src)
         highlight.highlight()
 
@@ -85,10 +109,7 @@ class ErrorTrace:
                     highlight_kind = 'FuncDefRefTo'
                 highlight.extra_highlight([[highlight_kind, 1, idx, idx + len(func_name)]])
 
-        return {
-            'source': src,
-            'highlight': [[h[0], h[2], h[3]] for h in highlight.highlights]
-        }
+        return tuple((h[0], h[2], h[3]) for h in highlight.highlights)
 
     def serialize(self):
         klever.core.utils.capitalize_attr_names(self._attrs)
@@ -285,29 +306,29 @@ class ErrorTrace:
         self._violation_node_ids.remove(identifier)
 
     def add_file(self, file_name):
-        if file_name not in self._files:
+        if file_name not in self._file_ids:
             if not os.path.isfile(file_name):
                 raise FileNotFoundError("There is no file {!r}".format(file_name))
+            self._file_ids[file_name] = len(self._files)
             self._files.append(file_name)
-            return self.resolve_file_id(file_name)
-        else:
-            return self.resolve_file_id(file_name)
+
+        return self._file_ids[file_name]
 
     def add_function(self, name):
-        if name not in self._funcs:
+        if name not in self._func_ids:
+            self._func_ids[name] = len(self._funcs)
             self._funcs.append(name)
-            return len(self._funcs) - 1
-        else:
-            return self.resolve_function_id(name)
+
+        return self._func_ids[name]
 
     def add_action(self, comment, relevant=False):
-        if comment not in self._actions:
+        if comment not in self._action_ids:
+            action_id = self._action_ids[comment] = len(self._actions)
             self._actions.append(comment)
-            action_id = len(self._actions) - 1
             if relevant:
                 self._callback_actions.append(action_id)
         else:
-            action_id = self.resolve_action_id(comment)
+            action_id = self._action_ids[comment]
 
         return action_id
 
@@ -317,19 +338,25 @@ class ErrorTrace:
         self.emg_comments[file][line] = data
 
     def resolve_file_id(self, file):
-        return self._files.index(file)
+        if file not in self._file_ids:
+            raise ValueError('There is no file {!r}'.format(file))
+        return self._file_ids[file]
 
     def resolve_file(self, identifier):
         return self._files[identifier]
 
     def resolve_function_id(self, name):
-        return self._funcs.index(name)
+        if name not in self._func_ids:
+            raise ValueError('There is no function {!r}'.format(name))
+        return self._func_ids[name]
 
     def resolve_function(self, identifier):
         return self._funcs[identifier]
 
     def resolve_action_id(self, comment):
-        return self._actions.index(comment)
+        if comment not in self._action_ids:
+            raise ValueError('There is no action {!r}'.format(comment))
+        return self._action_ids[comment]
 
     def resolve_action(self, identifier):
         return self._actions[identifier]
@@ -434,6 +461,7 @@ class ErrorTrace:
             if file_id not in reffered_file_ids:
                 # This is not a complete removing. But error traces will not hold absolute paths of files that are not
                 # reffered by witness.
+                self._file_ids.pop(self._files[file_id], None)
                 self._files[file_id] = ''
 
     @staticmethod
@@ -457,10 +485,13 @@ class ErrorTrace:
     def _find_violation_path(self):
         self._logger.info('Get violation path')
 
+        func_return_edges = self._get_func_return_edges()
+        violation_edges = collections.deque()
+
         iterator = self.trace_iterator()
         for edge in iterator:
             if 'enter' in edge:
-                return_edge = self.get_func_return_edge(edge)
+                return_edge = func_return_edges.get(id(edge))
 
                 # Skip edges of functions that are both entered and returned.
                 if return_edge:
@@ -471,8 +502,10 @@ class ErrorTrace:
 
                     continue
 
-            # Everything else comprizes violation path.
-            self._violation_edges.insert(0, edge)
+            # Everything else comprizes violation path. It is stored in the reversed order.
+            violation_edges.appendleft(edge)
+
+        self._violation_edges = violation_edges
 
     def parse_model_comments(self):
         self._logger.info('Parse model comments from source files referred by witness')
@@ -656,6 +689,7 @@ class ErrorTrace:
         # Two stages are required since for marking edges with warnings we need to know whether there notes at violation
         # path below.
         warn_edges = list()
+
         for edge in self.trace_iterator():
             file_id = edge['file']
             file = self.resolve_file(file_id)
@@ -685,6 +719,15 @@ class ErrorTrace:
                 self._logger.debug("Add note {!r} for statement from '{}:{}'".format(note, file, line))
                 edge['note'] = note
 
+        # Remember whether there are edges with notes at violation path below each violation edge at once rather than
+        # look for them for each edge considered below.
+        notes_below = dict()
+        note_found = False
+        for violation_edge in self._violation_edges:
+            notes_below[id(violation_edge)] = note_found
+            if 'note' in violation_edge:
+                note_found = True
+
         for edge in self.trace_iterator(backward=True):
             file_id = edge['file']
             file = self.resolve_file(file_id)
@@ -692,17 +735,7 @@ class ErrorTrace:
 
             if file_id in self._asserts and line in self._asserts[file_id]:
                 # Add warning just if there are no more edges with notes at violation path below.
-                track_notes = False
-                note_found = False
-                for violation_edge in reversed(self._violation_edges):
-                    if track_notes:
-                        if 'note' in violation_edge:
-                            note_found = True
-                            break
-                    if id(violation_edge) == id(edge):
-                        track_notes = True
-
-                if not note_found:
+                if not notes_below.get(id(edge), False):
                     warn = self._asserts[file_id][line]
 
                     self._logger.debug("Add warning {!r} for statement from '{}:{}'".format(warn, file, line))
@@ -722,24 +755,37 @@ class ErrorTrace:
 
         del self._violation_edges, self._notes, self._asserts, self.displays
 
-    def get_func_return_edge(self, func_enter_edge):
-        next_edge = self.next_edge(func_enter_edge)
-
-        # Do not proceed if function call terminates error trace.
-        if not next_edge:
-            return None
+    def _get_func_return_edges(self):
+        """
+        Match function call enter edges with corresponding return edges within the single pass over the error trace.
 
+        :return: Dictionary from identifiers of enter edges to corresponding return edges.
+        """
+        func_return_edges = dict()
         # Keep in mind that each pair enter-return has identifier (function name), but such identifier is not unique
-        # across error trace, so we need to ignore all intermediate calls to the same function.
-        func_id = func_enter_edge['enter']
-
-        subcalls = 0
-        for edge in self.trace_iterator(begin=next_edge):
-            if edge.get('enter') == func_id:
-                subcalls += 1
-            if edge.get('return') == func_id:
-                if subcalls == 0:
-                    return edge
-                subcalls -= 1
-
-        return None
+        # across error trace, so we need to track nested calls to the same function.
+        func_enter_edges = collections.defaultdict(list)
+        # Edges that both enter and return from the same function are balanced by themselves, but they still are
+        # matched with the first balanced return edge below. Such edges are tracked together with call stack depths.
+        immediate_func_enter_edges = collections.defaultdict(list)
+
+        for edge in self.trace_iterator():
+            if 'enter' in edge and edge.get('return') == edge['enter']:
+                immediate_func_enter_edges[edge['enter']].append((len(func_enter_edges[edge['enter']]), edge))
+                continue
+
+            if 'return' in edge:
+                func_id = edge['return']
+
+                depth = len(func_enter_edges[func_id])
+                immediate_enter_edges = immediate_func_enter_edges[func_id]
+                while immediate_enter_edges and immediate_enter_edges[-1][0] == depth:
+                    func_return_edges[id(immediate_enter_edges.pop()[1])] = edge
+
+                if func_enter_edges[func_id]:
+                    func_return_edges[id(func_enter_edges[func_id].pop())] = edge
+
+            if 'enter' in edge:
+                func_enter_edges[edge['enter']].append(edge)
+
+        return func_return_edges
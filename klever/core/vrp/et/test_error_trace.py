@@ -0,0 +1,123 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import random
+import time
+
+from klever.core.vrp.et.error_trace import ErrorTrace
+
+
+def build_error_trace(length, funcs_num=20, seed=0):
+    # Generate the trace in the same shape as ones obtained from CPAchecker witnesses: a single thread with nested
+    # function calls, statements and calls of functions that return immediately. The trace is cut at random depth.
+    rnd = random.Random(seed)
+    error_trace = ErrorTrace(logging.getLogger('test'))
+    for func_id in range(funcs_num):
+        assert error_trace.add_function('func{}'.format(func_id)) == func_id
+
+    # Node identifiers look like in witnesses.
+    error_trace.add_node('A0')
+    error_trace.add_entry_node_id('A0')
+    stack = []
+    for node_id in range(1, length + 1):
+        error_trace.add_node('A{}'.format(node_id))
+        edge = error_trace.add_edge('A{}'.format(node_id - 1), 'A{}'.format(node_id))
+        edge.update({'thread': 1, 'file': 0, 'line': node_id, 'source': 'x = {};'.format(node_id)})
+
+        choice = rnd.random()
+        if choice < 0.3 and len(stack) < 50:
+            edge['enter'] = rnd.randrange(funcs_num)
+            stack.append(edge['enter'])
+        elif choice < 0.6 and stack:
+            edge['return'] = stack.pop()
+        elif choice < 0.65:
+            edge['enter'] = edge['return'] = rnd.randrange(funcs_num)
+    error_trace.add_violation_node_id('A{}'.format(length))
+
+    return error_trace
+
+
+def get_func_return_edge(error_trace, func_enter_edge):
+    # Reference implementation that rescans the trace for each function call.
+    next_edge = error_trace.next_edge(func_enter_edge)
+    if not next_edge:
+        return None
+
+    func_id = func_enter_edge['enter']
+    subcalls = 0
+    for edge in error_trace.trace_iterator(begin=next_edge):
+        if edge.get('enter') == func_id:
+            subcalls += 1
+        if edge.get('return') == func_id:
+            if subcalls == 0:
+                return edge
+            subcalls -= 1
+
+    return None
+
+
+def test_func_return_edges():
+    for seed in range(20):
+        error_trace = build_error_trace(500, funcs_num=3, seed=seed)
+        func_return_edges = error_trace._get_func_return_edges()
+
+        for edge in error_trace.trace_iterator():
+            if 'enter' in edge:
+                assert func_return_edges.get(id(edge)) is get_func_return_edge(error_trace, edge)
+
+
+def test_interning():
+    error_trace = ErrorTrace(logging.getLogger('test'))
+    assert error_trace.add_function('f') == 0
+    assert error_trace.add_function('g') == 1
+    assert error_trace.add_function('f') == 0
+    assert error_trace.resolve_function_id('g') == 1
+    assert error_trace.add_action('a', relevant=True) == 0
+    assert error_trace.add_action('a') == 0
+    assert error_trace.resolve_action_id('a') == 0
+
+    try:
+        error_trace.resolve_function_id('h')
+    except ValueError:
+        pass
+    else:
+        assert False, 'Unknown function is resolved'
+
+
+def test_long_violation_path():
+    error_trace = build_error_trace(100000)
+
+    start = time.time()
+    error_trace._find_violation_path()
+    logging.getLogger('test').info('Violation path of 100000 edges is found in {:.2f}s'.format(time.time() - start))
+
+    assert error_trace._violation_edges
+    # Violation path is stored in the reversed order and it starts from the entry node.
+    assert error_trace._violation_edges[-1] is error_trace.entry_node['out'][0]
+
+
+def test_highlight_cache():
+    error_trace = ErrorTrace(logging.getLogger('test'))
+    first = error_trace.highlight('ret = ldv_func(x);\n', 'ldv_func')
+    second = error_trace.highlight('ret = ldv_func(x);\n', 'ldv_func')
+
+    assert first == second
+    assert ['LDVModelFunc', 6, 14] in first['highlight']
+    # Cached highlights should not be shared between error trace nodes.
+    first['highlight'].pop()
+    assert first != second
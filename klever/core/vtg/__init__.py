@@ -27,6 +27,7 @@ import time
 import klever.core.components
 import klever.core.utils
 import klever.core.session
+import klever.core.vtg.utils
 
 from klever.core.vtg.scheduling import Balancer
 
@@ -40,6 +41,8 @@ def __launch_sub_job_components(context):
     context.mqs['prepare program fragments'] = multiprocessing.Queue()
     context.mqs['processing tasks'] = multiprocessing.Queue()
     context.mqs['program fragment desc files'] = multiprocessing.Queue()
+    # Program fragment descriptions are stored here while just their identifiers are passed through queues.
+    context.common_components_conf['program fragments store'] = os.path.realpath('program fragments.db')
 
 
 @klever.core.components.after_callback
@@ -77,6 +80,12 @@ class VTG(klever.core.components.Component):
         self.__extract_req_spec_descs()
         self.__classify_req_spec_descs()
 
+        # Compile templates once per sub-job. Forked TR plugins will get them as is.
+        klever.core.vtg.utils.preload_templates(
+            self.logger, self.conf,
+            {tmpl for req_spec_desc in self.req_spec_descs for plugin_desc in req_spec_desc['plugins']
+             if plugin_desc['name'] == 'TR' for tmpl in plugin_desc.get('options', {}).get('templates', [])})
+
         # Start plugins
         if not self.conf['keep intermediate files']:
             self.mqs['delete dir'] = multiprocessing.Queue()
@@ -327,31 +336,28 @@ class VTG(klever.core.components.Component):
         self.mqs['total tasks'].put([self.conf['sub-job identifier'],
                                      int(total_pf_descs * len(self.req_spec_descs))])
 
-        pf_descriptions = dict()
+        pf_ids = set()
         initial = dict()
 
-        # Fetch fragment
-        for program_fragment_desc_file in program_fragment_desc_files:
-            with open(os.path.join(self.conf['main working directory'], program_fragment_desc_file),
-                      encoding='utf8') as fp:
-                program_fragment_desc = json.load(fp)
-
-            if not self.conf['keep intermediate files']:
-                os.remove(os.path.join(self.conf['main working directory'], program_fragment_desc_file))
-
+        # Fetch fragments. Their descriptions are loaded on demand later, so just remember identifiers here.
+        pf_store = klever.core.utils.ProgramFragmentStore(self.conf['program fragments store'])
+        for program_fragment_id in pf_store.add_files(program_fragment_desc_files,
+                                                      remove=not self.conf['keep intermediate files']):
             if len(self.req_spec_descs) == 0:
                 self.logger.warning('Program fragment {0} will not be verified since requirement specifications'
-                                    ' are not specified'.format(program_fragment_desc['id']))
+                                    ' are not specified'.format(program_fragment_id))
+                if not self.conf['keep intermediate files']:
+                    pf_store.remove(program_fragment_id)
             else:
-                pf_descriptions[program_fragment_desc['id']] = program_fragment_desc
-                initial[program_fragment_desc['id']] = list(self.req_spec_classes.keys())
+                pf_ids.add(program_fragment_id)
+                initial[program_fragment_id] = list(self.req_spec_classes.keys())
 
         processing_status = dict()
         delete_ready = dict()
         balancer = Balancer(self.conf, self.logger, processing_status)
 
         def submit_task(pf, rlcl, rlda, rescheduling=False):
-            resource_limitations = balancer.resource_limitations(pf['id'], rlcl, rlda['identifier'])
+            resource_limitations = balancer.resource_limitations(pf, rlcl, rlda['identifier'])
             self.mqs['prepare program fragments'].put((pf, rlda, rlcl, self.req_spec_classes, resource_limitations,
                                                        rescheduling))
 
@@ -414,11 +420,10 @@ class VTG(klever.core.components.Component):
                 while len(initial[pf]) > 0:
                     if active_tasks < max_tasks:
                         req_spec_class = initial[pf].pop()
-                        program_fragment_id = pf_descriptions[pf]
                         req_spec_id = self.req_spec_classes[req_spec_class][0]['identifier']
                         self.logger.info("Prepare initial verification tasks for program fragement {!r} and"
                                          " requirements specification {!r}".format(pf, req_spec_id))
-                        submit_task(program_fragment_id, req_spec_class, self.req_spec_classes[req_spec_class][0])
+                        submit_task(pf, req_spec_class, self.req_spec_classes[req_spec_class][0])
 
                         # Set status
                         if pf not in processing_status:
@@ -446,7 +451,7 @@ class VTG(klever.core.components.Component):
                                 self.logger.info("Submit next verification task after having cached plugin results for "
                                                  "program fragment {!r} and requirements specification {!r}".
                                                  format(program_fragment_id, req_spec_desc['identifier']))
-                                submit_task(pf_descriptions[program_fragment_id], req_spec_class, req_spec_desc)
+                                submit_task(program_fragment_id, req_spec_class, req_spec_desc)
                                 processing_status[program_fragment_id][req_spec_class][
                                     req_spec_desc['identifier']] = None
                                 active_tasks += 1
@@ -464,7 +469,7 @@ class VTG(klever.core.components.Component):
                             if attempt:
                                 self.logger.info("Submit task {}:{} to solve it again".
                                                  format(program_fragment_id, req_spec_desc['id']))
-                                submit_task(pf_descriptions[program_fragment_id], req_spec_class, req_spec_desc,
+                                submit_task(program_fragment_id, req_spec_class, req_spec_desc,
                                             rescheduling=attempt)
                                 active_tasks += 1
                             elif not balancer.need_rescheduling(program_fragment_id, req_spec_class,
@@ -499,11 +504,13 @@ class VTG(klever.core.components.Component):
                                      format(program_fragment_id))
                     # Program fragments is lastly processed
                     del processing_status[program_fragment_id]
-                    del pf_descriptions[program_fragment_id]
+                    pf_ids.remove(program_fragment_id)
+                    if not self.conf['keep intermediate files']:
+                        pf_store.remove(program_fragment_id)
                     if program_fragment_id in delete_ready:
                         del delete_ready[program_fragment_id]
 
-            if active_tasks == 0 and len(pf_descriptions) == 0 and len(initial) == 0:
+            if active_tasks == 0 and len(pf_ids) == 0 and len(initial) == 0:
                 self.mqs['prepare program fragments'].put(None)
                 self.mqs['prepared verification tasks'].close()
                 if not self.conf['keep intermediate files']:
@@ -511,7 +518,7 @@ class VTG(klever.core.components.Component):
                 break
             else:
                 self.logger.debug("There are {} initial tasks to be generated, {} active tasks, {} program fragment "
-                                  "descriptions".format(len(initial), active_tasks, len(pf_descriptions)))
+                                  "descriptions".format(len(initial), active_tasks, len(pf_ids)))
 
             time.sleep(3)
 
@@ -539,7 +546,7 @@ class VTGWL(klever.core.components.Component):
         self.logger.info("Terminate VTGL worker")
 
     def vtgw_constructor(self, element):
-        program_fragment_id = element[0]['id']
+        program_fragment_id = element[0]
         req_spec_id = element[1]['identifier']
 
         attrs = None
@@ -558,7 +565,7 @@ class VTGWL(klever.core.components.Component):
 
         return VTGW(self.conf, self.logger, self.parent_id, self.callbacks, self.mqs,
                     self.vals, identifier, workdir,
-                    attrs=attrs, separate_from_parent=True, program_fragment_desc=element[0], req_spec_desc=element[1],
+                    attrs=attrs, separate_from_parent=True, program_fragment_id=element[0], req_spec_desc=element[1],
                     req_spec_class=element[2], req_spec_classes=element[3], resource_limits=element[4],
                     rerun=element[5])
 
@@ -568,12 +575,13 @@ class VTGWL(klever.core.components.Component):
 class VTGW(klever.core.components.Component):
 
     def __init__(self, conf, logger, parent_id, callbacks, mqs, vals, id=None, work_dir=None, attrs=None,
-                 separate_from_parent=False, include_child_resources=False, program_fragment_desc=None,
+                 separate_from_parent=False, include_child_resources=False, program_fragment_id=None,
                  req_spec_desc=None, req_spec_class=None, req_spec_classes=None, resource_limits=None, rerun=False):
         super(VTGW, self).__init__(conf, logger, parent_id, callbacks, mqs, vals, id, work_dir, attrs,
                                    separate_from_parent, include_child_resources)
-        self.program_fragment_desc = program_fragment_desc
-        self.program_fragment_id = program_fragment_desc['id']
+        # Program fragment description is loaded just within the worker process.
+        self.program_fragment_desc = None
+        self.program_fragment_id = program_fragment_id
         self.req_spec_desc = req_spec_desc
         self.req_spec_id = req_spec_desc['identifier']
         self.pilot_req_spec_id = req_spec_classes[req_spec_class][0]['identifier']
@@ -584,6 +592,8 @@ class VTGW(klever.core.components.Component):
         self.session = klever.core.session.Session(self.logger, self.conf['Klever Bridge'], self.conf['identifier'])
 
     def tasks_generator_worker(self):
+        self.program_fragment_desc = klever.core.utils.ProgramFragmentStore(self.conf['program fragments store'])\
+            .get(self.program_fragment_id)
         files_list_file = 'files list.txt'
         klever.core.utils.save_program_fragment_description(self.program_fragment_desc, files_list_file)
         klever.core.utils.report(
@@ -742,7 +752,7 @@ class VTGW(klever.core.components.Component):
 
                 # Plan for checking status
                 self.mqs['pending tasks'].put([
-                    [str(task_id), final_task_data["result processing"], self.program_fragment_desc,
+                    [str(task_id), final_task_data["result processing"], self.program_fragment_id,
                      self.req_spec_id, final_task_data['verifier'], final_task_data['additional sources'],
                      final_task_data['verification task files']],
                     self.rerun
@@ -757,8 +767,8 @@ class VTGW(klever.core.components.Component):
     def plugin_fail_processing(self):
         """The function has a callback in sub-job processing!"""
         self.logger.debug("VTGW that processed {!r}, {!r} failed".
-                          format(self.program_fragment_desc['id'], self.req_spec_id))
-        self.mqs['processed tasks'].put((self.program_fragment_desc['id'], self.req_spec_id, [None, None, None]))
+                          format(self.program_fragment_id, self.req_spec_id))
+        self.mqs['processed tasks'].put((self.program_fragment_id, self.req_spec_id, [None, None, None]))
 
     def join(self, timeout=None, stopped=False):
         try:
@@ -766,6 +776,6 @@ class VTGW(klever.core.components.Component):
         finally:
             if not self.conf['keep intermediate files'] and not self.is_alive():
                 self.logger.debug("Indicate that the working directory can be deleted for: {!r}, {!r}".
-                                  format(self.program_fragment_desc['id'], self.req_spec_id))
-                self.mqs['delete dir'].put([self.program_fragment_desc['id'], self.req_spec_id])
+                                  format(self.program_fragment_id, self.req_spec_id))
+                self.mqs['delete dir'].put([self.program_fragment_id, self.req_spec_id])
         return ret
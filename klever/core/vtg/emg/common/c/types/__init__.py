@@ -21,7 +21,11 @@ import sortedcontainers
 
 from klever.core.vtg.emg.common.c.types.typeParser import parse_declaration
 
-_type_collection = sortedcontainers.SortedDict()
+# Imported declarations by their strings with qualifiers. Equivalent declarations are interned here, so they are often
+# the same objects.
+_type_collection = dict()
+# Declaration objects and typedefs by imported declaration strings. This cache is valid until typedefs are changed.
+_imported_declarations = dict()
 _typedefs = sortedcontainers.SortedDict()
 _noname_identifier = 0
 
@@ -81,6 +85,10 @@ def import_typedefs(tds, dependencies):
     """
     global _typedefs
     global _type_collection
+    global _imported_declarations
+
+    # Declarations can be resolved differently with new typedefs.
+    _imported_declarations.clear()
 
     def add_file(typeast, typename, filename):
         if name in _typedefs:
@@ -133,9 +141,15 @@ def import_declaration(declaration, ast=None, track_typedef=False):
     """
     global _type_collection
     global _typedefs
+    global _imported_declarations
     typedef = None
 
-    if not ast:
+    parsed = not ast
+    if parsed:
+        if declaration in _imported_declarations:
+            ret, typedef = _imported_declarations[declaration]
+            return (ret, typedef) if track_typedef else ret
+
         try:
             ast = parse_declaration(declaration)
         except Exception:
@@ -178,27 +192,32 @@ def import_declaration(declaration, ast=None, track_typedef=False):
                     ret = Primitive(ast)
         elif ast['declarator'][-1].get('arrays'):
             ret = Array(ast)
-            if track_typedef and ret.element.typedef:
+            if ret.element.typedef:
                 typedef = ret.element.typedef
         elif ast['declarator'][-1].get('pointer'):
             ret = Pointer(ast)
-            if track_typedef and ret.points.typedef:
+            if ret.points.typedef:
                 typedef = ret.points.typedef
         else:
             raise NotImplementedError
 
-    if ret not in _type_collection:
-        _type_collection[ret] = ret
+    key = ret.str_with_qualifiers
+    if key not in _type_collection:
+        _type_collection[key] = ret
     else:
+        existing = _type_collection[key]
         if ret.typedef:
-            _type_collection[ret].typedef = ret.typedef
+            existing.typedef = ret.typedef
         if isinstance(ret, Function):
-            if ret.ret_typedef and not _type_collection[ret].ret_typedef:
-                _type_collection[ret].ret_typedef = ret.ret_typedef
-            for index, pt in enumerate(_type_collection[ret].params_typedef):
+            if ret.ret_typedef and not existing.ret_typedef:
+                existing.ret_typedef = ret.ret_typedef
+            for index, pt in enumerate(existing.params_typedef):
                 if not pt and len(ret.params_typedef) > index and ret.params_typedef[index]:
-                    _type_collection[ret].params_typedef[index] = ret.params_typedef[index]
-        ret = _type_collection[ret]
+                    existing.params_typedef[index] = ret.params_typedef[index]
+        ret = existing
+
+    if parsed:
+        _imported_declarations[declaration] = (ret, typedef)
 
     if not track_typedef:
         return ret
@@ -216,8 +235,8 @@ def _take_pointer(exp, tp):
 def _add_parent(declaration, parent):
     global _type_collection
 
-    parent = _type_collection.setdefault(parent, parent)
-    if str(parent) not in (str(e) for e in declaration.parents):
+    parent = _type_collection.setdefault(parent.str_with_qualifiers, parent)
+    if all(parent is not e and str(parent) != str(e) for e in declaration.parents):
         declaration.parents.append(parent)
 
 
@@ -230,6 +249,8 @@ class Declaration:
         self.typedef = None
         self._str = None
         self._str_no_specifiers = None
+        self._str_with_qualifiers = None
+        self._hash = None
 
     def __str__(self):
         if not self._str:
@@ -237,12 +258,17 @@ class Declaration:
         return self._str
 
     def __hash__(self):
-        return hash(self.to_string(declarator='', qualifiers=True))
+        if self._hash is None:
+            self._hash = hash(self.str_with_qualifiers)
+        return self._hash
 
     def __eq__(self, other):
         if isinstance(other, Declaration):
+            # Equivalent declarations are interned, so most often they are the same objects
+            if self is other:
+                return True
             # Apply all transformations
-            if type(self) is type(other):
+            elif type(self) is type(other):
                 if str(self) == str(other) or self.str_without_specifiers == other.str_without_specifiers:
                     return True
                 elif self.str_without_specifiers == 'void *' or other.str_without_specifiers == 'void *':
@@ -268,6 +294,12 @@ class Declaration:
             self._str_no_specifiers = self.to_string('', specifiers=False)
         return self._str_no_specifiers
 
+    @property
+    def str_with_qualifiers(self):
+        if not self._str_with_qualifiers:
+            self._str_with_qualifiers = self.to_string(declarator='', qualifiers=True)
+        return self._str_with_qualifiers
+
     @property
     def take_pointer(self):
         """
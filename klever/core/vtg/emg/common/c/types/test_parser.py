@@ -15,10 +15,19 @@
 # limitations under the License.
 #
 
-from klever.core.vtg.emg.common.c.types import import_declaration
+import logging
+import time
+
+from klever.core.vtg.emg.common.c.types import import_declaration, import_typedefs
+from klever.core.vtg.emg.common.c.types import typeParser
+
+# Functions returning declarations of tests below. They are used for benchmarking as well.
+corpus = []
 
 
 def parser_test(method):
+    corpus.append(method)
+
     def new_method(*args, **kwargs):
         for test in method(*args, **kwargs):
             obj = import_declaration(test)
@@ -254,3 +263,44 @@ def test_mess_declarations():
     return [
         'void (*((*a)(int, ...)) []) (void) []'
     ]
+
+
+def test_interning():
+    obj = import_declaration('struct usb_device *(*probe)(int, void *)')
+    assert obj is import_declaration('struct usb_device *(*probe)(int, void *)')
+    assert obj is import_declaration('struct usb_device *(*callback)(int, void *)')
+    assert obj.points.parameters[1] is import_declaration('void *a')
+    assert hash(obj) == hash(import_declaration('struct usb_device *(*)(int, void *)'))
+
+
+def test_cached_typedefs():
+    import_typedefs({'test.c': ['unsigned int test_u32']}, {})
+    assert import_declaration('test_u32 *a') is import_declaration('test_u32 *a', track_typedef=True)[0]
+    assert import_declaration('test_u32 *a', track_typedef=True)[1] == 'test_u32'
+    import_declaration('test_u32 b[10]')
+    assert import_declaration('test_u32 b[10]', track_typedef=True)[1] == 'test_u32'
+
+
+def test_parsing_benchmark():
+    declarations = [declaration for method in corpus for declaration in method()]
+
+    start = time.time()
+    typeParser.setup_parser()
+    setup_time = time.time() - start
+
+    typeParser.__parse_declaration.cache_clear()
+    start = time.time()
+    asts = [typeParser.parse_declaration(declaration) for declaration in declarations]
+    parse_time = time.time() - start
+
+    start = time.time()
+    for _ in range(10):
+        for declaration, ast in zip(declarations, asts):
+            cached_ast = typeParser.parse_declaration(declaration)
+            assert cached_ast == ast
+            # Cached abstract syntax trees should not be shared.
+            assert cached_ast is not ast
+    cached_parse_time = (time.time() - start) / 10
+
+    logging.getLogger('test').info('Parser setup: {:.3f}s, parsing {} declarations: {:.3f}s, cached parsing: {:.3f}s'
+                                   .format(setup_time, len(declarations), parse_time, cached_parse_time))
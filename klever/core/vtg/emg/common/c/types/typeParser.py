@@ -15,11 +15,17 @@
 # limitations under the License.
 #
 
+import os
 import re
+import functools
 import sortedcontainers
 import ply.lex as lex
 import ply.yacc as yacc
 
+# Module with precomputed LALR tables that is placed near this one.
+PARSER_TABLES_MODULE = 'typeParserTab'
+PARSED_DECLARATIONS_CACHE_SIZE = 10000
+
 __parser = None
 __lexer = None
 
@@ -778,30 +784,57 @@ def direct_declarator_processing(p):
     p[0] = declarator
 
 
-def setup_parser():
+def setup_parser(write_tables=False):
     """
-    Setup the parser.
+    Setup the parser. LALR tables are read from the module shipped together with the parser. They are regenerated only
+    if the grammar was changed but the module was not updated. Use write_tables flag to update it.
 
+    :param write_tables: Write regenerated parser tables to the module.
     :return: None
     """
     global __parser
     global __lexer
 
     __lexer = lex.lex()
-    __parser = yacc.yacc(debug=0, write_tables=0)
+    __parser = yacc.yacc(debug=0, write_tables=int(write_tables), tabmodule=PARSER_TABLES_MODULE,
+                         outputdir=os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=PARSED_DECLARATIONS_CACHE_SIZE)
+def __parse_declaration(string):
+    global __parser
+    global __lexer
+
+    if not __parser:
+        setup_parser()
+
+    return __parser.parse(string, lexer=__lexer)
 
 
 def parse_declaration(string):
     """
-    Parse the given C declaration string with the possible interface extensions.
+    Parse the given C declaration string with the possible interface extensions. The same declarations are parsed
+    repeatedly, so obtained abstract syntax trees are cached. Callers can modify them, so copies are returned.
 
     :param string: C declaration string.
     :return: Obtained abstract syntax tree.
     """
-    global __parser
-    global __lexer
+    return __copy_ast(__parse_declaration(string))
 
-    if not __parser:
-        setup_parser()
 
-    return __parser.parse(string, lexer=__lexer)
+def __copy_ast(ast):
+    # This is a much faster replacement of copy.deepcopy() for abstract syntax trees consisting of dictionaries, lists
+    # and immutable values.
+    if isinstance(ast, sortedcontainers.SortedDict):
+        return sortedcontainers.SortedDict((key, __copy_ast(value)) for key, value in ast.items())
+    elif isinstance(ast, dict):
+        return {key: __copy_ast(value) for key, value in ast.items()}
+    elif isinstance(ast, list):
+        return [__copy_ast(value) for value in ast]
+    else:
+        return ast
+
+
+if __name__ == '__main__':
+    # Regenerate shipped parser tables after changing the grammar.
+    setup_parser(write_tables=True)
@@ -17,7 +17,7 @@
 
 import os
 import re
-import zipfile
+import shutil
 import json
 import klever.core.utils
 
@@ -33,6 +33,12 @@ def merge_files(logger, conf, abstract_task_desc):
     """
     logger.info('Merge source files by means of CIL')
 
+    c_files = [
+        os.path.join(conf['main working directory'], extra_c_file['C file'])
+        for extra_c_file in abstract_task_desc['extra C files']
+        if 'C file' in extra_c_file
+    ]
+
     args = ['toplevel.opt'] + \
         conf.get('CIL additional opts', []) + \
         [
@@ -66,16 +72,24 @@ def merge_files(logger, conf, abstract_task_desc):
             '-print', '-print-lines', '-no-print-annot',
             '-ocode', 'cil.i',
         ] + \
-        [
-            os.path.join(conf['main working directory'], extra_c_file['C file'])
-            for extra_c_file in abstract_task_desc['extra C files']
-            if 'C file' in extra_c_file
-           ]
-
-    klever.core.utils.execute(logger, args=args, enforce_limitations=True)
-    # There will be empty file if CIL succeeded. Remove it to avoid unknown reports of whole FVTP later.
-    if os.path.isfile('problem desc.txt'):
-        os.unlink('problem desc.txt')
+        c_files
+
+    # Merged source files depend on contents of input files as well as on their paths that are referred by CIL line
+    # directives. So, they can be reused first of all when tasks are generated again for rescheduling them.
+    cache = klever.core.utils.ResultsCache(logger, os.path.join(conf['cache directory'], 'CIL'),
+                                           conf.get('CIL cache size limit'))
+    key = cache.get_key(args, [klever.core.utils.get_file_checksum(c_file) for c_file in c_files],
+                        klever.core.utils.get_tool_identity('toplevel.opt'))
+    with cache.entry(key) as (cache_dir, hit):
+        if hit:
+            logger.info('Get merged source files from cache')
+            shutil.copy(os.path.join(cache_dir, 'cil.i'), 'cil.i')
+        else:
+            klever.core.utils.execute(logger, args=args, enforce_limitations=True)
+            # There will be empty file if CIL succeeded. Remove it to avoid unknown reports of whole FVTP later.
+            if os.path.isfile('problem desc.txt'):
+                os.unlink('problem desc.txt')
+            shutil.copy('cil.i', cache_dir)
 
     logger.debug('Merged source files was outputted to "cil.i"')
 
@@ -232,8 +246,4 @@ def prepare_verification_task_files_archive(files):
     :param files: A list of files.
     :return: None
     """
-    with open('task files.zip', mode='w+b', buffering=0) as fp:
-        with zipfile.ZipFile(fp, mode='w', compression=zipfile.ZIP_DEFLATED) as zfp:
-            for file in files:
-                zfp.write(file)
-            os.fsync(zfp.fp)
+    klever.core.utils.make_zip_archive('task files.zip', ((file, None) for file in files))
@@ -17,9 +17,8 @@
 
 import os
 
-import jinja2
-
 import klever.core.vtg.plugins
+import klever.core.vtg.utils
 
 
 class TR(klever.core.vtg.plugins.Plugin):
@@ -40,24 +39,7 @@ class TR(klever.core.vtg.plugins.Plugin):
             # Here files containing rendered templates will be stored.
             self.abstract_task_desc['files'] = []
 
-            env = jinja2.Environment(
-                # All templates reside in the same directory as specifications base.
-                loader=jinja2.FileSystemLoader(os.path.dirname(self.conf['specifications base'])),
-                # This allows to start template statements with the specified prefix rather than to put them inside
-                # special "braces", e.g. in "{% ... %}" by default.
-                # "//" is the beginning of one-line C/C++ comments, so editors will likely treat these lines as
-                # comments if one will use C syntax highlighting.
-                line_statement_prefix='//',
-                # Remove excessive whitespaces. Users needn't know that they see on rendered templates.
-                trim_blocks=True,
-                lstrip_blocks=True,
-                # Keep new line at the EOF. This is required, for instance, for aspect templates since they are
-                # concatenated with other aspects after rendering.
-                keep_trailing_newline=True,
-                # Raise exception if some template value is undefined. This can happens if template or/and template
-                # context is incorrect.
-                undefined=jinja2.StrictUndefined
-            )
+            env = klever.core.vtg.utils.get_templates_environment(self.conf)
 
             for tmpl in self.conf['templates']:
                 self.logger.info('Render template "{0}"'.format(tmpl))
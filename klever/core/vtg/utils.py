@@ -18,6 +18,8 @@
 import os
 import re
 
+import jinja2
+
 import klever.core.utils
 
 
@@ -119,3 +121,56 @@ class CIFErrorFilter:
             return True
 
         return False
+
+
+# Environment with already compiled templates. It is prepared in advance by VTG, so TR plugins get it as is in forked
+# processes.
+_templates_environment = None
+
+
+def get_templates_environment(conf):
+    global _templates_environment
+
+    # All templates reside in the same directory as specifications base.
+    templates_dir = os.path.dirname(conf['specifications base'])
+    if _templates_environment and _templates_environment.loader.searchpath == [templates_dir]:
+        return _templates_environment
+
+    # Compiled templates are stored within the job cache directory. Jinja checks names and checksums of template
+    # sources when loading them, so updated templates will be compiled again.
+    bytecode_cache_dir = os.path.join(conf['cache directory'], 'templates')
+    os.makedirs(bytecode_cache_dir, exist_ok=True)
+
+    _templates_environment = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(templates_dir),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(bytecode_cache_dir),
+        # This allows to start template statements with the specified prefix rather than to put them inside
+        # special "braces", e.g. in "{% ... %}" by default.
+        # "//" is the beginning of one-line C/C++ comments, so editors will likely treat these lines as
+        # comments if one will use C syntax highlighting.
+        line_statement_prefix='//',
+        # Remove excessive whitespaces. Users needn't know that they see on rendered templates.
+        trim_blocks=True,
+        lstrip_blocks=True,
+        # Keep new line at the EOF. This is required, for instance, for aspect templates since they are
+        # concatenated with other aspects after rendering.
+        keep_trailing_newline=True,
+        # Raise exception if some template value is undefined. This can happens if template or/and template
+        # context is incorrect.
+        undefined=jinja2.StrictUndefined,
+        # Keep all templates of all requirements specifications.
+        cache_size=-1
+    )
+
+    return _templates_environment
+
+
+def preload_templates(logger, conf, templates):
+    logger.info('Compile {0} templates in advance'.format(len(templates)))
+    env = get_templates_environment(conf)
+    for tmpl in sorted(templates):
+        try:
+            env.get_template(tmpl)
+        # Let TR plugins to report incorrect templates for corresponding verification tasks.
+        except jinja2.TemplateError as e:
+            logger.warning('Could not compile template "{0}": {1}'.format(tmpl, e))
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import concurrent.futures
 import glob
 import fileinput
 import json
@@ -54,8 +55,15 @@ class Weaver(klever.core.vtg.plugins.Plugin):
         # Print stubs instead of inline Assembler since verifiers do not interpret it and even can fail.
         env['LDV_INLINE_ASM_STUB'] = ''
 
+        # Woven in C files depend on particular versions of CIF and Aspectator as well.
+        tools_version = [klever.core.utils.get_tool_identity(tool) for tool in ('cif', 'aspectator')]
+
+        self.cache = klever.core.utils.ResultsCache(self.logger, os.path.join(self.conf['cache directory'], 'weaving'),
+                                                    self.conf.get('weaving cache size limit'))
+
+        c_files = []
         for grp in self.abstract_task_desc['grps']:
-            self.logger.info('Weave in C files of group "{0}"'.format(grp['id']))
+            self.logger.info('Prepare weaving in C files of group "{0}"'.format(grp['id']))
 
             for extra_cc in grp['Extra CCs']:
                 # Each CC is either pair (compiler command identifier, compiler command type) or JSON file name
@@ -84,9 +92,9 @@ class Weaver(klever.core.vtg.plugins.Plugin):
                 # Distinguish source files having the same names.
                 outfile_unique = '{0}.c'.format(klever.core.utils.unique_file_name(os.path.splitext(os.path.basename(
                     infile))[0], '.c'))
-                # This is used for storing/getting to/from cache where uniqueness is guaranteed by other means.
+                # This is used for storing/getting to/from cache where uniqueness is guaranteed by cache keys.
                 outfile = '{0}.c'.format(os.path.splitext(os.path.basename(infile))[0])
-                self.logger.info('Weave in C file "{0}"'.format(infile))
+                self.logger.info('Prepare weaving in C file "{0}"'.format(infile))
 
                 # Produce aspect to be weaved in.
                 if 'plugin aspects' in extra_cc:
@@ -131,45 +139,48 @@ class Weaver(klever.core.vtg.plugins.Plugin):
 
                 is_model = (grp['id'] == 'models')
 
-                # Original sources should be woven in and we do not need to get cross references for them since this
-                # was already done before.
-                if not is_model:
-                    self.__weave(storage_path, cc['opts'], aspect, outfile_unique, clade, env, cwd,
-                                 aspectator_search_dir, is_model)
-                # For generated models we need to weave them in (actually, just pass through C Back-end) and to get
-                # cross references always since most likely they all are different.
-                elif 'generated' in extra_cc:
-                    self.__weave(storage_path, cc['opts'], aspect, outfile_unique, clade, env, cwd,
-                                 aspectator_search_dir, is_model)
-                    if self.conf['code coverage details'] != 'Original C source files':
-                        self.__get_cross_refs(storage_path, cc['opts'], outfile_unique, clade, cwd,
-                                              aspectator_search_dir)
-                # For non-generated models use results cache in addition.
-                else:
-                    cache_dir = os.path.join(self.conf['cache directory'],
-                                             klever.core.utils.get_file_checksum(storage_path))
-                    with klever.core.utils.LockedOpen(cache_dir + '.tmp', 'w'):
-                        if os.path.exists(cache_dir):
-                            self.logger.info('Get woven in C file from cache')
-                            self.abstract_task_desc['extra C files'].append(
-                                {'C file': os.path.relpath(os.path.join(cache_dir, os.path.basename(outfile)),
-                                                           self.conf['main working directory'])})
-                            if self.conf['code coverage details'] != 'Original C source files':
-                                self.logger.info('Get cross references from cache')
-                                self.__merge_additional_srcs(os.path.join(cache_dir, 'additional sources'))
-                        else:
-                            os.makedirs(cache_dir)
-                            self.__weave(storage_path, cc['opts'], aspect, outfile_unique, clade, env, cwd,
-                                         aspectator_search_dir, is_model)
-                            self.logger.info('Store woven in C file to cache')
-                            shutil.copy(outfile_unique, os.path.join(cache_dir, outfile))
-
-                            if self.conf['code coverage details'] != 'Original C source files':
-                                self.__get_cross_refs(storage_path, cc['opts'], outfile_unique, clade, cwd,
-                                                      aspectator_search_dir)
-                                self.logger.info('Store cross references to cache')
-                                shutil.copytree(outfile_unique + ' additional sources',
-                                                os.path.join(cache_dir, 'additional sources'))
+                # Many requirements specifications share the same aspects, so woven in C files are obtained from cache
+                # much more often than they are actually woven in.
+                if aspect:
+                    aspect = self.__store_aspect(aspect)
+                cif_args = self.__get_cif_args(storage_path, cc['opts'], aspect, clade, aspectator_search_dir, is_model)
+
+                # We do not need to get cross references for original sources since this was already done before.
+                get_cross_refs = is_model and self.conf['code coverage details'] != 'Original C source files'
+
+                key = self.cache.get_key(klever.core.utils.get_file_checksum(storage_path), cif_args, cwd,
+                                         get_cross_refs, tools_version)
+
+                # Reserve the unique file name before weaving in C files in parallel.
+                with open(outfile_unique, 'w'):
+                    pass
+
+                c_files.append((storage_path, cc['opts'], cif_args, outfile, outfile_unique, key, get_cross_refs,
+                                cwd))
+
+        # C files are woven in independently, so do this in parallel. Each worker launches CIF and Aspectator
+        # processes, so threads are enough.
+        workers_num = klever.core.utils.get_parallel_threads_num(self.logger, self.conf, 'Weaving', default=1)
+        self.logger.info('Weave in {0} C files using {1} workers'.format(len(c_files), workers_num))
+        with concurrent.futures.ThreadPoolExecutor(workers_num) as pool:
+            futures = [pool.submit(self.__weave_or_get_from_cache, clade, env, aspectator_search_dir, *c_file)
+                       for c_file in c_files]
+            # Wait for all workers and raise the exception of the first failed one if any.
+            for future in futures:
+                future.result()
+
+        # Merge results in the order of C files to get the same abstract verification task descriptions independently
+        # on the order in which workers finished.
+        for _, _, _, _, outfile_unique, _, get_cross_refs, _ in c_files:
+            self.abstract_task_desc['extra C files'].append(
+                {'C file': os.path.relpath(outfile_unique, self.conf['main working directory'])})
+            if get_cross_refs:
+                self.__merge_additional_srcs(outfile_unique + ' additional sources')
+
+        self.logger.info('Weaving cache hit rate is {0:.0%} ({1} hits of {2} C files) while it is {3:.0%} for the '
+                         'whole job'.format(self.cache.hits / max(self.cache.hits + self.cache.misses, 1),
+                                            self.cache.hits, self.cache.hits + self.cache.misses,
+                                            self.cache.hit_rate))
 
         # For auxiliary files there is no cross references since it is rather hard to get them from Aspectator. But
         # there still highlighting.
@@ -219,36 +230,96 @@ class Weaver(klever.core.vtg.plugins.Plugin):
         del (self.abstract_task_desc['grps'])
         del (self.abstract_task_desc['deps'])
 
-    def __weave(self, storage_path, opts, aspect, outfile, clade, env, cwd, aspectator_search_dir, is_model):
+    def __weave_or_get_from_cache(self, clade, env, aspectator_search_dir, storage_path, opts, cif_args, outfile,
+                                  outfile_unique, key, get_cross_refs, cwd):
+        with self.cache.entry(key) as (cache_dir, hit):
+            if hit:
+                self.logger.info('Get woven in C file "{0}" from cache'.format(outfile_unique))
+                shutil.copy(os.path.join(cache_dir, outfile), outfile_unique)
+                for aux_file in glob.glob(os.path.join(cache_dir, 'auxiliary files', '*.aux')):
+                    if not os.path.exists(os.path.basename(aux_file)):
+                        shutil.copy(aux_file, os.path.curdir)
+
+                if get_cross_refs:
+                    self.logger.info('Get cross references from cache')
+                    shutil.copytree(os.path.join(cache_dir, 'additional sources'),
+                                    outfile_unique + ' additional sources')
+            else:
+                self.logger.info('Weave in C file "{0}"'.format(storage_path))
+                aux_files = self.__weave(cif_args, outfile_unique, env, cwd)
+                self.logger.info('Store woven in C file to cache')
+                shutil.copy(outfile_unique, os.path.join(cache_dir, outfile))
+                if aux_files:
+                    os.makedirs(os.path.join(cache_dir, 'auxiliary files'))
+                    for aux_file in aux_files:
+                        shutil.copy(aux_file, os.path.join(cache_dir, 'auxiliary files'))
+
+                if get_cross_refs:
+                    self.__get_cross_refs(storage_path, opts, outfile_unique, clade, cwd, aspectator_search_dir)
+                    self.logger.info('Store cross references to cache')
+                    shutil.copytree(outfile_unique + ' additional sources',
+                                    os.path.join(cache_dir, 'additional sources'))
+
+    def __store_aspect(self, aspect):
+        # Woven in C files can refer to aspects, so keep them by content within the cache directory that outlives
+        # working directories of particular verification tasks.
+        aspects_dir = os.path.join(self.conf['cache directory'], 'aspects')
+        os.makedirs(aspects_dir, exist_ok=True)
+        stored_aspect = os.path.join(aspects_dir, klever.core.utils.get_file_checksum(aspect) + '.aspect')
+        if not os.path.isfile(stored_aspect):
+            shutil.copy(aspect, '{0}.{1}'.format(stored_aspect, os.getpid()))
+            os.replace('{0}.{1}'.format(stored_aspect, os.getpid()), stored_aspect)
+
+        return stored_aspect
+
+    def __get_cif_args(self, storage_path, opts, aspect, clade, aspectator_search_dir, is_model):
+        # These arguments do not include ones that do not affect woven in C files, so they are used as cache keys as
+        # well.
+        return [
+            '--in', storage_path,
+            # Besides header files specific for requirements specifications will be searched for.
+            '--general-opts',
+            '-I' + os.path.join(os.path.dirname(self.conf['specifications base']), 'include'),
+            '--aspect-preprocessing-opts', ' '.join(self.conf['aspect preprocessing options'])
+            if 'aspect preprocessing options' in self.conf else '',
+            '--back-end', 'src'
+        ] + \
+            (['--aspect', os.path.realpath(aspect)] if aspect else ['--stage', 'C-backend']) + \
+            ['--', '-include', 'ldv/common.h'] + \
+            klever.core.vtg.utils.prepare_cif_opts(opts, clade, is_model) + \
+            [aspectator_search_dir] + \
+            ['-I' + clade.get_storage_path(p) for p in self.conf['working source trees']]
+
+    def __weave(self, cif_args, outfile, env, cwd):
+        # Put all files produced by CIF into the separate directory since there may be several CIF processes at once.
+        weaving_dir = outfile + ' weaving'
+        os.makedirs(weaving_dir)
         klever.core.utils.execute(
             self.logger,
             tuple(
                 [
                     'cif',
-                    '--in', storage_path,
-                    # Besides header files specific for requirements specifications will be searched for.
-                    '--general-opts',
-                    '-I' + os.path.join(os.path.dirname(self.conf['specifications base']), 'include'),
-                    '--aspect-preprocessing-opts', ' '.join(self.conf['aspect preprocessing options'])
-                    if 'aspect preprocessing options' in self.conf else '',
-                    '--out', os.path.realpath(outfile),
-                    '--back-end', 'src',
+                    '--out', os.path.realpath(os.path.join(weaving_dir, outfile)),
                     '--debug', 'DEBUG'
                 ] +
                 (['--keep'] if self.conf['keep intermediate files'] else []) +
-                (['--aspect', os.path.realpath(aspect)] if aspect else ['--stage', 'C-backend']) +
-                ['--', '-include', 'ldv/common.h'] +
-                klever.core.vtg.utils.prepare_cif_opts(opts, clade, is_model) +
-                [aspectator_search_dir] +
-                ['-I' + clade.get_storage_path(p) for p in self.conf['working source trees']]
+                cif_args
             ),
             env=env,
             cwd=cwd,
             timeout=0.01,
             filter_func=klever.core.vtg.utils.CIFErrorFilter())
 
-        self.abstract_task_desc['extra C files'].append(
-            {'C file': os.path.relpath(outfile, self.conf['main working directory'])})
+        shutil.copy(os.path.join(weaving_dir, outfile), outfile)
+        aux_files = []
+        for aux_file in glob.glob(os.path.join(weaving_dir, '*.aux')):
+            shutil.copy(aux_file, os.path.curdir)
+            aux_files.append(os.path.basename(aux_file))
+
+        if not self.conf['keep intermediate files']:
+            shutil.rmtree(weaving_dir)
+
+        return aux_files
 
     def __get_cross_refs(self, storage_path, opts, outfile, clade, cwd, aspectator_search_dir):
         # Get cross references and everything required for them.
@@ -308,8 +379,6 @@ class Weaver(klever.core.vtg.plugins.Plugin):
                                        new_file, self.search_dirs)
                 cross_refs.get_cross_refs()
 
-        self.__merge_additional_srcs(outfile + ' additional sources')
-
         if not self.conf['keep intermediate files']:
             shutil.rmtree(outfile + ' clade')
 
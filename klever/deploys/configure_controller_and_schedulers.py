@@ -93,7 +93,10 @@ def configure_controller_and_schedulers(logger, development, src_dir, deploy_dir
         'job client configuration': os.path.realpath(os.path.join(deploy_dir,
                                                                   'klever-conf/native-scheduler-job-client.json')),
         'task client configuration': os.path.realpath(os.path.join(deploy_dir,
-                                                                   'klever-conf/native-scheduler-task-client.json'))
+                                                                   'klever-conf/native-scheduler-task-client.json')),
+        # Keep statistics outside the working directory which is cleaned at start
+        'resource statistics database': os.path.join(deploy_dir_abs,
+                                                     'klever-work/native-scheduler-resource-statistics.db')
     })
 
     if development:
@@ -27,6 +27,7 @@ import re
 from klever.scheduler.server import Server
 from klever.scheduler.utils import execute, process_task_results, submit_task_results, memory_units_converter, time_units_converter
 from klever.scheduler.client.options import adjust_options
+from klever.scheduler.client.cache import get_task_files_cache
 
 
 def run_benchexec(mode, file=None, configuration=None):
@@ -158,15 +159,30 @@ def solve_task(logger, conf, srv):
     if os.path.isdir('output'):
         shutil.rmtree('output', ignore_errors=True)
 
-    logger.debug("Download task")
-    ret = srv.pull_task(conf["identifier"], "task files.zip")
+    cache = get_task_files_cache(logger, conf)
+    manifest = srv.pull_task_manifest(conf["identifier"]) if cache else None
+    if manifest is not None:
+        # Download just files missing in the cache
+        missing = cache.link_members(manifest)
+        if missing:
+            logger.debug("Download {} task files".format(len(missing)))
+            ret = srv.pull_task_members(conf["identifier"], [item['name'] for item in missing], "task files.zip")
+        else:
+            ret = True
+    else:
+        logger.debug("Download task")
+        ret = srv.pull_task(conf["identifier"], "task files.zip")
+        missing = True
     if not ret:
         logger.info("Seems that the task data cannot be downloaded because of a respected reason, "
                     "so we have nothing to do there")
         os._exit(1)
 
-    with zipfile.ZipFile('task files.zip') as zfp:
-        zfp.extractall()
+    if cache and missing:
+        cache.extract('task files.zip')
+    elif not cache:
+        with zipfile.ZipFile('task files.zip') as zfp:
+            zfp.extractall()
 
     os.makedirs("output".encode("utf8"), exist_ok=True)
 
@@ -202,8 +218,12 @@ def solve_task(logger, conf, srv):
         speculative = False
         decision_results['uploaded'] = True
 
+    if conf['client'].get('solution file size limit'):
+        max_file_size = memory_units_converter(conf['client']['solution file size limit'])[0]
+    else:
+        max_file_size = None
     submit_task_results(logger, srv, "Klever", conf["identifier"], decision_results, os.path.curdir,
-                        speculative=speculative)
+                        speculative=speculative, max_file_size=max_file_size)
 
     return exit_code
 
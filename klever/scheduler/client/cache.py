@@ -0,0 +1,203 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import zipfile
+
+from klever.scheduler.utils import memory_units_converter
+
+
+class TaskFilesCache:
+    """
+    Node-local storage of files of verification tasks addressed by hashes of their contents. Tasks of the same job share
+    many files like headers, models and so on, so they are extracted just once and hard-linked to working directories of
+    tasks later. Cached files are read-only since all links share the same content. Clients of different tasks use the
+    cache concurrently, so files are added atomically and any of them can disappear due to cleaning at any moment.
+    """
+
+    def __init__(self, logger, path, max_size):
+        """
+        Prepare the cache.
+
+        :param logger: Logger object.
+        :param path: Path to the cache directory. It is better to place it at the same file system as working
+                     directories of tasks, otherwise files are copied rather than hard-linked.
+        :param max_size: Maximum size of cached files in bytes. Least recently used files are removed above it.
+        """
+        self.logger = logger
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def member_path(destination, name):
+        """
+        Get a path to extract an archive member to. Names come from Bridge, so they should not point outside.
+
+        :param destination: Directory to extract the archive to.
+        :param name: Archive member name.
+        :raise ValueError: If the name points outside the destination directory.
+        :return: Path.
+        """
+        parts = name.split('/')
+        if name.startswith('/') or '..' in parts:
+            raise ValueError("Archive member {!r} points outside the destination directory".format(name))
+        return os.path.join(destination, *(part for part in parts if part))
+
+    def link_members(self, manifest, destination=os.curdir):
+        """
+        Link cached files of the task to the destination directory.
+
+        :param manifest: List of dictionaries {"name": member name, "sha256": hash or None for directories, ...}.
+        :param destination: Directory to extract the task to.
+        :return: List of manifest items missing in the cache.
+        """
+        missing = []
+        for item in manifest:
+            path = self.member_path(destination, item['name'])
+            if item['sha256'] is None:
+                os.makedirs(path, exist_ok=True)
+            elif not self.__link(item['sha256'], path):
+                missing.append(item)
+
+        self.logger.debug("Got {} of {} task files from the cache".format(len(manifest) - len(missing), len(manifest)))
+        return missing
+
+    def extract(self, archive, destination=os.curdir):
+        """
+        Extract the archive through the cache: each member is added to the cache unless it is there already and then it
+        is linked to the destination directory.
+
+        :param archive: Path to the zip archive.
+        :param destination: Directory to extract the archive to.
+        """
+        with zipfile.ZipFile(archive) as zfp:
+            for info in zfp.infolist():
+                path = self.member_path(destination, info.filename)
+                if info.is_dir():
+                    os.makedirs(path, exist_ok=True)
+                    continue
+
+                with zfp.open(info) as fp:
+                    digest = self.__add(fp)
+                # The file can be removed by cleaning in another client just after it was added
+                while not self.__link(digest, path):
+                    with zfp.open(info) as fp:
+                        digest = self.__add(fp)
+
+        self.cleanup()
+
+    def cleanup(self):
+        """Remove least recently used files until the size of the cache becomes acceptable."""
+        entries = []
+        size = 0
+        for directory, _, files in os.walk(self.path):
+            # Skip temporary files that other clients are writing now
+            for name in (name for name in files if not name.startswith('.')):
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                size += st.st_size
+
+        if size <= self.max_size:
+            return
+
+        removed = 0
+        for _, file_size, path in sorted(entries):
+            try:
+                # Hard links in working directories of tasks keep the content until tasks are solved
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            removed += 1
+            if size <= self.max_size:
+                break
+        self.logger.debug("Removed {} least recently used files from the cache".format(removed))
+
+    def __path(self, digest):
+        return os.path.join(self.path, digest[:2], digest)
+
+    def __add(self, fp):
+        # Write the content to a temporary file first to calculate its hash and to add it atomically
+        sha256 = hashlib.sha256()
+        handle, tmp_path = tempfile.mkstemp(prefix='.', dir=self.path)
+        try:
+            with os.fdopen(handle, 'wb') as tmp:
+                for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+            digest = sha256.hexdigest()
+
+            path = self.__path(digest)
+            if not os.path.isfile(path):
+                os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return digest
+
+    def __link(self, digest, path):
+        cached = self.__path(digest)
+        os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+        if os.path.lexists(path):
+            os.unlink(path)
+
+        try:
+            os.link(cached, path)
+        except FileNotFoundError:
+            return False
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                raise
+            try:
+                shutil.copyfile(cached, path)
+            except FileNotFoundError:
+                return False
+
+        try:
+            # Modification time of files orders them for cleaning
+            os.utime(cached)
+        except FileNotFoundError:
+            pass
+        return True
+
+
+def get_task_files_cache(logger, conf):
+    """
+    Get the cache of task files if it is enabled in the client configuration.
+
+    :param logger: Logger object.
+    :param conf: Configuration dictionary.
+    :return: TaskFilesCache object or None.
+    """
+    path = conf['client'].get('task files cache directory')
+    if not path:
+        return None
+    max_size = memory_units_converter(conf['client'].get('task files cache size', '10GB'))[0]
+    return TaskFilesCache(logger, path, max_size)
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import os
 from xml.etree import ElementTree
 
 
@@ -57,4 +58,6 @@ def cpa_adjustment(file, conf):
                     rewrite = True
 
     if rewrite:
+        # The file can be a read-only hard link to the cache of task files, so replace it instead of changing it
+        os.unlink(file)
         tree.write(file, encoding='utf8')
@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import logging
+import os
+import stat
+import time
+import zipfile
+
+import pytest
+
+from klever.scheduler.client.cache import TaskFilesCache
+
+
+def make_archive(path, files):
+    with zipfile.ZipFile(path, mode='w') as zfp:
+        for name, content in files.items():
+            zfp.writestr(name, content)
+
+
+def manifest(files):
+    return [{'name': name, 'sha256': hashlib.sha256(content.encode()).hexdigest(), 'size': len(content)}
+            for name, content in files.items()]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as fp:
+        return fp.read()
+
+
+def test_extract(tmpdir):
+    cache = TaskFilesCache(logging.getLogger('test'), str(tmpdir / 'cache'), 10 ** 6)
+    common = {'header.h': 'int x;', 'models/model.c': 'void f(void) {}'}
+    make_archive(str(tmpdir / 'task1.zip'), dict(common, **{'cil.i': 'int main(void) { return 1; }'}))
+    make_archive(str(tmpdir / 'task2.zip'), dict(common, **{'cil.i': 'int main(void) { return 2; }'}))
+
+    cache.extract(str(tmpdir / 'task1.zip'), str(tmpdir / 'task1'))
+    cache.extract(str(tmpdir / 'task2.zip'), str(tmpdir / 'task2'))
+    assert read(str(tmpdir / 'task2' / 'models' / 'model.c')) == 'void f(void) {}'
+    assert read(str(tmpdir / 'task2' / 'cil.i')) == 'int main(void) { return 2; }'
+
+    # Identical files are hard-linked and they cannot be changed by solutions of tasks
+    for name in common:
+        assert os.path.samefile(str(tmpdir / 'task1' / name), str(tmpdir / 'task2' / name))
+    assert not os.path.samefile(str(tmpdir / 'task1' / 'cil.i'), str(tmpdir / 'task2' / 'cil.i'))
+    assert not os.stat(str(tmpdir / 'task1' / 'header.h')).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+    # Bridge provides a manifest, so only missing files are downloaded
+    files = dict(common, **{'cil.i': 'int main(void) { return 3; }'})
+    missing = cache.link_members(manifest(files), str(tmpdir / 'task3'))
+    assert [item['name'] for item in missing] == ['cil.i']
+    assert read(str(tmpdir / 'task3' / 'header.h')) == 'int x;'
+
+    with pytest.raises(ValueError):
+        cache.link_members([{'name': '../header.h', 'sha256': missing[0]['sha256']}], str(tmpdir / 'task4'))
+
+
+def test_cleanup(tmpdir):
+    cache = TaskFilesCache(logging.getLogger('test'), str(tmpdir / 'cache'), 250)
+    files = {'file{}'.format(i): str(i) * 100 for i in range(3)}
+    for name, content in files.items():
+        make_archive(str(tmpdir / 'task.zip'), {name: content})
+        cache.extract(str(tmpdir / 'task.zip'), str(tmpdir / name))
+        # Modification times order files
+        time.sleep(0.05)
+
+    # The least recently used file is removed, but the task keeps it
+    missing = cache.link_members(manifest(files), str(tmpdir / 'task'))
+    assert [item['name'] for item in missing] == ['file0']
+    assert read(str(tmpdir / 'file0' / 'file0')) == files['file0']
+
+    # Using a file makes it recent
+    cache.link_members(manifest({'file1': files['file1']}), str(tmpdir / 'task'))
+    time.sleep(0.05)
+    make_archive(str(tmpdir / 'task.zip'), {'file0': files['file0']})
+    cache.extract(str(tmpdir / 'task.zip'), str(tmpdir / 'task'))
+    missing = cache.link_members(manifest(files), str(tmpdir / 'task'))
+    assert [item['name'] for item in missing] == ['file2']
@@ -22,6 +22,8 @@ import queue
 import logging
 import traceback
 import threading
+import itertools
+import sortedcontainers
 
 from klever.scheduler.server import Server
 from klever.scheduler.utils.bridge import BridgeError
@@ -77,6 +79,60 @@ class ListeningThread(threading.Thread):
                 continue
 
 
+class PendingQueue:
+    """
+    Queue of pending jobs or tasks ordered by their priorities. Items of the same priority are ordered in the same way
+    as they were added to the queue even if they were removed from it and added again later.
+    """
+
+    def __init__(self):
+        self.__counter = itertools.count()
+        self.__keys = {}
+        self.__pending = sortedcontainers.SortedDict()
+
+    def __iter__(self):
+        return iter(list(self.__pending.values()))
+
+    def __len__(self):
+        return len(self.__pending)
+
+    def add(self, identifier, priority):
+        """
+        Start tracking the given item and put it to the queue.
+
+        :param identifier: Job or task identifier string.
+        :param priority: Priority string.
+        """
+        if identifier not in self.__keys:
+            self.__keys[identifier] = (sort_priority(priority), next(self.__counter))
+        self.__pending[self.__keys[identifier]] = identifier
+
+    def update(self, identifier, status):
+        """
+        Put the tracked item to the queue if it is pending and remove it from the queue otherwise.
+
+        :param identifier: Job or task identifier string.
+        :param status: Current status of the item.
+        """
+        key = self.__keys.get(identifier)
+        if key is None:
+            return
+        elif status == 'PENDING':
+            self.__pending[key] = identifier
+        else:
+            self.__pending.pop(key, None)
+
+    def remove(self, identifier):
+        """
+        Stop tracking the given item.
+
+        :param identifier: Job or task identifier string.
+        """
+        key = self.__keys.pop(identifier, None)
+        if key is not None:
+            self.__pending.pop(key, None)
+
+
 class Scheduler:
     """Class provide general scheduler API."""
 
@@ -98,6 +154,9 @@ class Scheduler:
         self._runner_class = runner_class
         self._tasks = {}
         self._jobs = {}
+        self._job_tasks = {}
+        self._pending_tasks = PendingQueue()
+        self._pending_jobs = PendingQueue()
         self._nodes = None
         self._tools = None
         self._iteration_period = 0.5
@@ -117,6 +176,9 @@ class Scheduler:
         """
         self._tasks = {}
         self._jobs = {}
+        self._job_tasks = {}
+        self._pending_tasks = PendingQueue()
+        self._pending_jobs = PendingQueue()
         self._nodes = None
         self._tools = None
         self._server_queue = queue.Queue()
@@ -184,11 +246,12 @@ class Scheduler:
                             if identifier in self._jobs and sch_status not in ('PROCESSING', 'PENDING'):
                                 self.logger.warning('Job {!r} is still tracking and has status {!r}'.
                                                     format(identifier, sch_status))
-                                del self._jobs[identifier]
+                                self._delete_job(identifier)
                             self.add_new_pending_job(identifier)
                         elif status == 'PROCESSING':
                             if sch_status in ('PENDING', 'PROCESSING'):
                                 self._jobs[identifier]['status'] = 'PROCESSING'
+                                self._update_job(identifier)
                             elif identifier not in self._jobs:
                                 self.server.submit_job_error(identifier, 'Job {!r} is not traching by the scheduler'.
                                                              format(identifier))
@@ -200,7 +263,7 @@ class Scheduler:
                                 self.runner.cancel_job(identifier, self._jobs[identifier],
                                                        self.relevant_tasks(identifier))
                             if identifier in self._jobs:
-                                del self._jobs[identifier]
+                                self._delete_job(identifier)
                         elif status == 'CORRUPTED':
                             # CORRUPTED
                             if identifier in self._jobs and self.runner.is_solving(self._jobs[identifier]):
@@ -208,18 +271,18 @@ class Scheduler:
                                 self.runner.cancel_job(identifier, self._jobs[identifier],
                                                        self.relevant_tasks(identifier))
                             if identifier in self._jobs:
-                                del self._jobs[identifier]
+                                self._delete_job(identifier)
                         elif status == 'CANCELLING':
                             # CANCELLING
                             if identifier in self._jobs and self.runner.is_solving(self._jobs[identifier]):
                                 self.runner.cancel_job(identifier, self._jobs[identifier],
                                                        self.relevant_tasks(identifier))
                             self.server.submit_job_status(identifier, self._job_status('CANCELLED'))
-                            for task_id, status in self.server.get_job_tasks(identifier):
-                                if status in ('PENDING', 'PROCESSING'):
-                                    self.server.submit_task_status(task_id, 'CANCELLED')
+                            self._submit_tasks_statuses([(task_id, 'CANCELLED', None) for task_id, status
+                                                         in self.server.get_job_tasks(identifier)
+                                                         if status in ('PENDING', 'PROCESSING')])
                             if identifier in self._jobs:
-                                del self._jobs[identifier]
+                                self._delete_job(identifier)
                         else:
                             raise NotImplementedError('Unknown job status {!r}'.format(status))
                     else:
@@ -245,20 +308,22 @@ class Scheduler:
                             if identifier in self._tasks and self.runner.is_solving(self._tasks[identifier]):
                                 self.runner.cancel_task(identifier, self._tasks[identifier])
                             if identifier in self._tasks:
-                                del self._tasks[identifier]
+                                self._delete_task(identifier)
                         else:
                             raise NotImplementedError('Unknown task status {!r}'.format(status))
             except queue.Empty:
                 pass
 
+            # Statuses of tasks changed at this iteration are submitted together at its end
+            task_statuses = []
             try:
                 for job_id, desc in list(self._jobs.items()):
                     if self.runner.is_solving(desc) and desc["status"] == "PENDING":
                         desc["status"] = "PROCESSING"
+                        self._update_job(job_id)
                     elif desc['status'] == 'PROCESSING' and \
-                        self.runner.process_job_result(
-                            job_id, desc, [tid for tid in self._tasks if desc["status"] in ["PENDING", "PROCESSING"]
-                                                                         and self._tasks[tid]["description"]["job id"] == job_id]):
+                            self.runner.process_job_result(job_id, desc, list(self._job_tasks.get(job_id, ()))):
+                        self._update_job(job_id)
                         if desc['status'] == 'FINISHED' and not desc.get('error'):
                             self.server.submit_job_status(job_id, self._job_status('SOLVED'))
                         elif desc.get('error'):
@@ -268,12 +333,13 @@ class Scheduler:
                                 if server_status == 'PENDING':
                                     desc['rescheduled'] = True
                                     desc['status'] = 'PENDING'
+                                    self._update_job(job_id)
                                     continue
                             self.server.submit_job_error(job_id, desc['error'])
                         else:
                             raise NotImplementedError("Cannot determine status of the job {!r}".format(job_id))
                         if job_id in self._jobs:
-                            del self._jobs[job_id]
+                            self._delete_job(job_id)
                     elif desc['status'] == 'PROCESSING':
                         # Request progress if it is available
                         if nth_iteration(10) and self.relevant_tasks(job_id):
@@ -284,19 +350,21 @@ class Scheduler:
                 for task_id, desc in list(self._tasks.items()):
                     if self.runner.is_solving(desc) and desc["status"] == "PENDING":
                         desc["status"] = "PROCESSING"
+                        self._update_task(task_id)
                     elif desc["status"] == "PROCESSING" and self.runner.process_task_result(task_id, desc):
+                        self._update_task(task_id)
                         if desc['status'] == 'FINISHED' and not desc.get('error'):
-                            self.server.submit_task_status(task_id, 'FINISHED')
+                            task_statuses.append((task_id, 'FINISHED', None))
                         elif desc["status"] == 'PENDING':
                             # This case is for rescheduling
                             continue
                         elif desc.get('error'):
-                            self.server.submit_task_error(task_id, desc['error'])
+                            task_statuses.append((task_id, 'ERROR', desc['error']))
                         else:
                             raise NotImplementedError("Cannot determine status of the task {!r}: {!r}".
                                                       format(task_id, desc["status"]))
                         if task_id in self._tasks:
-                            del self._tasks[task_id]
+                            self._delete_task(task_id)
 
                 # Submit tools
                 try:
@@ -316,19 +384,19 @@ class Scheduler:
                 if submit:
                     # Update resource limitations before scheduling
                     messages = dict()
-                    for i, desc in ((i, self._tasks[i]) for i in self._tasks
-                                    if self._tasks[i]["status"] == "PENDING"):
+                    for i in (i for i in self._pending_tasks if self._tasks[i]["status"] == "PENDING"):
+                        desc = self._tasks[i]
                         messages[i] = self.runner.prepare_task(i, desc)
                         if not messages[i]:
-                            self.server.submit_task_error(i, desc['error'])
-                            del self._tasks[i]
+                            task_statuses.append((i, 'ERROR', desc['error']))
+                            self._delete_task(i)
 
-                    # Schedule new tasks
-                    pending_tasks = [desc for task_id, desc in self._tasks.items() if desc["status"] == "PENDING"]
-                    pending_jobs = [desc for job_id, desc in self._jobs.items() if desc["status"] == "PENDING"
-                                    and not self.runner.is_solving(desc)]
-                    pending_jobs = sorted(pending_jobs, key=lambda i: sort_priority(i['configuration']['priority']))
-                    pending_tasks = sorted(pending_tasks, key=lambda i: sort_priority(i['description']['priority']))
+                    # Schedule new tasks. Queues keep pending jobs and tasks ordered by their priorities, but runners
+                    # can change statuses, e.g. on cancelling, so check them once again
+                    pending_tasks = [self._tasks[i] for i in self._pending_tasks
+                                     if self._tasks[i]["status"] == "PENDING"]
+                    pending_jobs = [self._jobs[i] for i in self._pending_jobs if self._jobs[i]["status"] == "PENDING"
+                                    and not self.runner.is_solving(self._jobs[i])]
 
                     tasks_to_start, jobs_to_start = self.runner.schedule(pending_tasks, pending_jobs)
                     if len(tasks_to_start) > 0 or len(jobs_to_start) > 0:
@@ -343,13 +411,14 @@ class Scheduler:
 
                         for job_id in jobs_to_start:
                             started = self.runner.solve_job(job_id, self._jobs[job_id])
+                            self._update_job(job_id)
                             if started and self._jobs[job_id]['status'] not in ('PENDING', 'PROCESSING'):
                                 raise RuntimeError('Expect that status of started job {!r} is solving but it has status'
                                                    ' {!r}'.format(self._jobs[job_id]['status'], job_id))
                             elif not started and self._jobs[job_id]['status'] == 'ERROR':
                                 self.server.submit_job_error(job_id, self._jobs[job_id]['error'])
                                 if job_id in self._jobs:
-                                    del self._jobs[job_id]
+                                    self._delete_job(job_id)
 
                         for task_id in tasks_to_start:
                             # This check is very helpful for debugging
@@ -357,25 +426,29 @@ class Scheduler:
                             if msg and isinstance(msg, str):
                                 self.logger.info(msg)
                             started = self.runner.solve_task(task_id, self._tasks[task_id])
+                            self._update_task(task_id)
                             if started and self._tasks[task_id]['status'] != 'PROCESSING':
                                 raise RuntimeError('Expect that status of started task is PROCESSING but it is {!r} '
                                                    'for {!r}'.format(self._tasks[task_id]['status'], task_id))
                             elif started and self._tasks[task_id]['status'] == 'PROCESSING':
                                 if not self._tasks[task_id].get("rescheduled"):
-                                    self.server.submit_task_status(task_id, 'PROCESSING')
+                                    task_statuses.append((task_id, 'PROCESSING', None))
                             elif not started and self._tasks[task_id]['status'] == 'PROCESSING':
                                 raise RuntimeError('In case of error task cannot be \'PROCESSING\' but it is for '
                                                    '{!r}'.format(task_id))
                             elif not started and self._tasks[task_id]['status'] == 'ERROR':
-                                self.server.submit_task_error(task_id, self._tasks[task_id]['error'])
+                                task_statuses.append((task_id, 'ERROR', self._tasks[task_id]['error']))
                                 if task_id in self._tasks:
-                                    del self._tasks[task_id]
+                                    self._delete_task(task_id)
 
                     # Flushing tasks
                     if len(tasks_to_start) > 0 or \
-                            len([True for i in self._tasks if self._tasks[i]["status"] == "PROCESSING"]) > 0:
+                            any(self._tasks[i]["status"] == "PROCESSING" for i in self._tasks):
                         self.runner.flush()
 
+                statuses, task_statuses = task_statuses, []
+                self._submit_tasks_statuses(statuses)
+
                 # Periodically check for jobs and task that have an unexpected status. This should help notice bugs
                 # related to interaction with Bridge through RabbitMQ
                 if nth_iteration(100):
@@ -384,6 +457,7 @@ class Scheduler:
                 time.sleep(self._iteration_period)
             except KeyboardInterrupt:
                 self.logger.error("Scheduler execution is interrupted, cancel all running threads")
+                self.__submit_remaining_tasks_statuses(task_statuses)
                 self.terminate()
                 self.server.stop()
                 self._listening_thread.stop()
@@ -392,6 +466,7 @@ class Scheduler:
             except Exception:
                 exception_info = 'An error occured:\n{}'.format(traceback.format_exc().rstrip())
                 self.logger.error(exception_info)
+                self.__submit_remaining_tasks_statuses(task_statuses)
                 self.terminate()
                 self._listening_thread.stop()
                 self._listening_thread.join()
@@ -493,10 +568,11 @@ class Scheduler:
                 "status": "PENDING",
                 "configuration": job_conf['configuration']
             }
+            self._pending_jobs.add(identifier, job_conf['configuration']['priority'])
             prepared = self.runner.prepare_job(identifier, self._jobs[identifier])
             if not prepared:
                 self.server.submit_job_error(identifier, self._jobs[identifier]['error'])
-                del self._jobs[identifier]
+                self._delete_job(identifier)
         else:
             self.logger.warning('Attempt to schedule job {} second time but it already has status {}'.
                                 format(identifier, self._jobs[identifier]['status']))
@@ -520,6 +596,8 @@ class Scheduler:
                 "description": task_conf['description'],
                 "priority": task_conf['description']["priority"]
             }
+            self._job_tasks.setdefault(task_conf['description']["job id"], {})[identifier] = None
+            self._pending_tasks.add(identifier, task_conf['description']["priority"])
 
             self.logger.debug("Prepare new task {!r} before launching".format(identifier))
             # Add missing restrictions
@@ -536,7 +614,7 @@ class Scheduler:
                 prepared = self.runner.prepare_task(identifier, self._tasks[identifier])
                 if not prepared:
                     self.server.submit_task_error(identifier, self._tasks[identifier]['error'])
-                    del self._tasks[identifier]
+                    self._delete_task(identifier)
         else:
             self.logger.warning('Attempt to schedule job {} second time but it already has status {}'.
                                 format(identifier, self._tasks[identifier]['status']))
@@ -548,9 +626,80 @@ class Scheduler:
         :param job_id: Relevant job identifier.
         :return: List of dictionaries.
         """
-        return [self._tasks[tid] for tid in self._tasks
-                if self._tasks[tid]["status"] in ["PENDING", "PROCESSING"]
-                and self._tasks[tid]["description"]["job id"] == job_id]
+        return [self._tasks[tid] for tid in self._job_tasks.get(job_id, ())
+                if self._tasks[tid]["status"] in ["PENDING", "PROCESSING"]]
+
+    def _submit_tasks_statuses(self, statuses):
+        """
+        Submit new statuses of tasks to Bridge. Several statuses are submitted by a single request to avoid a round trip
+        per task.
+
+        :param statuses: List of tuples (task identifier, status, error).
+        """
+        if len(statuses) == 1:
+            task_id, status, error = statuses[0]
+            if status == 'ERROR':
+                self.server.submit_task_error(task_id, error)
+            else:
+                self.server.submit_task_status(task_id, status)
+        elif statuses:
+            errors = self.server.submit_tasks_statuses(statuses)
+            for task_id, error in errors.items():
+                self.logger.warning("Bridge has not changed the status of task {!r}: {!r}".format(task_id, error))
+
+    def __submit_remaining_tasks_statuses(self, statuses):
+        """
+        Submit statuses of tasks collected at the interrupted iteration. These tasks are not tracked any more, so they
+        would be reported as cancelled on termination otherwise.
+
+        :param statuses: List of tuples (task identifier, status, error).
+        """
+        try:
+            self._submit_tasks_statuses(statuses)
+        except Exception as err:
+            self.logger.warning("Cannot submit statuses of tasks before termination: {!r}".format(err))
+
+    def _update_job(self, identifier):
+        """
+        Put the job to the queue of pending jobs or remove it from there according to its current status.
+
+        :param identifier: Job identifier string.
+        """
+        if identifier in self._jobs:
+            self._pending_jobs.update(identifier, self._jobs[identifier]["status"])
+
+    def _delete_job(self, identifier):
+        """
+        Stop tracking the job.
+
+        :param identifier: Job identifier string.
+        """
+        del self._jobs[identifier]
+        self._pending_jobs.remove(identifier)
+
+    def _update_task(self, identifier):
+        """
+        Put the task to the queue of pending tasks or remove it from there according to its current status.
+
+        :param identifier: Task identifier string.
+        """
+        if identifier in self._tasks:
+            self._pending_tasks.update(identifier, self._tasks[identifier]["status"])
+
+    def _delete_task(self, identifier):
+        """
+        Stop tracking the task.
+
+        :param identifier: Task identifier string.
+        """
+        desc = self._tasks.pop(identifier)
+        self._pending_tasks.remove(identifier)
+
+        # Dictionaries are used instead of sets to keep the order in which tasks were added
+        job_tasks = self._job_tasks.get(desc["description"]["job id"], {})
+        job_tasks.pop(identifier, None)
+        if not job_tasks:
+            self._job_tasks.pop(desc["description"]["job id"], None)
 
     def cancel_all_tasks(self):
         """Cancel and delete all jobs and tasks before terminating or restarting scheduler."""
@@ -28,6 +28,8 @@ import klever.scheduler.schedulers as schedulers
 import klever.scheduler.schedulers.runners as runners
 import klever.scheduler.schedulers.resource_scheduler as resource_scheduler
 import klever.scheduler.utils as utils
+import klever.scheduler.utils.consul as consul
+import klever.scheduler.utils.supervisor as supervisor
 
 
 class Native(runners.Speculative):
@@ -38,11 +40,14 @@ class Native(runners.Speculative):
     _node_name = None
     _cpu_cores = None
     _pool = None
+    _supervisor = None
+    _watcher = None
     _job_conf_prototype = dict()
     _reserved = {"jobs": {}, "tasks": {}}
     _job_processes = dict()
     _task_processes = dict()
     __cached_tools_data = None
+    __cached_tools_mtime = None
     __cached_nodes_data = None
 
     @staticmethod
@@ -56,6 +61,8 @@ class Native(runners.Speculative):
         self._kv_url = None
         self._job_conf_prototype = None
         self._pool = None
+        self._supervisor = None
+        self._watcher = None
         self._client_bin = None
         self._manager = None
         self._log_file = 'info.log'
@@ -71,6 +78,9 @@ class Native(runners.Speculative):
         if "controller address" not in self.conf["scheduler"]:
             raise KeyError("Provide configuration property 'scheduler''controller address'")
         self._kv_url = self.conf["scheduler"]["controller address"]
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
 
         # Import job configuration prototype
         with open(self.conf["scheduler"]["job client configuration"], encoding="utf8") as fh:
@@ -93,7 +103,8 @@ class Native(runners.Speculative):
             concurrent_jobs = self.conf["scheduler"]["concurrent jobs"]
         else:
             concurrent_jobs = 1
-        self._manager = resource_scheduler.ResourceManager(self.logger, concurrent_jobs)
+        self._manager = resource_scheduler.ResourceManager(self.logger, concurrent_jobs,
+                                                           self.conf["scheduler"].get("debug resource manager", False))
 
         if "wait controller initialization" in self.conf["scheduler"]:
             wc = self.conf["scheduler"]["wait controller initialization"]
@@ -108,6 +119,10 @@ class Native(runners.Speculative):
             data = self._manager.node_info(self._node_name)
             self._cpu_cores = data["CPU number"]
 
+        # Further get information about nodes only when it changes
+        self._watcher = consul.KVWatcher(self.logger, self._kv_url)
+        self._watcher.start()
+
         # init process pull
         if "processes" not in self.conf["scheduler"]:
             raise KeyError("Provide configuration property 'scheduler''processes' to set "
@@ -134,6 +149,15 @@ class Native(runners.Speculative):
         else:
             self._pool = concurrent.futures.ThreadPoolExecutor(max_processes)
 
+        # Start clients directly from the scheduler process instead of running them by workers of the pool through
+        # intermediate processes
+        if self._supervisor:
+            self._supervisor.stop()
+            self._supervisor = None
+        if self.conf["scheduler"].get("supervise clients directly"):
+            self.logger.info("Start clients of tasks and jobs directly")
+            self._supervisor = supervisor.Supervisor()
+
         # Check client bin
         self._client_bin = os.path.abspath(os.path.join(os.path.dirname(sys.executable), "klever-scheduler-client"))
 
@@ -165,6 +189,11 @@ class Native(runners.Speculative):
 
         # Be sure that workers are killed
         self._pool.shutdown(wait=False)
+        if self._supervisor:
+            self._supervisor.stop()
+
+        if self._watcher:
+            self._watcher.stop()
 
     def update_nodes(self, wait_controller=False):
         """
@@ -175,7 +204,19 @@ class Native(runners.Speculative):
         """
         # todo: Need refactoring!
         # Use resource mamanger to manage resources
-        cacnel_jobs, cancel_tasks = self._manager.update_system_status(self._kv_url, wait_controller)
+        if self._watcher and not wait_controller:
+            changes = self._watcher.get_changes()
+            if changes:
+                try:
+                    cacnel_jobs, cancel_tasks = self._manager.apply_system_status(*changes)
+                except Exception:
+                    # Try to process the same changes at the next iteration
+                    self._watcher.reset()
+                    raise
+            else:
+                cacnel_jobs, cancel_tasks = [], []
+        else:
+            cacnel_jobs, cancel_tasks = self._manager.update_system_status(self._kv_url, wait_controller)
         # todo: how to provide jobs or tasks to cancel?
         if len(cancel_tasks) > 0 or len(cacnel_jobs) > 0:
             self.logger.warning("Need to cancel jobs {} and tasks {} to avoid deadlocks, since resources has been "
@@ -187,6 +228,11 @@ class Native(runners.Speculative):
         Generate a dictionary with available verification tools and push it to the server.
         """
         # todo: Need refactoring!
+        # Do not read the configuration until it is modified
+        mtime = os.stat(self.conf["scheduler"]["task client configuration"]).st_mtime_ns
+        if mtime == self.__cached_tools_mtime:
+            return
+
         data = self._get_task_configuration()
         if not self.__cached_tools_data or str(data) != self.__cached_tools_data:
             self.__cached_tools_data = str(data)
@@ -194,6 +240,7 @@ class Native(runners.Speculative):
 
             # Submit tools
             self.server.submit_tools(verification_tools)
+        self.__cached_tools_mtime = mtime
 
     def _solve_task(self, identifier, description, user, password):
         """
@@ -208,6 +255,8 @@ class Native(runners.Speculative):
         self.logger.debug("Start solution of task {!r}".format(identifier))
         self._prepare_solution(identifier, description, mode='task')
         self._manager.claim_resources(identifier, description, self._node_name, job=False)
+        if self._supervisor:
+            return self._supervisor.submit(self._task_processes[identifier])
         return self._pool.submit(self._execute, self._log_file, self._task_processes[identifier])
 
     def _solve_job(self, identifier, configuration):
@@ -221,6 +270,8 @@ class Native(runners.Speculative):
         self.logger.debug("Start solution of job {!r}".format(identifier))
         self._prepare_solution(identifier, configuration['configuration'], mode='job')
         self._manager.claim_resources(identifier, configuration, self._node_name, job=True)
+        if self._supervisor:
+            return self._supervisor.submit(self._job_processes[identifier])
         return self._pool.submit(self._execute, self._log_file, self._job_processes[identifier])
 
     def flush(self):
@@ -328,7 +379,10 @@ class Native(runners.Speculative):
             timeout = int((configuration["resource limits"]["CPU time"] * 1.5) / 100)
         else:
             timeout = None
-        process = multiprocessing.Process(None, self._process_starter, identifier, [timeout, args])
+        if self._supervisor:
+            process = supervisor.SupervisedProcess(identifier, args)
+        else:
+            process = multiprocessing.Process(None, self._process_starter, identifier, [timeout, args])
 
         if mode == 'task':
             client_conf["Klever Bridge"] = self.conf["Klever Bridge"]
@@ -15,14 +15,138 @@
 # limitations under the License.
 #
 import requests
-import consulate
 import json
 import copy
+import heapq
 import time
 from klever.scheduler.utils import higher_priority, sort_priority
+from klever.scheduler.utils.consul import get_consul
 from klever.scheduler.schedulers import SchedulerException
 
 
+def free_resources(conf):
+    """
+    Calculate the amount of free resources for given node.
+
+    :param conf: A node configuration.
+    :return: [available CPU cores number, available RAM memory, available disk space].
+    """
+    def f(x):
+        return x if x > 0 else 0
+
+    cpu_number = conf["available CPU number"] - conf["reserved CPU number"]
+    ram_memory = conf["available RAM memory"] - conf["reserved RAM memory"]
+    disk_memory = conf["available disk memory"] - conf["reserved disk memory"]
+
+    return [f(cpu_number), f(ram_memory), f(disk_memory)]
+
+
+class NodesQueue:
+    """
+    The class keeps nodes available for tasks in the heap ordered increasing free resources, so the first suitable node
+    is the same as the first one in the nodes ranking of the resource manager. Resources are reserved as deltas that can
+    be rolled back.
+    """
+
+    def __init__(self, system_status):
+        """
+        Prepare the queue of nodes.
+
+        :param system_status: A system status dictionary. Reservations are applied to it.
+        """
+        self.__system_status = system_status
+        self.__heap = []
+        # Actual heap items for nodes. Other heap items for the same nodes are outdated and they are skipped.
+        self.__items = {}
+        # Nodes with the same free resources are ordered like in the system status.
+        self.__order = {}
+        self.__reservations = []
+        # Restrictions that can not be satisfied. Free resources only decrease until rollback, so more strict
+        # restrictions can not be satisfied as well.
+        self.__unsatisfiable = []
+
+        for order, node in enumerate(system_status):
+            if system_status[node]['available for tasks']:
+                self.__order[node] = order
+                self.__push(node)
+
+    def select(self, restriction):
+        """
+        Find the node with the least amount of free resources that is enough to run a task.
+
+        :param restriction: A dictionary with the resource restrictions.
+        :return: A node name or None if there is no such node.
+        """
+        for model, cpu_number, ram_memory, disk_memory in self.__unsatisfiable:
+            if (not model or model == restriction['CPU model']) and \
+                    cpu_number <= restriction["number of CPU cores"] and ram_memory <= restriction["memory size"] and \
+                    disk_memory <= restriction["disk memory size"]:
+                return None
+
+        popped = []
+        selected = None
+        while self.__heap:
+            item = heapq.heappop(self.__heap)
+            cpu_number, ram_memory, disk_memory, _, node = item
+            if self.__items[node] is not item:
+                continue
+
+            popped.append(item)
+            if (not restriction['CPU model'] or restriction['CPU model'] == self.__system_status[node]['CPU model']) \
+                    and cpu_number >= restriction["number of CPU cores"] and ram_memory >= restriction["memory size"] \
+                    and disk_memory >= restriction["disk memory size"]:
+                selected = node
+                break
+
+        for item in popped:
+            heapq.heappush(self.__heap, item)
+
+        if not selected:
+            self.__unsatisfiable.append((restriction['CPU model'], restriction["number of CPU cores"],
+                                         restriction["memory size"], restriction["disk memory size"]))
+
+        return selected
+
+    def reserve(self, amount, node):
+        """
+        Reserve given amount of resources at given node.
+
+        :param amount: A dictionary with resource restrictions.
+        :param node: A node name.
+        """
+        self.__apply(amount, node, 1)
+        self.__reservations.append((amount, node))
+
+    def rollback(self):
+        """
+        Release all resources reserved by the queue.
+        """
+        while self.__reservations:
+            amount, node = self.__reservations.pop()
+            self.__apply(amount, node, -1)
+        self.__unsatisfiable = []
+
+    def __apply(self, amount, node, sign):
+        for st, vt, at in [["reserved CPU number", "number of CPU cores", "available CPU number"],
+                           ["reserved RAM memory", "memory size", "available RAM memory"],
+                           ["reserved disk memory", "disk memory size", "available disk memory"]]:
+            self.__system_status[node][st] += sign * amount[vt]
+            if self.__system_status[node][st] > self.__system_status[node][at]:
+                raise ValueError("{}, equal to {}, cannot be more than {} which is {}".
+                                 format(st.capitalize(), self.__system_status[node][st], at,
+                                        self.__system_status[node][at]))
+            if self.__system_status[node][st] < 0:
+                raise ValueError("{} cannot be negative {}".format(st.capitalize(), self.__system_status[node][st]))
+
+        if node in self.__order:
+            self.__push(node)
+
+    def __push(self, node):
+        item = tuple(free_resources(self.__system_status[node])) + (self.__order[node], node)
+        self.__items[node] = item
+        heapq.heappush(self.__heap, item)
+
+
 class ResourceManager:
     """
     The class is in charge of resource management. It tracks all resources of the system consisting of several
@@ -32,18 +156,23 @@ class ResourceManager:
     any specific actions to prepare, start or cancel jobs or tasks.
     """
 
-    def __init__(self, logger, max_jobs=1):
+    def __init__(self, logger, max_jobs=1, debug=False):
         """
         Initiaize the manager of resources.
 
         :param max_jobs: The maximum number of running jobs with the same or higher priority.
+        :param debug: Compare incrementally calculated resources reserved for running tasks with ones calculated from
+                      scratch each time they are used.
         """
         self.__logger = logger
         self.__max_running_jobs = max_jobs
+        self.__debug = debug
         self.__system_status = {}
         self.__cached_system_status = None
         self.__jobs_config = {}
         self.__tasks_config = {}
+        # Resources reserved for running tasks at each node.
+        self.__tasks_reserved = {}
 
         self.__logger.info("Resource manager is live now with max running jobs limitation is {}".format(max_jobs))
 
@@ -64,7 +193,7 @@ class ResourceManager:
                                  format(kv_url, r.status_code, r.reason))
             nds = r.json()
             nds = [data["Node"] for data in nds]
-            sess = consulate.Consul()
+            sess = get_consul()
             # test
             if len(nds) == 0:
                 raise KeyError("Expect at least one working node to operate")
@@ -83,10 +212,28 @@ class ResourceManager:
         else:
             nodes, session = request(url)
 
+        # Get states of all nodes by a single request
+        states = session.txn([{"Verb": "get", "Key": "states/" + node} for node in nodes])
+        return self.apply_system_status(nodes, {item["Key"][len("states/"):]: item["Value"] for item in states})
+
+    def apply_system_status(self, nodes, states):
+        """
+        Update the system status according to the given information about connected nodes. If a user reduces an amount
+        of available resources the method checks the invariant and reports jobs and tasks to cancel to prevent
+        scheduling deadlocks.
+
+        :param nodes: List of names of connected nodes.
+        :param states: Dictionary with JSON strings describing states of nodes saved by controllers.
+        :raise KeyError: If there are no connected nodes or there is no state of some connected node.
+        :return: [list of identifiers of jobs to cancel], [list of identifiers of tasks to cancel].
+        """
+        if len(nodes) == 0:
+            raise KeyError("Expect at least one working node to operate")
+
         cancel_jobs = []
         cancel_tasks = []
         for node in nodes:
-            string = session.kv["states/" + node]
+            string = states[node]
             node_status = json.loads(string)
 
             # Get dictionary and compare it with existing one
@@ -122,6 +269,7 @@ class ResourceManager:
                 self.__system_status[node]["reserved disk memory"] = 0
                 self.__system_status[node]["running verification jobs"] = []
                 self.__system_status[node]["running verification tasks"] = []
+                self.__tasks_reserved[node] = {"number of CPU cores": 0, "memory size": 0, "disk memory size": 0}
 
         # Check disconnected nodes
         for missing in (n for n in self.__system_status if n not in nodes):
@@ -243,12 +391,13 @@ class ResourceManager:
         schedule_jobs(filtered_jobs)
 
         # Schedule all posible tasks
+        nodes_queue = NodesQueue(status)
         for task in reversed(pending_tasks):
-            node = self.__schedule_task(task, status=status)
+            node = nodes_queue.select(task['description']['resource limits'])
             if node:
                 tasks_to_run.append([task, node])
                 # Remove these resources from status
-                self.__reserve_resources(status, task['description']['resource limits'], node)
+                nodes_queue.reserve(task['description']['resource limits'], node)
 
         # Filter jobs that have the same or a higher priority than the current highest priority
         filtered_jobs = [j for j in pending_jobs if higher_priority(j['configuration']['priority'], highest_priority)]
@@ -283,6 +432,8 @@ class ResourceManager:
 
         self.__reserve_resources(self.__system_status, conf, node)
         self.__system_status[node][tag].append(identifier)
+        if not job:
+            self.__update_tasks_reserved(conf, node, 1)
 
     def release_resources(self, identifier, node, job=False, keep_disk=0):
         """
@@ -309,6 +460,8 @@ class ResourceManager:
 
         # Minus resources
         self.__release_resources(self.__system_status, conf, node)
+        if not job:
+            self.__update_tasks_reserved(conf, node, -1)
 
         # Remove running task or job and delete config of task or job
         del collection[identifier]
@@ -448,25 +601,6 @@ class ResourceManager:
 
         return None
 
-    def __schedule_task(self, task, status=None):
-        """
-        Check whether provided task can be started in the system.
-
-        :param task: A task description dictionary.
-        :param status: A custom status dictionary and if it the manager's system status should not be used.
-        :return: A node name where the task can be started or None if there is no such node.
-        """
-        # Available resources
-        if not status:
-            status = self.__system_status
-
-        # Ranking of available resources
-        nodes = self.__nodes_ranking(status, task['description']['resource limits'])
-        if len(nodes) > 0:
-            return nodes[0]
-        else:
-            return None
-
     def __check_invariant(self, job=None):
         """
         Check that the invariant is preserved in the system and no deadlocks will happen. If a job is provided check
@@ -603,14 +737,31 @@ class ResourceManager:
             for j, node in (j for j in self.__processing_jobs if j not in kj):
                 self.__release_resources(s, self.__jobs_config[j]['configuration']['resource limits'], node)
 
-        # Copy system status to calculatepotentially available resources
-        status = copy.deepcopy(self.__system_status)
+        # Copy system status to calculate potentially available resources. Just resources of nodes are changed, so there
+        # is no need to copy lists of running jobs and tasks.
+        status = {node: dict(node_status) for node, node_status in self.__system_status.items()}
 
         # Free there all task resources but reserve all max task resources
         if not keep_tasks:
             keep_tasks = []
         if delete_tasks:
-            relaease_all_tasks(status, keep_tasks)
+            if keep_tasks:
+                relaease_all_tasks(status, keep_tasks)
+            else:
+                # Resources reserved for all running tasks are known for each node, so there is no need to consider
+                # tasks one by one.
+                for node in status:
+                    self.__release_resources(status, self.__tasks_reserved[node], node)
+
+                if self.__debug:
+                    expected_status = copy.deepcopy(self.__system_status)
+                    relaease_all_tasks(expected_status)
+                    for node in status:
+                        for resource in ("reserved CPU number", "reserved RAM memory", "reserved disk memory"):
+                            if status[node][resource] != expected_status[node][resource]:
+                                raise ValueError("{} at node {!r} without running tasks is {} while it should be {}"
+                                                 .format(resource.capitalize(), node, status[node][resource],
+                                                         expected_status[node][resource]))
 
         if not keep_jobs:
             keep_jobs = []
@@ -619,6 +770,17 @@ class ResourceManager:
 
         return status
 
+    def __update_tasks_reserved(self, amount, node, sign):
+        """
+        Update resources reserved for running tasks at given node.
+
+        :param amount: A dictionary with the resource limits of the task.
+        :param node: A node name string.
+        :param sign: 1 if the task starts and -1 if it finishes.
+        """
+        for resource in self.__tasks_reserved[node]:
+            self.__tasks_reserved[node][resource] += sign * amount[resource]
+
     def __nodes_ranking(self, system_status, restriction, job=True):
         """
         Get restrictions and return list of nodes where such amount of resources can be reserved. Nodes are sorted
@@ -630,7 +792,7 @@ class ResourceManager:
         :return: A list of node names sorted reducing the workload.
         """
         suitable = [n for n in system_status.keys() if self.__fulfill_requirement(system_status[n], restriction, job)]
-        return sorted(suitable, key=lambda x: self.__free_resources(system_status[x]))
+        return sorted(suitable, key=lambda x: free_resources(system_status[x]))
 
     def __fulfill_requirement(self, node, restriction, job=True):
         """
@@ -653,7 +815,7 @@ class ResourceManager:
             return False
 
         # Check rest resources
-        cpu_number, ram_memory, disk_memory = self.__free_resources(node)
+        cpu_number, ram_memory, disk_memory = free_resources(node)
 
         if cpu_number >= restriction["number of CPU cores"] and ram_memory >= restriction["memory size"] and \
                 disk_memory >= restriction["disk memory size"]:
@@ -706,20 +868,3 @@ class ResourceManager:
                                  format(st.capitalize(), system_status[node][st]))
 
         return
-
-    @staticmethod
-    def __free_resources(conf):
-        """
-        Calculate the amount of free resources for given node.
-
-        :param conf: A node configuration.
-        :return: [available CPU cores number, available RAM memory, available disk space].
-        """
-        def f(x):
-            return x if x > 0 else 0
-
-        cpu_number = conf["available CPU number"] - conf["reserved CPU number"]
-        ram_memory = conf["available RAM memory"] - conf["reserved RAM memory"]
-        disk_memory = conf["available disk memory"] - conf["reserved disk memory"]
-
-        return [f(cpu_number), f(ram_memory), f(disk_memory)]
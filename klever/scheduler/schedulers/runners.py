@@ -18,6 +18,12 @@
 import math
 import klever.scheduler.utils as utils
 from klever.scheduler.schedulers import SchedulerException
+from klever.scheduler.utils.statistics import ResourceStatistics
+
+# Number of solutions for a requirement necessary to estimate memory consumption of other tasks
+MIN_SOLUTIONS = 5
+# Program fragments change between jobs, so give them more memory than they consumed last time
+FRAGMENT_MEMORY_MARGIN = 1.2
 
 
 def incmean(prevmean, n, x):
@@ -427,6 +433,9 @@ class SpeculativeSimple(Runner):
         self._problematic = dict()
         # Data about job tasks
         self._jdata = dict()
+        # Resources consumed by tasks of this and previous jobs
+        self._statistics = ResourceStatistics(self.conf["scheduler"].get("resource statistics database"))
+        self._memory_quantile = self.conf["scheduler"].get("speculative memory quantile", 0.95)
 
     def prepare_task(self, identifier, item):
         """
@@ -474,7 +483,7 @@ class SpeculativeSimple(Runner):
         status = super(SpeculativeSimple, self).process_task_result(identifier, item)
         if status and solution:
             solved = self._add_solution(item["description"]["job id"], item["description"]["solution class"],
-                                        identifier, solution)
+                                        identifier, solution, self._program_fragment(item["description"]))
             if not solved:
                 # We need to prepare task again to set new resource limitations to configuration files and solve it
                 # once again
@@ -545,6 +554,7 @@ class SpeculativeSimple(Runner):
         # Clean data
         self._problematic = dict()
         self._jdata = dict()
+        self._statistics.close()
 
     def add_job_progress(self, identifier, item, progress):
         """
@@ -664,30 +674,57 @@ class SpeculativeSimple(Runner):
         elif self._is_there(job_identifier, attribute, identifier):
             limits = dict(qos)
             message = 'Set QoS limit for the task {}'.format(identifier)
-        elif not job.get("total tasks", None) or job.get("solved", 0) <= (0.05 * job.get("total tasks", 0)):
-            message += 'We have not enough solved tasks (5%) to yield speculative limit'
-        elif not job["limits"][attribute]["statistics"] or job["limits"][attribute]["statistics"]["number"] <= 5:
-            message += 'We have not solved at least 5 tasks to estimate average consumption'
         else:
-            statistics = job["limits"][attribute]["statistics"]
-            if int(statistics['mean mem']) < 0:
-                raise ValueError('Mean memory is negative: {}'.format(int(statistics['mean mem'])))
-            if int(statistics['memdev']) < 0:
-                raise ValueError('Memory deviation is negative: {}'.format(int(statistics['memdev'])))
-            limits['memory size'] = int(statistics['mean mem']) + 2 * int(statistics['memdev'])
-            if limits['memory size'] < qos['memory size']:
+            estimation = self._estimate_memory(item["description"])
+            if estimation is None:
+                message += 'We have not solved at least {} tasks of category {!r} to estimate memory consumption'.\
+                           format(MIN_SOLUTIONS, attribute)
+            elif estimation < 0:
+                raise ValueError('Estimated memory is negative: {}'.format(estimation))
+            elif estimation < qos['memory size']:
+                limits['memory size'] = estimation
                 message = "Try running task {} with a speculative limitation {}B".\
                           format(identifier, limits['memory size'])
                 speculative = True
             else:
-                message += "Estimation {}B is too high.".format(limits['memory size'])
-                limits = dict(job_limitations)
+                message += "Estimation {}B is too high.".format(estimation)
 
         element["limitation"] = limits
         item["description"]["resource limits"] = limits
         item["description"]["speculative"] = speculative
         return message
 
+    def _estimate_memory(self, description):
+        """
+        Estimate memory consumption of the task. If the same program fragment was checked against the requirement before
+        then use its previous consumption. Otherwise use the quantile of consumption by other tasks of the requirement
+        solved in this and previous jobs.
+
+        :param description: Description of the task.
+        :return: Memory size in bytes or None if there are not enough solutions yet.
+        """
+        attribute = description["solution class"]
+        fragment = self._program_fragment(description)
+        memory = self._statistics.fragment_memory(attribute, fragment) if fragment else None
+        if memory is not None:
+            return int(memory * FRAGMENT_MEMORY_MARGIN)
+        if self._statistics.number(attribute) < MIN_SOLUTIONS:
+            return None
+        return int(self._statistics.memory_quantile(attribute, self._memory_quantile))
+
+    @staticmethod
+    def _program_fragment(description):
+        """
+        Get the program fragment of the task. Klever Core identifies tasks as "program fragment/requirement".
+
+        :param description: Description of the task.
+        :return: Program fragment identifier or None.
+        """
+        suffix = "/{}".format(description["solution class"])
+        if description.get("id", "").endswith(suffix):
+            return description["id"][:-len(suffix)]
+        return None
+
     def _add_statisitcs(self, job, attribute, resources):
         """
         Add statistics collected after task solution.
@@ -722,7 +759,7 @@ class SpeculativeSimple(Runner):
             memdev = devn(newsum, statistics['number'])
             statistics.update({'mean mem': newmean, 'memsum': newsum, 'memdev': memdev})
 
-    def _add_solution(self, job_identifier, attribute, identifier, solution):
+    def _add_solution(self, job_identifier, attribute, identifier, solution, fragment=None):
 
         """
         Save solution and return is this solution is final or not.
@@ -731,6 +768,7 @@ class SpeculativeSimple(Runner):
         :param attribute: Attribute given to the job to classify it.
         :param identifier: Identifier of the task.
         :param solution: Data from the task solution.
+        :param fragment: Program fragment of the task.
         :return: True if task is solved.
         """
         status = solution["status"]
@@ -750,6 +788,7 @@ class SpeculativeSimple(Runner):
             if solution['uploaded']:
                 self._del_task(job_identifier, attribute, identifier)
                 self._add_statisitcs(job, attribute, resources)
+                self._statistics.add(attribute, fragment, resources['memory size'], resources['CPU time'])
                 self.logger.info("Accept task {}".format(identifier))
                 return True
             else:
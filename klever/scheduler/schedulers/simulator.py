@@ -0,0 +1,738 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Offline simulation of the native scheduler. The scheduler loop, the speculative runner and the resource manager work as
+usual, but Bridge, RabbitMQ, consul and nodes running verifiers are replaced by objects living in memory. Verifiers
+solve tasks in virtual time, so the simulation of thousands of tasks takes just the time spent by the scheduler itself.
+It is the reference benchmark for optimizations of the scheduler loop, the resource manager and the runners.
+"""
+
+import argparse
+import concurrent.futures
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import random
+import statistics
+import time
+
+import klever.scheduler.schedulers.runners as runners
+import klever.scheduler.schedulers.resource_scheduler as resource_scheduler
+import klever.scheduler.utils as utils
+import klever.scheduler.utils.consul as consul
+from klever.scheduler.schedulers import Scheduler
+from klever.scheduler.utils.statistics import quantile
+
+REQUIREMENTS = ('linux:memory safety', 'linux:drivers:clk1', 'linux:kernel:locking:mutex', 'linux:usb:urb')
+JOB_RESOURCE_LIMITS = {'number of CPU cores': 1, 'memory size': 2 * 10 ** 9, 'disk memory size': 10 ** 9,
+                       'CPU model': None}
+TASK_RESOURCE_LIMITS = {'number of CPU cores': 1, 'memory size': 8 * 10 ** 9, 'disk memory size': 10 ** 9,
+                        'CPU model': None, 'CPU time': 900, 'wall time': 1800}
+
+
+class SimulationFinished(BaseException):
+    """
+    Stop the scheduler loop. It is not an Exception, so the loop does not treat it as a failure and does not try to
+    reinitialize the scheduler.
+    """
+    pass
+
+
+class FakeKV(dict):
+    """Key-value storage of consul with solutions of tasks."""
+
+    def delete(self, key, recurse=False):
+        for name in [k for k in self if k == key or (recurse and k.startswith(key))]:
+            del self[name]
+
+
+class FakeConsul:
+    """Consul client that keeps the key-value storage in memory."""
+
+    def __init__(self):
+        self.kv = FakeKV()
+
+
+class FakeListeningThread:
+    """Messages from Bridge are put to the queue of the scheduler directly, so there is nothing to listen."""
+
+    @staticmethod
+    def is_alive():
+        return True
+
+    def stop(self):
+        return
+
+    def join(self):
+        return
+
+
+class FakeBridge:
+    """Bridge that keeps jobs and tasks in memory and sends messages about new ones to the scheduler at once."""
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.messages = queue.Queue()
+        self.jobs = {}
+        self.tasks = {}
+        self.nodes = None
+
+    def add_job(self, identifier, configuration):
+        self.jobs[identifier] = {'status': '1', 'configuration': configuration, 'error': None}
+        self.messages.put('job {} 1 Klever'.format(identifier).encode('utf-8'))
+
+    def add_task(self, identifier, description):
+        self.tasks[identifier] = {'status': 'PENDING', 'description': description, 'error': None}
+        self.messages.put('task {} PENDING Klever'.format(identifier).encode('utf-8'))
+
+    def register(self, scheduler_type=None):
+        return
+
+    def stop(self):
+        return
+
+    def pull_job_conf(self, job_identifier):
+        configuration = self.jobs[job_identifier]['configuration']
+        return {'configuration': {'resource limits': dict(configuration['resource limits']),
+                                  'priority': configuration['priority'], 'task scheduler': 'Klever'},
+                'tasks': dict(configuration['task resource limits'])}
+
+    def pull_task_conf(self, task_identifier):
+        description = self.tasks[task_identifier]['description']
+        return {'description': dict(description, **{'resource limits': dict(description['resource limits'])})}
+
+    def get_job_status(self, identifier):
+        return self.jobs[identifier]['status']
+
+    def get_job_progress(self, identifier):
+        return {'total_ts': self.simulation.job_tasks_number(identifier)}
+
+    def cancel_job(self, job_identifier):
+        self.submit_job_status(job_identifier, '7')
+
+    def submit_job_status(self, job_identifier, status):
+        self.jobs[job_identifier]['status'] = status
+        if status in ('3', '4', '7'):
+            self.simulation.job_finished(job_identifier)
+
+    def submit_job_error(self, job_identifier, error):
+        self.jobs[job_identifier]['error'] = error
+        self.submit_job_status(job_identifier, '4')
+
+    def submit_task_status(self, task_identifier, status):
+        self.tasks[task_identifier]['status'] = status
+        if status in ('FINISHED', 'ERROR', 'CANCELLED'):
+            self.simulation.task_finished(task_identifier)
+
+    def submit_task_error(self, task_identifier, error):
+        self.tasks[task_identifier]['error'] = error
+        self.submit_task_status(task_identifier, 'ERROR')
+
+    def submit_tasks_statuses(self, statuses):
+        for task_identifier, status, error in statuses:
+            if error is not None:
+                self.tasks[task_identifier]['error'] = error
+            self.submit_task_status(task_identifier, status)
+        return {}
+
+    def delete_task(self, task_identifier):
+        self.tasks.pop(task_identifier, None)
+
+    def get_job_tasks(self, identifier):
+        return ((task_id, task['status']) for task_id, task in self.tasks.items()
+                if task['description']['job id'] == identifier)
+
+    def get_all_jobs(self):
+        return ((job_id, job['status']) for job_id, job in self.jobs.items())
+
+    def get_all_tasks(self):
+        return ((task_id, task['status']) for task_id, task in self.tasks.items())
+
+    def submit_nodes(self, nodes, looping=True):
+        self.nodes = nodes
+
+    def submit_tools(self, tools, looping=True):
+        return
+
+
+class SimulatedRunner(runners.Speculative):
+    """
+    Runner that works like the native one but starts tasks and jobs at any simulated node chosen by the resource
+    manager. Verifiers and Klever Core are simulated, so tasks and jobs are solved in virtual time.
+    """
+
+    @staticmethod
+    def scheduler_type():
+        """Return type of the scheduler: 'VerifierCloud' or 'Klever'."""
+        return "Klever"
+
+    def __init__(self, conf, logger, work_dir, server, simulation):
+        """Do simulation specific initialization"""
+        super(SimulatedRunner, self).__init__(conf, logger, work_dir, server)
+        self.simulation = simulation
+        self._manager = None
+        self._nodes_to_start = {}
+        self._nodes = {}
+
+    def init(self):
+        """
+        Initialize scheduler completely. This method should be called both at constructing stage and scheduler
+        reinitialization. Thus, all object attribute should be cleaned up and set as it is a newly created object.
+        """
+        super(SimulatedRunner, self).init()
+        self._manager = resource_scheduler.ResourceManager(self.logger, self.conf["scheduler"]["concurrent jobs"],
+                                                           self.conf["scheduler"].get("debug resource manager", False))
+        self._nodes_to_start = {}
+        self._nodes = {}
+        nodes = self.simulation.nodes
+        self._manager.apply_system_status(list(nodes), {node: json.dumps(state) for node, state in nodes.items()})
+
+    def schedule(self, pending_tasks, pending_jobs):
+        """
+        Get a list of new tasks which can be launched during current scheduler iteration. All pending jobs and tasks
+        should be sorted reducing the priority to the end. Each task and job in arguments are dictionaries with full
+        configuration or description.
+
+        :param pending_tasks: List with all pending tasks.
+        :param pending_jobs: List with all pending jobs.
+        :return: List with identifiers of pending tasks to launch and list woth identifiers of jobs to launch.
+        """
+        new_tasks, new_jobs = self._manager.schedule(pending_tasks, pending_jobs)
+        self._nodes_to_start = {item['id']: node for item, node in itertools.chain(new_tasks, new_jobs)}
+        return [t[0]['id'] for t in new_tasks], [j[0]['id'] for j in new_jobs]
+
+    def update_nodes(self, wait_controller=False):
+        """
+        Update statuses and configurations of available nodes and push them to the server.
+
+        :param wait_controller: Ignore KV fails until it become working.
+        :return: Return True if nothing has changes.
+        """
+        return self._manager.submit_status(self.server)
+
+    def _solve_task(self, identifier, description, user, password):
+        """
+        Solve given verification task.
+
+        :param identifier: Verification task identifier.
+        :param description: Verification task description dictionary.
+        :param user: User name.
+        :param password: Password.
+        :return: Return Future object.
+        """
+        node = self._nodes_to_start.pop(identifier)
+        self._manager.claim_resources(identifier, description, node, job=False)
+        self._nodes[identifier] = node
+        self.simulation.claim(description['resource limits'])
+        return self.simulation.solve_task(identifier, description)
+
+    def _solve_job(self, identifier, configuration):
+        """
+        Solve given verification job.
+
+        :param identifier: Job identifier.
+        :param configuration: Job configuration.
+        :return: Return Future object.
+        """
+        node = self._nodes_to_start.pop(identifier)
+        self._manager.claim_resources(identifier, configuration, node, job=True)
+        self._nodes[identifier] = node
+        self.simulation.claim(configuration['configuration']['resource limits'])
+        return self.simulation.solve_job(identifier)
+
+    def _process_task_result(self, identifier, future, description):
+        """
+        Process result and send results to the server.
+
+        :param identifier: Task identifier string.
+        :param future: Future object.
+        :param description: Verification task description dictionary.
+        :return: status of the task after solution: FINISHED.
+        """
+        self._release(identifier, description['resource limits'], job=False)
+        return "FINISHED"
+
+    def _process_job_result(self, identifier, future):
+        """
+        Process future object status and send results to the server.
+
+        :param identifier: Job identifier string.
+        :param future: Future object.
+        :return: status of the job after solution: FINISHED.
+        """
+        self._release(identifier, self.simulation.job_resource_limits(identifier), job=True)
+        return "FINISHED"
+
+    def _cancel_job(self, identifier, future):
+        """
+        Stop the job solution.
+
+        :param identifier: Verification task ID.
+        :param future: Future object.
+        :return: Status of the task after solution: FINISHED.
+        """
+        return self._process_job_result(identifier, future)
+
+    def _cancel_task(self, identifier, future):
+        """
+        Stop the task solution. Verifiers of tasks go on in virtual time, but their results are ignored.
+
+        :param identifier: Verification task ID.
+        :param future: Future object.
+        :return: Status of the task after solution: FINISHED.
+        """
+        self._release(identifier, self.simulation.task_resource_limits(identifier), job=False)
+        return "FINISHED"
+
+    def _prepare_task(self, identifier, description):
+        self._manager.check_resources(description, job=False)
+        return True
+
+    def _prepare_job(self, identifier, configuration):
+        self._manager.check_resources(configuration, job=True)
+        return True
+
+    def _release(self, identifier, limits, job):
+        self._manager.release_resources(identifier, self._nodes.pop(identifier), job)
+        self.simulation.release(limits)
+
+
+class SimulatedScheduler(Scheduler):
+    """Scheduler which exchanges data with fake Bridge and goes to the next moment of virtual time at each iteration."""
+
+    def __init__(self, conf, logger, simulation):
+        """
+        Prepare the scheduler.
+
+        :param conf: Dictionary with relevant configuration.
+        :param logger: Logger object.
+        :param simulation: Simulation object.
+        """
+        self.simulation = simulation
+        super(SimulatedScheduler, self).__init__(conf, logger, None, SimulatedRunner)
+        self._iteration_period = 0
+
+    def init_scheduler(self):
+        """
+        Initialize scheduler completely. This method should be called both at constructing stage and scheduler
+        reinitialization. Thus, all object attribute should be cleaned up and set as it is a newly created object.
+        """
+        self._tasks = {}
+        self._jobs = {}
+        self._job_tasks = {}
+        self._nodes = None
+        self._tools = None
+        self.server = self.simulation.bridge
+        self._server_queue = self.server.messages
+        self.runner = SimulatedRunner(self.conf, self.logger, self.work_dir, self.server, self.simulation)
+        self.runner.init()
+        self._listening_thread = FakeListeningThread()
+        self._check_jobs_status()
+
+    def _submit_tasks_statuses(self, statuses):
+        """
+        Submit new statuses of tasks to Bridge. This is the last step of each iteration, so then the simulation goes to
+        the moment of virtual time of the next iteration.
+
+        :param statuses: List of tuples (task identifier, status, error).
+        """
+        super(SimulatedScheduler, self)._submit_tasks_statuses(statuses)
+        self.simulation.next_iteration()
+
+
+class Simulation:
+    """
+    Simulated environment of the scheduler: Bridge with jobs and tasks, nodes and verifiers. Each job generates its
+    tasks one after another as Klever Core does and finishes when all of them are solved. Each task consumes a given
+    amount of memory and takes a given virtual time. If its memory limit is lower, the verifier stops at this limit
+    earlier.
+
+    Virtual time goes in steps equal to the period of iterations of the scheduler loop, but periods without any events
+    are skipped at once. So, virtual time and the scheduling latency do not depend on the speed of the scheduler, and
+    results of different runs on the same workload are the same except for iteration times.
+    """
+
+    def __init__(self, nodes, jobs, logger, period=0.5):
+        """
+        Prepare the simulation.
+
+        :param nodes: Dictionary {node name: state} with states of nodes like controllers save them.
+        :param jobs: List of jobs generated by generate_workload().
+        :param logger: Logger object.
+        :param period: Period of iterations of the scheduler loop in virtual seconds.
+        """
+        self.nodes = nodes
+        self.logger = logger
+        self.period = period
+        self.time = 0
+        self.bridge = FakeBridge(self)
+        self.__jobs = {job['id']: job for job in jobs}
+        self.__tasks = {task['id']: task for job in jobs for task in job['tasks']}
+        self.__events = []
+        self.__counter = itertools.count()
+        self.__job_futures = {}
+        self.__finished_tasks = {job['id']: 0 for job in jobs}
+        self.__unfinished_jobs = set(self.__jobs)
+        self.__pending_since = {}
+        self.__reserved = {'number of CPU cores': 0, 'memory size': 0}
+        self.__reservation = {'number of CPU cores': 0, 'memory size': 0}
+        self.__usage = {'number of CPU cores': 0, 'memory size': 0}
+        self.__last_iteration = None
+        self.iteration_times = []
+        self.latencies = []
+        self.restarts = 0
+
+        for job in jobs:
+            self.__add_event(0, self.bridge.add_job, job['id'], job['configuration'])
+
+    def run(self, conf):
+        """
+        Run the scheduler loop until all jobs are solved or nothing can happen anymore.
+
+        :param conf: Scheduler configuration.
+        :return: Dictionary with the report.
+        """
+        # Share the fake consul client like the real one is shared by all threads of the process
+        saved = consul._client, consul._client_pid
+        consul._client, consul._client_pid = FakeConsul(), os.getpid()
+        try:
+            scheduler = SimulatedScheduler(conf, self.logger, self)
+            started = time.perf_counter()
+            self.__last_iteration = started
+            try:
+                scheduler.launch()
+            except SimulationFinished as finished:
+                self.logger.info('Simulation is finished: {}'.format(finished))
+            wall_time = time.perf_counter() - started
+            scheduler.runner.terminate()
+        finally:
+            consul._client, consul._client_pid = saved
+
+        return self.__report(wall_time)
+
+    def job_tasks_number(self, identifier):
+        return len(self.__jobs[identifier]['tasks'])
+
+    def job_resource_limits(self, identifier):
+        return self.__jobs[identifier]['configuration']['resource limits']
+
+    def task_resource_limits(self, identifier):
+        return self.bridge.tasks[identifier]['description']['resource limits']
+
+    def claim(self, limits):
+        for resource in self.__reserved:
+            self.__reserved[resource] += limits[resource]
+
+    def release(self, limits):
+        for resource in self.__reserved:
+            self.__reserved[resource] -= limits[resource]
+
+    def solve_job(self, identifier):
+        """
+        Start Klever Core. It generates tasks one after another and finishes when all of them are solved.
+
+        :param identifier: Job identifier.
+        :return: Future object.
+        """
+        future = self.__new_future()
+        self.__job_futures[identifier] = future
+        moment = self.time
+        for task in self.__jobs[identifier]['tasks']:
+            moment += task['arrival']
+            self.__add_event(moment, self.__add_task, task)
+        if not self.__jobs[identifier]['tasks']:
+            self.__add_event(moment, future.set_result, 0)
+        return future
+
+    def solve_task(self, identifier, description):
+        """
+        Start the verifier.
+
+        :param identifier: Task identifier.
+        :param description: Task description with resource limits set by the scheduler.
+        :return: Future object.
+        """
+        self.latencies.append(self.time - self.__pending_since.pop(identifier))
+        task = self.__tasks[identifier]
+        limit = description['resource limits']['memory size']
+        if task['memory'] > limit:
+            # The verifier is stopped when it reaches the memory limit
+            duration = task['duration'] * limit / task['memory']
+            solution = {'status': 'OUT OF MEMORY', 'uploaded': not description.get('speculative', False),
+                        'resources': {'memory size': limit, 'CPU time': int(duration * 1000)}}
+        else:
+            duration = task['duration']
+            solution = {'status': task['status'], 'uploaded': True,
+                        'resources': {'memory size': task['memory'], 'CPU time': int(duration * 1000)}}
+        self.__usage['number of CPU cores'] += description['resource limits']['number of CPU cores'] * duration
+        self.__usage['memory size'] += solution['resources']['memory size'] * duration
+
+        future = self.__new_future()
+        self.__add_event(self.time + duration, self.__finish_task, identifier, solution, future)
+        return future
+
+    def task_finished(self, identifier):
+        job_identifier = self.__tasks[identifier]['job id']
+        self.__finished_tasks[job_identifier] += 1
+        if self.__finished_tasks[job_identifier] == len(self.__jobs[job_identifier]['tasks']):
+            # Klever Core finishes after getting all results
+            self.__add_event(self.time, self.__job_futures[job_identifier].set_result, 0)
+
+    def job_finished(self, identifier):
+        self.__unfinished_jobs.discard(identifier)
+
+    def next_iteration(self):
+        """
+        Go to the next iteration of the scheduler loop. Apply all events happened before it.
+
+        :raise SimulationFinished: If all jobs are solved or there are no events which can change anything.
+        """
+        now = time.perf_counter()
+        self.iteration_times.append(now - self.__last_iteration)
+
+        if not self.__unfinished_jobs:
+            raise SimulationFinished('All jobs are solved')
+        elif not self.__events:
+            raise SimulationFinished('Jobs {} cannot be solved'.format(', '.join(sorted(self.__unfinished_jobs))))
+
+        # The scheduler does nothing until the next event, so skip its iterations at once
+        moment = self.time + self.period
+        if self.__events[0][0] > moment:
+            if self.period:
+                moment = self.time + math.ceil((self.__events[0][0] - self.time) / self.period) * self.period
+            else:
+                moment = self.__events[0][0]
+
+        for resource in self.__reserved:
+            self.__reservation[resource] += self.__reserved[resource] * (moment - self.time)
+        self.time = moment
+        while self.__events and self.__events[0][0] <= moment:
+            _, _, handler, args = heapq.heappop(self.__events)
+            handler(*args)
+
+        self.__last_iteration = time.perf_counter()
+
+    def __add_event(self, moment, handler, *args):
+        heapq.heappush(self.__events, (moment, next(self.__counter), handler, args))
+
+    def __add_task(self, task):
+        self.__pending_since[task['id']] = self.time
+        self.bridge.add_task(task['id'], task['description'])
+
+    def __finish_task(self, identifier, solution, future):
+        if not solution['uploaded']:
+            # The task will be solved once again with higher limits
+            self.restarts += 1
+            self.__pending_since[identifier] = self.time
+        utils.kv_upload_solution(self.logger, identifier, SimulatedRunner.scheduler_type(), solution)
+        future.set_result(0)
+
+    @staticmethod
+    def __new_future():
+        future = concurrent.futures.Future()
+        # Running futures cannot be cancelled, so the runner processes cancellation of them
+        future.set_running_or_notify_cancel()
+        return future
+
+    def __report(self, wall_time):
+        total = {
+            'number of CPU cores': sum(node['available CPU number'] for node in self.nodes.values()),
+            'memory size': sum(node['available RAM memory'] for node in self.nodes.values())
+        }
+        tasks = self.bridge.tasks.values()
+        return {
+            'jobs': len(self.__jobs),
+            'unsolved jobs': len(self.__unfinished_jobs),
+            'tasks': len(self.__tasks),
+            'finished tasks': sum(1 for task in tasks if task['status'] == 'FINISHED'),
+            'failed tasks': sum(1 for task in tasks if task['status'] == 'ERROR'),
+            'speculative restarts': self.restarts,
+            'iterations': len(self.iteration_times),
+            'wall time': wall_time,
+            'iteration time': summary(self.iteration_times),
+            'virtual time': self.time,
+            'scheduling latency': summary(self.latencies),
+            # Resources reserved by the scheduler and consumed by verifiers with respect to all available ones
+            'reserved CPU cores': self.__reservation['number of CPU cores'] /
+            (total['number of CPU cores'] * self.time or 1),
+            'reserved memory': self.__reservation['memory size'] / (total['memory size'] * self.time or 1),
+            'used CPU cores': self.__usage['number of CPU cores'] / (total['number of CPU cores'] * self.time or 1),
+            'used memory': self.__usage['memory size'] / (total['memory size'] * self.time or 1)
+        }
+
+
+def summary(values):
+    """
+    Summarize the distribution of values.
+
+    :param values: List of numbers.
+    :return: Dictionary with the mean, the median, the 95% quantile and the maximum.
+    """
+    if not values:
+        return {'mean': 0, 'median': 0, '95%': 0, 'max': 0}
+    values = sorted(values)
+    return {'mean': statistics.mean(values), 'median': quantile(values, 0.5), '95%': quantile(values, 0.95),
+            'max': values[-1]}
+
+
+def generate_nodes(nodes_num, seed=0):
+    """
+    Generate states of nodes like controllers save them.
+
+    :param nodes_num: Number of nodes.
+    :param seed: Seed of the random generator.
+    :return: Dictionary {node name: state}.
+    """
+    rnd = random.Random(seed)
+    return {'node{}'.format(node): {
+        'CPU model': 'Intel(R) Xeon(R) CPU E5-2650 v2 @ 2.60GHz',
+        'available for jobs': True,
+        'available for tasks': True,
+        'available CPU number': rnd.choice((4, 8, 16, 32)),
+        'available RAM memory': rnd.choice((16, 32, 64)) * 10 ** 9,
+        'available disk memory': 200 * 10 ** 9
+    } for node in range(nodes_num)}
+
+
+def generate_workload(tasks_num, jobs_num=1, seed=0, duration=60, arrival=0.5, memory=10 ** 9):
+    """
+    Generate jobs and their tasks. Jobs check the same program fragments against the same requirements, so tasks of
+    later jobs are similar to ones of previous jobs.
+
+    :param tasks_num: Total number of tasks.
+    :param jobs_num: Number of jobs.
+    :param seed: Seed of the random generator.
+    :param duration: Mean virtual time of solution of a task in seconds.
+    :param arrival: Mean virtual time between generation of tasks by a job in seconds.
+    :param memory: Median of memory consumed by verifiers in bytes.
+    :return: List of dictionaries describing jobs.
+    """
+    rnd = random.Random(seed)
+    consumed = {}
+    jobs = []
+    for job in range(jobs_num):
+        identifier = 'job{}'.format(job)
+        tasks = []
+        for number in range(tasks_num // jobs_num + (1 if job < tasks_num % jobs_num else 0)):
+            fragment = 'drivers/module{}.ko'.format(number // len(REQUIREMENTS))
+            requirement = REQUIREMENTS[number % len(REQUIREMENTS)]
+            consumed.setdefault((fragment, requirement), min(rnd.lognormvariate(math.log(memory), 0.7),
+                                                             TASK_RESOURCE_LIMITS['memory size']))
+            task_identifier = '{}-{}'.format(job, number)
+            tasks.append({
+                'id': task_identifier,
+                'job id': identifier,
+                'arrival': rnd.expovariate(1 / arrival) if arrival else 0,
+                'duration': min(rnd.expovariate(1 / duration), TASK_RESOURCE_LIMITS['CPU time']) if duration else 0,
+                'memory': int(consumed[(fragment, requirement)] * rnd.uniform(0.9, 1.1)),
+                'status': rnd.choice(('true', 'false', 'unknown')),
+                'description': {
+                    'id': '{}/{}'.format(fragment, requirement),
+                    'job id': identifier,
+                    'solution class': requirement,
+                    'priority': 'LOW',
+                    'resource limits': dict(TASK_RESOURCE_LIMITS)
+                }
+            })
+        jobs.append({
+            'id': identifier,
+            'configuration': {'resource limits': dict(JOB_RESOURCE_LIMITS), 'priority': 'LOW',
+                              'task resource limits': dict(TASK_RESOURCE_LIMITS)},
+            'tasks': tasks
+        })
+
+    return jobs
+
+
+def simulate(tasks_num=10000, jobs_num=1, nodes_num=10, seed=0, duration=60, arrival=0.5, period=0.5,
+             statistics_database=None, logger=None):
+    """
+    Simulate solution of jobs by the native scheduler.
+
+    :param tasks_num: Total number of tasks.
+    :param jobs_num: Number of jobs solved at the same time.
+    :param nodes_num: Number of nodes.
+    :param seed: Seed of the random generator.
+    :param duration: Mean virtual time of solution of a task in seconds.
+    :param arrival: Mean virtual time between generation of tasks by a job in seconds.
+    :param period: Period of iterations of the scheduler loop in virtual seconds.
+    :param statistics_database: Path to the database with resource statistics of previous simulations.
+    :param logger: Logger object.
+    :return: Dictionary with the report.
+    """
+    if not logger:
+        logger = logging.getLogger('simulator')
+    conf = {"scheduler": {"concurrent jobs": jobs_num, "resource statistics database": statistics_database}}
+    simulation = Simulation(generate_nodes(nodes_num, seed), generate_workload(tasks_num, jobs_num, seed, duration,
+                                                                               arrival), logger, period)
+    return simulation.run(conf)
+
+
+def format_report(report):
+    """
+    Get a human readable report.
+
+    :param report: Dictionary returned by simulate().
+    :return: String.
+    """
+    def distribution(data, scale=1, unit=''):
+        return ', '.join('{} {:.3f}{}'.format(name, value * scale, unit) for name, value in data.items())
+
+    return '\n'.join((
+        'Jobs: {} (unsolved {})'.format(report['jobs'], report['unsolved jobs']),
+        'Tasks: {} (finished {}, failed {}, speculative restarts {})'.
+        format(report['tasks'], report['finished tasks'], report['failed tasks'], report['speculative restarts']),
+        'Iterations: {} in {:.3f}s'.format(report['iterations'], report['wall time']),
+        'Iteration time: {}'.format(distribution(report['iteration time'], 1000, 'ms')),
+        'Virtual time: {:.1f}s'.format(report['virtual time']),
+        'Scheduling latency: {}'.format(distribution(report['scheduling latency'], 1, 's')),
+        'Reserved CPU cores: {:.1%}, reserved memory: {:.1%}'.
+        format(report['reserved CPU cores'], report['reserved memory']),
+        'Used CPU cores: {:.1%}, used memory: {:.1%}'.format(report['used CPU cores'], report['used memory'])
+    ))
+
+
+def main(sys_argv=None):
+    parser = argparse.ArgumentParser(description='Simulate solution of verification tasks by the native scheduler to '
+                                                 'measure its performance.')
+    parser.add_argument('--tasks', type=int, default=10000, help='Total number of tasks (default: %(default)s).')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of jobs (default: %(default)s).')
+    parser.add_argument('--nodes', type=int, default=10, help='Number of nodes (default: %(default)s).')
+    parser.add_argument('--duration', type=float, default=60,
+                        help='Mean virtual time of solution of a task in seconds (default: %(default)s).')
+    parser.add_argument('--arrival', type=float, default=0.5,
+                        help='Mean virtual time between generation of tasks in seconds (default: %(default)s).')
+    parser.add_argument('--period', type=float, default=0.5,
+                        help='Period of iterations of the scheduler loop in seconds (default: %(default)s).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator (default: %(default)s).')
+    parser.add_argument('--statistics-database', help='Path to the database with resource statistics.')
+    parser.add_argument('--debug', action='store_true', help='Print log messages of the scheduler.')
+    args = parser.parse_args(sys_argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.ERROR)
+    report = simulate(args.tasks, args.jobs, args.nodes, args.seed, args.duration, args.arrival, args.period,
+                      args.statistics_database)
+    print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import copy
+import logging
+import random
+import time
+
+from klever.scheduler.schedulers.resource_scheduler import ResourceManager, NodesQueue, free_resources
+
+
+def build_system_status(nodes_num, seed=0):
+    rnd = random.Random(seed)
+    status = {}
+    for node in range(nodes_num):
+        available = rnd.random() > 0.1
+        status['node{}'.format(node)] = {
+            'CPU model': rnd.choice(('Intel', 'AMD')),
+            'status': 'HEALTHY',
+            'available for jobs': available,
+            'available for tasks': available,
+            'available CPU number': rnd.choice((4, 8, 16, 32)),
+            'available RAM memory': rnd.choice((8, 16, 32, 64)) * 10 ** 9,
+            'available disk memory': rnd.choice((100, 200)) * 10 ** 9,
+            'reserved CPU number': 0,
+            'reserved RAM memory': 0,
+            'reserved disk memory': 0,
+            'running verification jobs': [],
+            'running verification tasks': []
+        }
+
+    return status
+
+
+def build_pending_tasks(tasks_num, seed=0):
+    rnd = random.Random(seed)
+    return [{
+        'id': str(task),
+        'description': {
+            'resource limits': {
+                'CPU model': rnd.choice((None, None, 'Intel', 'AMD')),
+                'number of CPU cores': rnd.choice((1, 2, 4)),
+                'memory size': rnd.choice((1, 3, 7)) * 10 ** 9,
+                'disk memory size': 10 ** 9
+            }
+        }
+    } for task in range(tasks_num)]
+
+
+def schedule_tasks(system_status, pending_tasks):
+    # Reference implementation that copies the whole system status and ranks all nodes for each task. Like the
+    # resource manager did before NodesQueue, it checks whether nodes are available for jobs rather than for tasks.
+    def fulfill_requirement(node, restriction):
+        if not node['available for jobs']:
+            return False
+        if restriction['CPU model'] and restriction['CPU model'] != node['CPU model']:
+            return False
+        cpu_number, ram_memory, disk_memory = free_resources(node)
+        return cpu_number >= restriction["number of CPU cores"] and ram_memory >= restriction["memory size"] and \
+            disk_memory >= restriction["disk memory size"]
+
+    status = copy.deepcopy(system_status)
+    tasks_to_run = []
+    for task in reversed(pending_tasks):
+        restriction = task['description']['resource limits']
+        suitable = [n for n in status if fulfill_requirement(status[n], restriction)]
+        nodes = sorted(suitable, key=lambda x: free_resources(status[x]))
+        if nodes:
+            tasks_to_run.append([task, nodes[0]])
+            status[nodes[0]]['reserved CPU number'] += restriction['number of CPU cores']
+            status[nodes[0]]['reserved RAM memory'] += restriction['memory size']
+            status[nodes[0]]['reserved disk memory'] += restriction['disk memory size']
+
+    return tasks_to_run
+
+
+def get_resource_manager(system_status):
+    manager = ResourceManager(logging.getLogger('test'))
+    manager._ResourceManager__system_status = system_status
+    return manager
+
+
+def test_nodes_queue():
+    for seed in range(10):
+        system_status = build_system_status(30, seed)
+        pending_tasks = build_pending_tasks(300, seed)
+        expected = schedule_tasks(system_status, pending_tasks)
+
+        tasks_to_run, jobs_to_run = get_resource_manager(system_status).schedule(pending_tasks, [])
+        assert [(t['id'], n) for t, n in tasks_to_run] == [(t['id'], n) for t, n in expected]
+        assert not jobs_to_run
+
+
+def test_nodes_available_for_tasks():
+    system_status = build_system_status(30)
+    for i, node in enumerate(system_status):
+        system_status[node]['available for jobs'] = bool(i % 2)
+        system_status[node]['available for tasks'] = not i % 2
+
+    # Tasks are started just at nodes available for tasks
+    tasks_to_run, _ = get_resource_manager(system_status).schedule(build_pending_tasks(300), [])
+    assert tasks_to_run
+    assert all(system_status[node]['available for tasks'] for _, node in tasks_to_run)
+
+
+def test_nodes_queue_rollback():
+    system_status = build_system_status(10)
+    original_status = copy.deepcopy(system_status)
+
+    nodes_queue = NodesQueue(system_status)
+    for task in build_pending_tasks(100):
+        node = nodes_queue.select(task['description']['resource limits'])
+        if node:
+            nodes_queue.reserve(task['description']['resource limits'], node)
+    assert system_status != original_status
+
+    nodes_queue.rollback()
+    assert system_status == original_status
+
+
+def test_scheduling_benchmark():
+    logger = logging.getLogger('test')
+    system_status = build_system_status(300)
+    pending_tasks = build_pending_tasks(3000)
+
+    start = time.time()
+    expected = schedule_tasks(system_status, pending_tasks)
+    reference_time = time.time() - start
+
+    start = time.time()
+    tasks_to_run, _ = get_resource_manager(system_status).schedule(pending_tasks, [])
+    new_time = time.time() - start
+
+    logger.info('Scheduling of 3000 tasks at 300 nodes takes {:.2f}s instead of {:.2f}s'
+                .format(new_time, reference_time))
+    assert [(t['id'], n) for t, n in tasks_to_run] == [(t['id'], n) for t, n in expected]
+
+
+def test_tasks_reserved():
+    rnd = random.Random(0)
+    system_status = build_system_status(20)
+    for node in system_status:
+        system_status[node]['available for tasks'] = True
+    manager = ResourceManager(logging.getLogger('test'), debug=True)
+    manager._ResourceManager__system_status = system_status
+    manager._ResourceManager__tasks_reserved = {
+        node: {"number of CPU cores": 0, "memory size": 0, "disk memory size": 0} for node in system_status}
+
+    running = []
+    for task in build_pending_tasks(2000):
+        if running and rnd.random() < 0.4:
+            identifier, node = running.pop(rnd.randrange(len(running)))
+            manager.release_resources(identifier, node)
+        else:
+            tasks_to_run, _ = manager.schedule([task], [])
+            if tasks_to_run:
+                manager.claim_resources(task['id'], task['description'], tasks_to_run[0][1])
+                running.append((task['id'], tasks_to_run[0][1]))
+
+        # This compares incrementally calculated resources with ones calculated from scratch in the debug mode.
+        status = manager._ResourceManager__create_system_status()
+        assert all(status[node]['reserved CPU number'] == 0 for node in status)
+
+    assert running
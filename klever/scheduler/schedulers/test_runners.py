@@ -0,0 +1,108 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import random
+
+from klever.scheduler.schedulers.runners import Speculative, MIN_SOLUTIONS, FRAGMENT_MEMORY_MARGIN
+from klever.scheduler.utils.statistics import ResourceStatistics, quantile
+
+REQUIREMENT = 'linux:memory safety'
+QOS = {'memory size': 10 ** 10, 'CPU time': 900000}
+
+
+def get_runner(database):
+    runner = Speculative.__new__(Speculative)
+    runner.conf = {'scheduler': {'resource statistics database': database}}
+    runner.logger = logging.getLogger('test')
+    runner.init()
+    return runner
+
+
+def get_item(job, fragment):
+    return {'description': {'id': '{}/{}'.format(fragment, REQUIREMENT), 'job id': job,
+                            'solution class': REQUIREMENT, 'resource limits': dict(QOS)}}
+
+
+def solve(runner, job, fragment, memory):
+    item = get_item(job, fragment)
+    runner._estimate_resource_limitations(item, fragment)
+    limit = item['description']['resource limits']['memory size']
+    solution = {'status': 'OUT OF MEMORY' if memory > limit else 'false', 'uploaded': memory <= limit,
+                'resources': {'memory size': min(memory, limit), 'CPU time': 1000}}
+    solved = runner._add_solution(job, REQUIREMENT, fragment, solution, runner._program_fragment(item['description']))
+    return item['description'], solved
+
+
+def test_resource_statistics(tmpdir):
+    database = str(tmpdir / 'statistics.db')
+    rnd = random.Random(0)
+    history = [rnd.randrange(10 ** 9) for _ in range(150)]
+
+    statistics = ResourceStatistics(database, history=100)
+    for i, memory in enumerate(history):
+        statistics.add(REQUIREMENT, 'fragment{}'.format(i % 10), memory, 1000)
+    statistics.close()
+
+    # Statistics persist and just last solutions are used
+    statistics = ResourceStatistics(database, history=100)
+    assert statistics.number(REQUIREMENT) == 100
+    assert statistics.number('other') == 0
+    assert statistics.memory_quantile('other', 0.95) is None
+    for q in (0.05, 0.5, 0.95, 1):
+        assert statistics.memory_quantile(REQUIREMENT, q) == quantile(sorted(history[-100:]), q)
+    assert statistics.fragment_memory(REQUIREMENT, 'fragment3') == history[143]
+    assert statistics.fragment_memory(REQUIREMENT, 'fragment10') is None
+    statistics.close()
+
+
+def test_speculative_limits(tmpdir):
+    database = str(tmpdir / 'statistics.db')
+    rnd = random.Random(0)
+
+    runner = get_runner(database)
+    runner._track_job('job1')['QoS limit'] = dict(QOS)
+    memory = {'fragment{}'.format(i): rnd.randrange(10 ** 8, 10 ** 9) for i in range(20)}
+    fragments = sorted(memory)
+    for i, fragment in enumerate(fragments):
+        description, solved = solve(runner, 'job1', fragment, memory[fragment])
+        # Limits are not reduced until there are several solutions
+        assert description['speculative'] == (i >= MIN_SOLUTIONS)
+        if description['speculative']:
+            assert description['resource limits']['memory size'] == \
+                quantile(sorted(memory[f] for f in fragments[:i]), 0.95)
+        if not solved:
+            description, solved = solve(runner, 'job1', fragment, memory[fragment])
+            assert description['resource limits'] == QOS and solved
+    runner._statistics.close()
+
+    # The next job starts from statistics of the previous one
+    runner = get_runner(database)
+    runner._track_job('job2')['QoS limit'] = dict(QOS)
+    description, _ = solve(runner, 'job2', 'new fragment', 10 ** 8)
+    assert description['resource limits']['memory size'] == quantile(sorted(memory.values()), 0.95)
+
+    # The same program fragment gets a bit more memory than it consumed before
+    description, _ = solve(runner, 'job2', fragments[0], memory[fragments[0]])
+    assert description['resource limits']['memory size'] == int(memory[fragments[0]] * FRAGMENT_MEMORY_MARGIN)
+
+    # If the estimation is too low, the task is solved once again with QoS limits
+    description, solved = solve(runner, 'job2', fragments[1], memory[fragments[1]] * 2)
+    assert description['speculative'] and not solved
+    description, solved = solve(runner, 'job2', fragments[1], memory[fragments[1]] * 2)
+    assert description['resource limits'] == QOS and solved
+    runner._statistics.close()
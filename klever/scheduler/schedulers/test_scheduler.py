@@ -0,0 +1,246 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import queue
+import random
+
+import pytest
+
+from klever.scheduler.schedulers import Scheduler, PendingQueue
+from klever.scheduler.utils import sort_priority
+
+PRIORITIES = ('IDLE', 'LOW', 'HIGH', 'URGENT')
+
+
+class FakeServer:
+
+    def __init__(self, descriptions=None):
+        self.descriptions = descriptions
+        self.requests = []
+
+    def pull_task_conf(self, identifier):
+        return {'description': self.descriptions[identifier]}
+
+    def submit_task_status(self, identifier, status):
+        self.requests.append(('status', identifier, status))
+
+    def submit_task_error(self, identifier, error):
+        self.requests.append(('error', identifier, error))
+
+    def submit_tasks_statuses(self, statuses):
+        self.requests.append(('statuses', list(statuses)))
+        return {statuses[0][0]: {'status': ['Status change from "FINISHED" to "FINISHED" is not supported!']}}
+
+
+class FakeRunner:
+
+    @staticmethod
+    def prepare_task(identifier, item):
+        return True
+
+
+class FakeBridge(FakeServer):
+
+    def __init__(self, descriptions):
+        super(FakeBridge, self).__init__(descriptions)
+        self.statuses = {identifier: 'PROCESSING' for identifier in descriptions}
+
+    def submit_task_status(self, identifier, status):
+        super(FakeBridge, self).submit_task_status(identifier, status)
+        self.statuses[identifier] = status
+
+    def submit_task_error(self, identifier, error):
+        super(FakeBridge, self).submit_task_error(identifier, error)
+        self.statuses[identifier] = 'ERROR'
+
+    def get_all_tasks(self):
+        return list(self.statuses.items())
+
+    def delete_task(self, identifier):
+        del self.statuses[identifier]
+
+    def stop(self):
+        pass
+
+
+class FailingRunner(FakeRunner):
+    # Tasks are solved at once while scheduling of other tasks fails
+
+    @staticmethod
+    def is_solving(item):
+        return item['status'] == 'PROCESSING'
+
+    @staticmethod
+    def process_task_result(identifier, item):
+        item['status'] = 'FINISHED'
+        return True
+
+    def update_tools(self):
+        pass
+
+    def update_nodes(self):
+        pass
+
+    def schedule(self, pending_tasks, pending_jobs):
+        raise RuntimeError('Scheduling failed')
+
+    def cancel_task(self, identifier, item):
+        pass
+
+    def terminate(self):
+        pass
+
+
+class FakeListeningThread:
+
+    @staticmethod
+    def is_alive():
+        return True
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def record_transitions(tasks_num, jobs_num=5, seed=0):
+    # Record transitions like the scheduler observes them: tasks arrive as pending, start, get rescheduled sometimes
+    # and are deleted at the end.
+    rnd = random.Random(seed)
+    descriptions = {}
+    transitions = []
+    alive = {}
+    for task_id in range(tasks_num):
+        identifier = 'task{}'.format(task_id)
+        descriptions[identifier] = {
+            'job id': 'job{}'.format(rnd.randrange(jobs_num)),
+            'priority': rnd.choice(PRIORITIES),
+            'resource limits': {'memory size': 1000}
+        }
+        transitions.append(('add', identifier))
+        alive[identifier] = 'PENDING'
+
+        for _ in range(rnd.randrange(3)):
+            identifier = rnd.choice(sorted(alive))
+            if alive[identifier] == 'PENDING':
+                alive[identifier] = 'PROCESSING'
+            elif rnd.random() < 0.3:
+                alive[identifier] = 'PENDING'
+            else:
+                alive[identifier] = rnd.choice(('FINISHED', 'ERROR'))
+            transitions.append(('status', identifier, alive[identifier]))
+
+            if alive[identifier] in ('FINISHED', 'ERROR'):
+                del alive[identifier]
+                transitions.append(('delete', identifier))
+
+    return descriptions, transitions
+
+
+def get_scheduler(descriptions, server_class=FakeServer, runner_class=FakeRunner):
+    scheduler = Scheduler.__new__(Scheduler)
+    scheduler.logger = logging.getLogger('test')
+    scheduler.server = server_class(descriptions)
+    scheduler.runner = runner_class()
+    scheduler._tasks = {}
+    scheduler._jobs = {}
+    scheduler._job_tasks = {}
+    scheduler._pending_tasks = PendingQueue()
+    scheduler._pending_jobs = PendingQueue()
+    return scheduler
+
+
+def test_pending_queue():
+    queue = PendingQueue()
+    queue.add('a', 'LOW')
+    queue.add('b', 'IDLE')
+    queue.add('c', 'LOW')
+    assert list(queue) == ['b', 'a', 'c']
+
+    queue.update('a', 'PROCESSING')
+    queue.update('unknown', 'PENDING')
+    assert list(queue) == ['b', 'c']
+
+    # Rescheduled items keep their places
+    queue.update('a', 'PENDING')
+    queue.remove('b')
+    assert list(queue) == ['a', 'c']
+    assert len(queue) == 2
+
+
+def test_job_tasks_index():
+    for seed in range(10):
+        descriptions, transitions = record_transitions(300, seed=seed)
+        scheduler = get_scheduler(descriptions)
+        jobs = {desc['job id'] for desc in descriptions.values()}
+
+        for transition in transitions:
+            if transition[0] == 'add':
+                scheduler.add_new_pending_task(transition[1])
+            elif transition[0] == 'status':
+                scheduler._tasks[transition[1]]['status'] = transition[2]
+                scheduler._update_task(transition[1])
+            else:
+                scheduler._delete_task(transition[1])
+
+            for job_id in jobs:
+                # This is how relevant tasks were obtained before the index was introduced
+                expected = [scheduler._tasks[tid] for tid in scheduler._tasks
+                            if scheduler._tasks[tid]["status"] in ["PENDING", "PROCESSING"]
+                            and scheduler._tasks[tid]["description"]["job id"] == job_id]
+                assert scheduler.relevant_tasks(job_id) == expected
+
+            expected = sorted((desc for desc in scheduler._tasks.values() if desc['status'] == 'PENDING'),
+                              key=lambda i: sort_priority(i['description']['priority']))
+            assert [scheduler._tasks[i] for i in scheduler._pending_tasks] == expected
+
+        assert set(scheduler._job_tasks) == {desc['description']['job id'] for desc in scheduler._tasks.values()}
+
+
+def test_submit_tasks_statuses():
+    scheduler = get_scheduler({})
+
+    scheduler._submit_tasks_statuses([])
+    scheduler._submit_tasks_statuses([('1', 'ERROR', 'Failed')])
+    scheduler._submit_tasks_statuses([('2', 'FINISHED', None)])
+    statuses = [('3', 'FINISHED', None), ('4', 'PROCESSING', None), ('5', 'ERROR', 'Failed')]
+    scheduler._submit_tasks_statuses(statuses)
+
+    assert scheduler.server.requests == [('error', '1', 'Failed'), ('status', '2', 'FINISHED'), ('statuses', statuses)]
+
+
+def test_statuses_submitted_on_failure():
+    descriptions = {identifier: {'job id': 'job', 'priority': 'LOW', 'resource limits': {'memory size': 1000}}
+                    for identifier in ('finished', 'pending')}
+    scheduler = get_scheduler(descriptions, FakeBridge, FailingRunner)
+    scheduler._server_queue = queue.Queue()
+    scheduler._listening_thread = FakeListeningThread()
+    scheduler._iteration_period = 0
+    scheduler.production = False
+    for identifier in descriptions:
+        scheduler.add_new_pending_task(identifier)
+    scheduler._tasks['finished']['status'] = 'PROCESSING'
+    scheduler._update_task('finished')
+
+    with pytest.raises(SystemExit):
+        scheduler.launch()
+
+    # The task that was finished before the failure is not reported as cancelled on termination
+    assert scheduler.server.requests == [('status', 'finished', 'FINISHED'),
+                                         ('error', 'pending', 'Scheduler terminated or reset')]
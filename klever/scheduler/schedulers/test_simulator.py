@@ -0,0 +1,47 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import klever.scheduler.utils.consul as consul
+from klever.scheduler.schedulers.simulator import simulate, format_report
+
+
+def test_simulate(tmpdir):
+    client = consul._client
+    database = str(tmpdir / 'statistics.db')
+    report = simulate(tasks_num=200, jobs_num=2, nodes_num=2, duration=30, arrival=0.5,
+                      statistics_database=database)
+
+    assert report['unsolved jobs'] == 0
+    assert report['finished tasks'] == report['tasks'] == 200
+    assert report['failed tasks'] == 0
+    assert report['iterations'] > 0
+    assert 'Scheduling latency' in format_report(report)
+    assert 0 < report['used CPU cores'] <= report['reserved CPU cores'] <= 1
+    assert 0 < report['used memory'] <= report['reserved memory'] <= 1
+    # Tasks wait for free resources at least sometimes since there are just several nodes
+    assert report['scheduling latency']['max'] > 0
+    assert consul._client is client
+
+    # Results do not depend on the speed of the scheduler
+    again = simulate(tasks_num=200, jobs_num=2, nodes_num=2, duration=30, arrival=0.5)
+    for name in ('virtual time', 'scheduling latency', 'speculative restarts', 'reserved memory'):
+        assert report[name] == again[name]
+
+    # Memory consumption by tasks of the previous simulation is known from the start
+    again = simulate(tasks_num=200, jobs_num=2, nodes_num=2, duration=30, arrival=0.5,
+                     statistics_database=database)
+    assert again['speculative restarts'] < report['speculative restarts']
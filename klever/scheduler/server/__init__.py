@@ -106,6 +106,24 @@ class Server:
         self.session.exchange("service/tasks/{}/".format(task_identifier), method='PATCH',
                               data={"status": "ERROR", "error": error})
 
+    def submit_tasks_statuses(self, statuses):
+        """
+        Submit statuses and errors of several tasks by a single request. Bridge changes them in a single transaction
+        but skips tasks which statuses cannot be changed.
+
+        :param statuses: List of tuples (task identifier, status, error). Error is None for statuses other than ERROR.
+        :return: Dictionary with errors for tasks which statuses were not changed.
+        """
+        self.logger.debug(f'Submit statuses of {len(statuses)} tasks')
+        data = []
+        for task_identifier, status, error in statuses:
+            item = {"id": task_identifier, "status": status}
+            if error is not None:
+                item["error"] = error
+            data.append(item)
+        ret = self.session.json_exchange("service/tasks-statuses/", data)
+        return ret.get('errors', {}) if ret else {}
+
     @_robust_request
     def delete_task(self, task_identifier):
         self.logger.debug(f'Submit deletion of task {task_identifier}')
@@ -122,6 +140,35 @@ class Server:
         self.logger.debug(f'Pull task {identifier} data')
         return self.session.get_archive("service/tasks/{}/download/".format(identifier), archive=archive)
 
+    def pull_task_manifest(self, identifier):
+        """
+        Get names and hashes of files of the verification task to download only files missing at the node.
+
+        :param identifier: Verification task identifier.
+        :return: List of dictionaries {"name": member name, "sha256": hash or None for directories, "size": size} or
+                 None if Bridge cannot provide it.
+        """
+        self.logger.debug(f'Pull task {identifier} manifest')
+        try:
+            ret = self.session.json_exchange("service/tasks/{}/manifest/".format(identifier), method='GET',
+                                             looping=False)
+        except (bridge.BridgeError, bridge.UnexpectedStatusCode) as err:
+            self.logger.debug(f'Cannot get the manifest of task {identifier}: {err}')
+            return None
+        return ret.get('members') if ret else None
+
+    def pull_task_members(self, identifier, members, archive):
+        """
+        Download only specified files of the verification task.
+
+        :param identifier: Verification task identifier.
+        :param members: List of names of archive members.
+        :param archive: Path to the zip archive to save.
+        """
+        self.logger.debug(f'Pull {len(members)} files of task {identifier}')
+        return self.session.get_archive("service/tasks/{}/download-members/".format(identifier), archive=archive,
+                                        data={"members": members})
+
     @_robust_request
     def submit_solution(self, identifier, description, archive):
         """
@@ -129,7 +176,7 @@ class Server:
 
         :param identifier: Verification task identifier.
         :param description: Path to the JSON file to send.
-        :param archive: Path to the zip archive to send.
+        :param archive: Path to the zip archive to send or a file object with it.
         """
         self.logger.debug(f'Submit the solution of task {identifier}')
         return self.session.push_archive("service/solution/",
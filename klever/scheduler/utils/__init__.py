@@ -21,9 +21,8 @@ import argparse
 import os
 import json
 import shutil
+import selectors
 import subprocess
-import queue
-import threading
 import time
 import signal
 import zipfile
@@ -31,56 +30,112 @@ import re
 import glob
 import multiprocessing
 import sys
-import consulate
+import tempfile
 from xml.etree import ElementTree
 
+from klever.scheduler.utils.consul import get_consul
+
 # This should prevent rumbling of urllib3
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 logging.getLogger("consulate").setLevel(logging.WARNING)
 
+# Files of solutions which Klever Core processes: BenchExec report, verifier log, witnesses and code coverage
+SOLUTION_FILES = (
+    os.path.join("output", "*.results.xml"),
+    os.path.join("output", "benchmark*logfiles", "*"),
+    os.path.join("output", "witness.*.graphml"),
+    os.path.join("output", "coverage.info")
+)
+# Klever Core can process solutions without these files, so they are not uploaded if they are too large
+TRUNCATABLE_SOLUTION_FILES = (
+    os.path.join("output", "witness.*.graphml"),
+    os.path.join("output", "coverage.info")
+)
+# Archives with solutions are written to disk only if they are larger than this number of bytes
+SOLUTION_ARCHIVE_MEMORY = 64 * 2 ** 20
+
 
-class StreamQueue:
+class OutputStream:
     """
-    Implements queue to work with output stream to catch stderr or stdout.
+    Implements reading of output stream to catch stderr or stdout without blocking.
     """
 
     def __init__(self, stream, stream_name, collect_all_output=False):
         self.stream = stream
         self.stream_name = stream_name
         self.collect_all_output = collect_all_output
-        self.queue = queue.Queue()
-        self.finished = False
-        self.traceback = None
-        self.thread = threading.Thread(target=self.__put_lines_from_stream_to_queue)
         self.output = []
+        # Lines that were not logged yet.
+        self.lines = []
+        self.__incomplete_line = b''
+
+    def read(self):
+        """
+        Read data available in the stream.
+
+        :return: False if the stream was closed and True otherwise.
+        """
+        data = os.read(self.stream.fileno(), 65536)
+        if not data:
+            if self.__incomplete_line:
+                self.__add_lines([self.__incomplete_line])
+                self.__incomplete_line = b''
+            return False
 
-    def get(self):
-        try:
-            return self.queue.get_nowait()
-        except queue.Empty:
-            return None
+        lines = (self.__incomplete_line + data).split(b'\n')
+        self.__incomplete_line = lines.pop()
+        self.__add_lines(lines)
+        return True
 
-    def join(self):
-        self.thread.join()
+    def pop_lines(self):
+        """
+        Get lines that were read since the previous call.
 
-    def start(self):
-        self.thread.start()
+        :return: List of lines.
+        """
+        lines = self.lines
+        self.lines = []
+        return lines
 
-    def __put_lines_from_stream_to_queue(self):
-        try:
-            # This will put lines from stream to queue until stream will be closed. For instance it will happen when
-            # execution of command will be completed.
-            for line in self.stream:
-                line = line.decode('utf8').rstrip()
-                self.queue.put(line)
-                if self.collect_all_output:
-                    self.output.append(line)
+    def __add_lines(self, lines):
+        lines = [line.decode('utf8').rstrip() for line in lines]
+        self.lines.extend(lines)
+        if self.collect_all_output:
+            self.output.extend(lines)
+
+
+def pump_output(streams, log, timeout=0):
+    """
+    Read given output streams until all of them are closed. This sleeps until some output appears.
+
+    :param streams: List of OutputStream objects.
+    :param log: Function that accepts the stream and the list of its new lines.
+    :param timeout: Minimal interval between passing new lines to log in seconds.
+    """
+    last_log_time = 0
+    with selectors.DefaultSelector() as selector:
+        for stream in streams:
+            selector.register(stream.stream, selectors.EVENT_READ, stream)
+
+        while selector.get_map():
+            if any(stream.lines for stream in streams):
+                wait = max(last_log_time + timeout - time.monotonic(), 0)
+            else:
+                wait = None
+
+            for key, _ in selector.select(wait):
+                if not key.data.read():
+                    selector.unregister(key.fileobj)
 
-            # Nothing will be put to queue from now.
-            self.finished = True
-        except Exception:
-            import traceback
-            self.traceback = traceback.format_exc().rstrip()
+            if time.monotonic() - last_log_time >= timeout:
+                for stream in streams:
+                    if stream.lines:
+                        log(stream, stream.pop_lines())
+                last_log_time = time.monotonic()
+
+    for stream in streams:
+        if stream.lines:
+            log(stream, stream.pop_lines())
 
 
 def common_initialization(tool, conf=None):
@@ -261,19 +316,20 @@ def dir_size(dir):
 
 
 def execute(args, env=None, cwd=None, timeout=0.5, logger=None, stderr=sys.stderr, stdout=sys.stdout,
-            disk_limitation=None, disk_checking_period=30):
+            disk_limitation=None, disk_checking_period=30, resources=None):
     """
     Execute given command in a separate process catching its stderr if necessary.
 
     :param args: Command erguments.
     :param env: Environment variables.
     :param cwd: Current working directory to run the command.
-    :param timeout: Timeout for the command.
+    :param timeout: Minimal interval between logging of the command output.
     :param logger: Logger object.
     :param stderr: Pipe or file descriptor to redirect output. Use it if logger is not provided.
     :param stderr: Pipe or file descriptor to redirect output. Use it if logger is not provided.
     :param disk_limitation: Allowed integer size of disk memory in Bytes of current working directory.
     :param disk_checking_period: Integer number of seconds for the disk space measuring interval.
+    :param resources: Dictionary to put wall time, CPU time (ms) and memory (B) consumed by the command to.
     :return: subprocess.Popen.returncode.
     """
     original_sigint_handler = signal.getsignal(signal.SIGINT)
@@ -346,38 +402,33 @@ def execute(args, env=None, cwd=None, timeout=0.5, logger=None, stderr=sys.stder
                                                   '' if len(args) == 1 else ' ',
                                                   ' '.join('"{0}"'.format(arg) for arg in args[1:])))
 
+        start_time = time.time()
         p = subprocess.Popen(args, env=env, stderr=subprocess.PIPE, cwd=cwd, preexec_fn=os.setsid)
         disk_checker = activate_disk_limitation(p.pid, disk_limitation)
 
-        err_q = StreamQueue(p.stderr, 'STDERR', True)
-        err_q.start()
-
-        # Print to logs everything that is printed to STDOUT and STDERR each timeout seconds. Last try is required to
-        # print last messages queued before command finishes.
-        last_try = True
-        while not err_q.finished or last_try:
-            if err_q.traceback:
-                raise RuntimeError(
-                    'STDERR reader thread failed with the following traceback:\n{0}'.format(err_q.traceback))
-            last_try = not err_q.finished
-            time.sleep(timeout)
-
-            output = []
-            while True:
-                line = err_q.get()
-                if line is None:
-                    break
-                output.append(line)
-            if output:
-                m = '"{0}" outputted to {1}:\n{2}'.format(cmd, err_q.stream_name, '\n'.join(output))
-                logger.warning(m)
-
-        err_q.join()
+        err_s = OutputStream(p.stderr, 'STDERR', True)
+
+        def log(stream, lines):
+            logger.warning('"{0}" outputted to {1}:\n{2}'.format(cmd, stream.stream_name, '\n'.join(lines)))
+
+        # Print to logs everything that is printed to STDERR at most each timeout seconds.
+        pump_output((err_s,), log, timeout)
+        p.stderr.close()
     else:
+        start_time = time.time()
         p = subprocess.Popen(args, env=env, cwd=cwd, preexec_fn=os.setsid, stderr=stderr, stdout=stdout)
         disk_checker = activate_disk_limitation(p.pid, disk_limitation)
 
-    p.wait()
+    # Get resources consumed by the command and its waited-for children.
+    _, status, rusage = os.wait4(p.pid, 0)
+    p.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    if resources is not None:
+        resources.update({
+            'wall_time': round(1000 * (time.time() - start_time)),
+            'cpu_time': round(1000 * (rusage.ru_utime + rusage.ru_stime)),
+            'memory': 1000 * rusage.ru_maxrss
+        })
+
     if disk_checker:
         disk_checker.terminate()
         disk_checker.join()
@@ -435,10 +486,11 @@ def process_task_results(logger):
     return decision_results
 
 
-def submit_task_results(logger, server, scheduler_type, identifier, decision_results, solution_path, speculative=False):
+def submit_task_results(logger, server, scheduler_type, identifier, decision_results, solution_path, speculative=False,
+                        max_file_size=None):
     """
-    Pack output directory prepared by BenchExec and prepare report archive with decision results and
-    upload it to the server.
+    Pack files of the solution that are necessary for Klever Core together with decision results directly to the archive
+    to upload and upload it to the server.
 
     :param logger: Logger object.
     :param server: server.AbstractServer object.
@@ -447,30 +499,43 @@ def submit_task_results(logger, server, scheduler_type, identifier, decision_res
     :param decision_results: Dictionary with decision results and measured resources.
     :param solution_path: Path to the directory with solution files.
     :param speculative: Do not upload solution to Bridge.
+    :param max_file_size: Witnesses and code coverage larger than this number of bytes are not uploaded but listed in
+                          decision results as truncated files. BenchExec reports and verifier logs are always uploaded.
     :return: None
     """
+    files = []
+    truncated = []
+    for pattern in SOLUTION_FILES:
+        for path in sorted(glob.glob(os.path.join(solution_path, pattern))):
+            if not os.path.isfile(path):
+                continue
+            arcname = os.path.relpath(path, solution_path)
+            if max_file_size is not None and pattern in TRUNCATABLE_SOLUTION_FILES and \
+                    os.path.getsize(path) > max_file_size:
+                logger.warning("Do not upload solution file {!r} of size {}B".format(arcname, os.path.getsize(path)))
+                truncated.append(arcname)
+            else:
+                files.append((path, arcname))
+    if truncated:
+        decision_results['truncated files'] = truncated
+
+    logger.debug("Pack decision results and {} files of the solution".format(len(files)))
+    # The archive with just necessary files is rather small, so it is likely to be kept in memory
+    results_archive = tempfile.SpooledTemporaryFile(max_size=SOLUTION_ARCHIVE_MEMORY)
+    with zipfile.ZipFile(results_archive, mode='w', compression=zipfile.ZIP_DEFLATED) as zfp:
+        zfp.writestr("decision results.json",
+                     json.dumps(decision_results, ensure_ascii=False, sort_keys=True, indent=4))
+        for path, arcname in files:
+            zfp.write(path, arcname)
 
-    results_file = os.path.join(solution_path, "decision results.json")
-    logger.debug("Save decision results to the disk: {}".format(os.path.abspath(results_file)))
-    with open(results_file, "w", encoding="utf8") as fp:
-        json.dump(decision_results, fp, ensure_ascii=False, sort_keys=True, indent=4)
-
-    results_archive = os.path.join(solution_path, 'decision result files.zip')
-    logger.debug("Save decision results and files to the archive: {}".format(os.path.abspath(results_archive)))
-    with open(results_archive, mode='w+b', buffering=0) as fp:
-        with zipfile.ZipFile(fp, mode='w', compression=zipfile.ZIP_DEFLATED) as zfp:
-            zfp.write(os.path.join(solution_path, "decision results.json"), "decision results.json")
-            for dirpath, dirnames, filenames in os.walk(os.path.join(solution_path, "output")):
-                for filename in filenames:
-                    zfp.write(os.path.join(dirpath, filename),
-                              os.path.join(os.path.relpath(dirpath, solution_path), filename))
-            os.fsync(zfp.fp)
-
-    if not speculative:
-        ret = server.submit_solution(identifier, decision_results, results_archive)
-    else:
-        ret = True
-        logger.info("Do not upload speculative solution")
+    try:
+        if not speculative:
+            ret = server.submit_solution(identifier, decision_results, results_archive)
+        else:
+            ret = True
+            logger.info("Do not upload speculative solution")
+    finally:
+        results_archive.close()
     kv_upload_solution(logger, identifier, scheduler_type, decision_results)
     return ret
 
@@ -596,7 +661,7 @@ def kv_upload_solution(logger, identifier, scheduler_type, dataset):
     :return: None
     """
     key = 'solutions/{}/{}'.format(scheduler_type, identifier)
-    session = consulate.Session()
+    session = get_consul()
     try:
         session.kv[key] = json.dumps(dataset)
         return
@@ -614,7 +679,7 @@ def kv_get_solution(logger, scheduler_type, identifier):
     :return: None
     """
     key = 'solutions/{}/{}'.format(scheduler_type, identifier)
-    session = consulate.Session()
+    session = get_consul()
     try:
         return json.loads(session.kv[key])
     except (AttributeError, KeyError) as err:
@@ -631,7 +696,7 @@ def kv_clear_solutions(logger, scheduler_type, identifier=None):
     :return: None
     """
     try:
-        session = consulate.Session()
+        session = get_consul()
         if isinstance(identifier, str):
             session.kv.delete('solutions/{}/{}'.format(scheduler_type, identifier), recurse=True)
         else:
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import os
 import requests
 import time
 import zipfile
@@ -104,20 +105,23 @@ class Session:
                     self.logger.warning('Aborting request to Bridge')
                     return None
 
-    def get_archive(self, endpoint, archive=None):
+    def get_archive(self, endpoint, archive=None, data=None):
         """
         Download ZIP archive from server.
 
         :param endpoint: URL endpoint.
-        :param data: Data to push in case of POST request.
         :param archive: Path to save the archive.
+        :param data: Data to push as JSON in case of POST request.
         :return: True
         """
         ret = True
         while True:
             resp = None
             try:
-                resp = self.__request(endpoint, 'GET', stream=True)
+                if data is None:
+                    resp = self.__request(endpoint, 'GET', stream=True)
+                else:
+                    resp = self.__request(endpoint, 'POST', json=data, stream=True)
 
                 self.logger.debug('Write archive to {}'.format(archive))
                 with open(archive, 'wb') as fp:
@@ -142,16 +146,23 @@ class Session:
 
         :param endpoint: URL endpoint.
         :param data: Data to push in case of POST request.
-        :param archive: Path to save the archive.
+        :param archive: Path to the archive or a file object with it.
         :return: None.
         """
         ret = True
 
         while True:
             resp = None
+            if isinstance(archive, str):
+                fp = open(archive, 'rb', buffering=0)
+                name = os.path.basename(archive)
+            else:
+                # Upload the archive from the beginning at each attempt
+                fp = archive
+                fp.seek(0)
+                name = 'decision result files.zip'
             try:
-                resp = self.__request(endpoint, 'POST', data=data, files={'archive': open(archive, 'rb', buffering=0)},
-                                      stream=True)
+                resp = self.__request(endpoint, 'POST', data=data, files={'archive': (name, fp)}, stream=True)
                 break
             except BridgeError:
                 if 'ZIP error' in self.error:
@@ -163,6 +174,8 @@ class Session:
             finally:
                 if resp:
                     resp.close()
+                if fp is not archive:
+                    fp.close()
 
         return ret
 
@@ -0,0 +1,217 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+import os
+import threading
+
+import consulate
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Consul does not accept transactions with more operations
+TXN_MAX_OPERATIONS = 64
+
+
+class RetryingRequest(consulate.adapters.Request):
+    """
+    Request adapter for consulate that retries failed requests with an exponential backoff. The underlying session keeps
+    connections alive, so it is worth sharing the adapter.
+    """
+
+    def __init__(self, timeout=30, retries=5, backoff_factor=0.5):
+        super().__init__(timeout)
+        adapter = HTTPAdapter(max_retries=Retry(total=retries, backoff_factor=backoff_factor,
+                                                status_forcelist=(500, 502, 503, 504), raise_on_status=False))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+class ConsulClient:
+    """Client for the consul KV storage that can perform several operations by a single transaction."""
+
+    def __init__(self, host='localhost', port=8500):
+        """
+        Create the client. Use get_consul() to share it within the process.
+
+        :param host: Consul host.
+        :param port: Consul port.
+        """
+        self.__adapter = RetryingRequest()
+        self.kv = consulate.Consul(host=host, port=port, adapter=lambda: self.__adapter).kv
+        self.__txn_url = 'http://{}:{}/v1/txn'.format(host, port)
+
+    def txn(self, operations):
+        """
+        Perform KV operations by transactions. Consul limits the number of operations in a transaction, so there are
+        several transactions for many operations.
+
+        :param operations: List of dictionaries like {"Verb": "set", "Key": "key", "Value": "string"}.
+        :raise KeyError: If a transaction fails, e.g. due to a missing key.
+        :return: List of dictionaries describing keys returned by operations. Values are decoded to strings.
+        """
+        results = []
+        for start in range(0, len(operations), TXN_MAX_OPERATIONS):
+            payload = []
+            for operation in operations[start:start + TXN_MAX_OPERATIONS]:
+                operation = dict(operation)
+                if operation.get("Value") is not None:
+                    operation["Value"] = base64.b64encode(operation["Value"].encode('utf-8')).decode('ascii')
+                payload.append({"KV": operation})
+
+            response = self.__adapter.session.put(self.__txn_url, json=payload, timeout=self.__adapter.timeout)
+            if not response.ok:
+                raise KeyError("Transaction failed with status code {}: {}".format(response.status_code, response.text))
+
+            for result in response.json().get("Results") or []:
+                item = result["KV"]
+                if item.get("Value") is not None:
+                    item["Value"] = base64.b64decode(item["Value"]).decode('utf-8')
+                results.append(item)
+
+        return results
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_consul():
+    """
+    Get the consul client shared by all threads of the current process. Child processes get their own clients since
+    they cannot share connections.
+
+    :return: ConsulClient object.
+    """
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = ConsulClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+class KVWatcher:
+    """
+    Watch nodes registered at the controller and their states saved in its KV storage. Blocking queries are used, so
+    consul answers only when the watched data changes or the waiting time elapses. Thus, there are no requests while
+    nothing changes and the scheduler just checks whether there are any changes instead of reading the storage.
+    """
+
+    # Paths of watched data and names of the corresponding attributes
+    watched = (("/v1/catalog/nodes", "nodes"), ("/v1/kv/states/?recurse", "states"))
+
+    def __init__(self, logger, address, wait=300, retry_interval=10):
+        """
+        Prepare the watcher.
+
+        :param logger: Logger object.
+        :param address: Controller address.
+        :param wait: Maximum time in seconds during which consul can block a request.
+        :param retry_interval: Time in seconds between attempts to repeat a failed request.
+        """
+        self.logger = logger
+        self.address = address
+        self.wait = wait
+        self.retry_interval = retry_interval
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__threads = []
+        self.__data = {}
+        self.__errors = {}
+        self.__changed = False
+
+    def start(self):
+        """Start a thread for each watched endpoint."""
+        for path, name in self.watched:
+            thread = threading.Thread(target=self.__watch, args=(path, name), daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def stop(self):
+        """Stop watching. Threads can still wait for answers to blocking requests, so do not join them."""
+        self.__stopped.set()
+
+    def get_changes(self):
+        """
+        Get nodes and their states if they have changed since the previous call.
+
+        :raise ValueError: If the last request to the controller failed.
+        :return: None if nothing has changed and ([node names], {node name: state string}) otherwise.
+        """
+        with self.__lock:
+            if self.__errors:
+                raise ValueError("Cannot get information about connected nodes from {}: {}".
+                                 format(self.address, "; ".join(self.__errors.values())))
+            elif not self.__changed or len(self.__data) < len(self.watched):
+                return None
+
+            self.__changed = False
+            return list(self.__data["nodes"]), dict(self.__data["states"])
+
+    def reset(self):
+        """Report that the last changes were not processed, so get_changes() should return them once again."""
+        with self.__lock:
+            self.__changed = True
+
+    def __watch(self, path, name):
+        session = requests.Session()
+        url = self.address + path
+        index = None
+        while not self.__stopped.is_set():
+            params = {"wait": "{}s".format(self.wait)}
+            if index is not None:
+                params["index"] = index
+
+            try:
+                # Consul adds up to wait/16 to the waiting time to spread answers to many blocking requests
+                response = session.get(url, params=params, timeout=self.wait + self.wait / 16 + 10)
+                # There is no states at all until some controller saves them
+                if not response.ok and not (name == "states" and response.status_code == 404):
+                    raise ValueError("got status code {} due to: {}".format(response.status_code, response.reason))
+                data = self.__parse(name, response.json() if response.ok else [])
+                new_index = int(response.headers["X-Consul-Index"])
+            except (requests.exceptions.RequestException, ValueError, KeyError) as err:
+                with self.__lock:
+                    self.__errors[name] = "{!r} request failed: {}".format(url, err)
+                self.__stopped.wait(self.retry_interval)
+                index = None
+                continue
+
+            with self.__lock:
+                # Consul can answer before the index advances, e.g. when waiting time elapses
+                if index is None or new_index != index or name in self.__errors:
+                    self.__data[name] = data
+                    self.__changed = True
+                self.__errors.pop(name, None)
+
+            # Indexes can go backwards after consul restarts, so start from the beginning then
+            index = new_index if index is None or new_index >= index else None
+
+    @staticmethod
+    def __parse(name, data):
+        if name == "nodes":
+            return [node["Node"] for node in data]
+
+        states = {}
+        for item in data:
+            if item["Value"] is not None:
+                states[item["Key"][len("states/"):]] = base64.b64decode(item["Value"]).decode("utf-8")
+        return states
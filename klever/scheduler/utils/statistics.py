@@ -0,0 +1,133 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import collections
+import math
+import os
+import sqlite3
+
+from sortedcontainers import SortedList
+
+
+def quantile(values, q):
+    """
+    Get the quantile of values by the nearest-rank method.
+
+    :param values: Sorted sequence of numbers.
+    :param q: Quantile between 0 and 1.
+    :return: Number.
+    """
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+class ResourceStatistics:
+    """
+    Resources consumed by solved verification tasks. They are kept in a sqlite database, so the next jobs checking the
+    same requirements and program fragments start with statistics of the previous ones. For each requirement there are
+    several last solutions to estimate quantiles and for each program fragment and requirement there is the last one.
+    """
+
+    def __init__(self, path=None, history=1000):
+        """
+        Open the database.
+
+        :param path: Path to the database file. Statistics are kept just in memory if it is not set.
+        :param history: Number of last solutions kept for each requirement.
+        """
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.history = history
+        self.__connection = sqlite3.connect(path or ':memory:')
+        with self.__connection:
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                                      'requirement TEXT NOT NULL, memory INTEGER NOT NULL, cpu_time INTEGER NOT NULL)')
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS solutions_requirement ON solutions (requirement)')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS fragments ('
+                                      'requirement TEXT NOT NULL, fragment TEXT NOT NULL, memory INTEGER NOT NULL, '
+                                      'cpu_time INTEGER NOT NULL, PRIMARY KEY (requirement, fragment))')
+        # Sorted memory consumption of last solutions for requirements
+        self.__memory = {}
+        self.__solutions = {}
+
+    def add(self, requirement, fragment, memory, cpu_time):
+        """
+        Save resources consumed by the solution of a verification task.
+
+        :param requirement: Requirement identifier.
+        :param fragment: Program fragment identifier or None if it is unknown.
+        :param memory: Memory size in bytes.
+        :param cpu_time: CPU time in milliseconds.
+        """
+        solutions = self.__get_solutions(requirement)
+        if len(solutions) == solutions.maxlen:
+            self.__memory[requirement].remove(solutions[0])
+        solutions.append(memory)
+        self.__memory[requirement].add(memory)
+
+        with self.__connection:
+            self.__connection.execute('INSERT INTO solutions VALUES (?, ?, ?)', (requirement, memory, cpu_time))
+            self.__connection.execute('DELETE FROM solutions WHERE requirement = ? AND rowid NOT IN '
+                                      '(SELECT rowid FROM solutions WHERE requirement = ? ORDER BY rowid DESC LIMIT ?)',
+                                      (requirement, requirement, self.history))
+            if fragment:
+                self.__connection.execute('INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?)',
+                                          (requirement, fragment, memory, cpu_time))
+
+    def number(self, requirement):
+        """
+        Get the number of known solutions for the requirement.
+
+        :param requirement: Requirement identifier.
+        :return: Integer.
+        """
+        return len(self.__get_solutions(requirement))
+
+    def memory_quantile(self, requirement, q):
+        """
+        Get the quantile of memory consumption by solutions for the requirement.
+
+        :param requirement: Requirement identifier.
+        :param q: Quantile between 0 and 1.
+        :return: Memory size in bytes or None if there are no solutions.
+        """
+        self.__get_solutions(requirement)
+        memory = self.__memory[requirement]
+        return quantile(memory, q) if memory else None
+
+    def fragment_memory(self, requirement, fragment):
+        """
+        Get the memory consumed by the last solution for the program fragment and requirement.
+
+        :param requirement: Requirement identifier.
+        :param fragment: Program fragment identifier.
+        :return: Memory size in bytes or None if the program fragment was not checked against the requirement.
+        """
+        row = self.__connection.execute('SELECT memory FROM fragments WHERE requirement = ? AND fragment = ?',
+                                        (requirement, fragment)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """Close the database."""
+        self.__connection.close()
+
+    def __get_solutions(self, requirement):
+        if requirement not in self.__solutions:
+            rows = self.__connection.execute('SELECT memory FROM solutions WHERE requirement = ? ORDER BY rowid',
+                                             (requirement,)).fetchall()
+            self.__solutions[requirement] = collections.deque((row[0] for row in rows), maxlen=self.history)
+            self.__memory[requirement] = SortedList(self.__solutions[requirement])
+        return self.__solutions[requirement]
@@ -0,0 +1,149 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import concurrent.futures
+import os
+import selectors
+import subprocess
+import threading
+
+
+class SupervisedProcess:
+    """
+    Command started directly by the supervisor. It provides the same attributes and methods as multiprocessing.Process
+    which schedulers use.
+    """
+
+    def __init__(self, name, args):
+        """
+        Prepare the process.
+
+        :param name: Process name.
+        :param args: Command arguments.
+        """
+        self.name = name
+        self.args = args
+        self.pid = None
+        self.exitcode = None
+        self.popen = None
+        self.__finished = threading.Event()
+
+    def start(self):
+        # Start a new session like utils.execute() does to terminate the command together with its children
+        self.popen = subprocess.Popen(self.args, start_new_session=True)
+        self.pid = self.popen.pid
+
+    def is_alive(self):
+        return self.pid is not None and not self.__finished.is_set()
+
+    def join(self, timeout=None):
+        self.__finished.wait(timeout)
+
+    def finish(self, exitcode):
+        self.exitcode = exitcode
+        self.__finished.set()
+
+
+class Supervisor:
+    """
+    Start commands as direct children of the current process and wait for their termination in a single thread. Each
+    process is waited by means of its pidfd when Python and the kernel support it or polled periodically otherwise.
+    """
+
+    def __init__(self, poll_interval=0.1):
+        """
+        Start the thread waiting for processes.
+
+        :param poll_interval: Time in seconds between checks of processes when pidfd is not supported.
+        """
+        self.poll_interval = poll_interval
+        self.__lock = threading.Lock()
+        self.__processes = {}
+        self.__stopped = False
+        self.__selector = selectors.DefaultSelector()
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        self.__selector.register(self.__wakeup_read, selectors.EVENT_READ)
+        self.__pidfds = hasattr(os, 'pidfd_open')
+        self.__thread = threading.Thread(target=self.__wait, daemon=True)
+        self.__thread.start()
+
+    def submit(self, process):
+        """
+        Start the process and get a future object which gets its exit code as a string when it terminates.
+
+        :param process: SupervisedProcess object.
+        :return: concurrent.futures.Future object.
+        """
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        try:
+            process.start()
+        except OSError as err:
+            process.finish(None)
+            future.set_exception(err)
+            return future
+
+        with self.__lock:
+            pidfd = None
+            if self.__pidfds:
+                try:
+                    pidfd = os.pidfd_open(process.pid)
+                except OSError:
+                    # The kernel does not support pidfd
+                    self.__pidfds = False
+                else:
+                    self.__selector.register(pidfd, selectors.EVENT_READ)
+            self.__processes[process.pid] = (process, future, pidfd)
+        os.write(self.__wakeup_write, b'\0')
+
+        return future
+
+    def stop(self):
+        """Stop waiting for processes. Futures of running processes never get results."""
+        with self.__lock:
+            self.__stopped = True
+        os.write(self.__wakeup_write, b'\0')
+        self.__thread.join()
+        self.__selector.close()
+        os.close(self.__wakeup_read)
+        os.close(self.__wakeup_write)
+
+    def __wait(self):
+        while True:
+            with self.__lock:
+                timeout = None if self.__pidfds or not self.__processes else self.poll_interval
+
+            for key, _ in self.__selector.select(timeout):
+                if key.fd == self.__wakeup_read:
+                    os.read(self.__wakeup_read, 1024)
+
+            with self.__lock:
+                if self.__stopped:
+                    for _, _, pidfd in self.__processes.values():
+                        if pidfd is not None:
+                            os.close(pidfd)
+                    return
+
+                # There are not many processes, so it is cheaper to check them all than to map ready pidfds to them
+                finished = [pid for pid, (process, _, _) in self.__processes.items() if process.popen.poll() is not None]
+                for pid in finished:
+                    process, future, pidfd = self.__processes.pop(pid)
+                    if pidfd is not None:
+                        self.__selector.unregister(pidfd)
+                        os.close(pidfd)
+                    process.finish(process.popen.returncode)
+                    future.set_result(str(process.popen.returncode))
@@ -0,0 +1,172 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from klever.scheduler.utils.consul import KVWatcher, ConsulClient, TXN_MAX_OPERATIONS
+
+
+class FakeConsul(ThreadingMixIn, HTTPServer):
+    """Answer blocking queries to the catalog of nodes and node states like consul does."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeConsulHandler)
+        self.condition = threading.Condition()
+        self.requests = []
+        self.connections = set()
+        self.transactions = 0
+        self.indexes = {'nodes': 1, 'states': 1}
+        self.nodes = []
+        self.states = {}
+
+    @property
+    def address(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def set_state(self, node, state):
+        with self.condition:
+            if node not in self.nodes:
+                self.nodes.append(node)
+                self.indexes['nodes'] += 1
+            self.states[node] = json.dumps(state)
+            self.indexes['states'] += 1
+            self.condition.notify_all()
+
+
+class FakeConsulHandler(BaseHTTPRequestHandler):
+    # Keep connections alive
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        operations = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        assert self.path == '/v1/txn' and len(operations) <= TXN_MAX_OPERATIONS
+
+        results = []
+        with server.condition:
+            server.transactions += 1
+            for operation in (operation['KV'] for operation in operations):
+                node = operation['Key'][len('states/'):]
+                if operation['Verb'] == 'set':
+                    server.states[node] = base64.b64decode(operation['Value']).decode('utf-8')
+                elif operation['Verb'] == 'get':
+                    results.append({'KV': {'Key': operation['Key'], 'Value': base64.b64encode(
+                        server.states[node].encode('utf-8')).decode('utf-8')}})
+        self.send_json({'Results': results, 'Errors': None}, server.indexes['states'])
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+        name = 'nodes' if url.path == '/v1/catalog/nodes' else 'states'
+        server = self.server
+        server.requests.append((name, query.get('index', [''])[0]))
+
+        with server.condition:
+            if 'index' in query:
+                server.condition.wait_for(lambda: server.indexes[name] > int(query['index'][0]),
+                                          timeout=int(query['wait'][0].rstrip('s')))
+            if name == 'nodes':
+                data = [{'Node': node} for node in server.nodes]
+            else:
+                data = [{'Key': 'states/' + node, 'Value': base64.b64encode(state.encode('utf-8')).decode('utf-8')}
+                        for node, state in server.states.items()]
+            index = server.indexes[name]
+
+        self.send_json(data, index)
+
+    def send_json(self, data, index):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Consul-Index', str(index))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def wait_changes(watcher, timeout=5):
+    start = time.time()
+    while time.time() - start < timeout:
+        changes = watcher.get_changes()
+        if changes:
+            return changes
+        time.sleep(0.05)
+    return None
+
+
+def test_kv_watcher():
+    server = FakeConsul()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.set_state('node1', {'available CPU number': 4})
+    watcher = KVWatcher(logging.getLogger('test'), server.address, wait=30)
+    try:
+        watcher.start()
+        nodes, states = wait_changes(watcher)
+        assert nodes == ['node1']
+        assert json.loads(states['node1']) == {'available CPU number': 4}
+
+        # Watcher waits for answers to blocking queries and does not make any other requests while nothing changes
+        time.sleep(1)
+        assert watcher.get_changes() is None
+        assert sorted(server.requests) == [('nodes', ''), ('nodes', '2'), ('states', ''), ('states', '2')]
+
+        server.set_state('node1', {'available CPU number': 2})
+        nodes, states = wait_changes(watcher)
+        assert json.loads(states['node1']) == {'available CPU number': 2}
+        time.sleep(0.5)
+        assert sorted(server.requests) == [('nodes', ''), ('nodes', '2'), ('states', ''), ('states', '2'),
+                                           ('states', '3')]
+
+        # Not processed changes are returned once again
+        watcher.reset()
+        assert watcher.get_changes() == (nodes, states)
+        assert watcher.get_changes() is None
+    finally:
+        watcher.stop()
+        server.shutdown()
+        server.server_close()
+
+
+def test_consul_client():
+    server = FakeConsul()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ConsulClient(*server.server_address)
+    try:
+        nodes = ['node{}'.format(i) for i in range(TXN_MAX_OPERATIONS + 10)]
+        assert client.txn([{'Verb': 'set', 'Key': 'states/' + node, 'Value': node} for node in nodes]) == []
+        states = client.txn([{'Verb': 'get', 'Key': 'states/' + node} for node in nodes])
+        assert [(item['Key'], item['Value']) for item in states] == [('states/' + node, node) for node in nodes]
+
+        # Consul limits the number of operations in a transaction, and all of them use the same connection
+        assert server.transactions == 4
+        assert len(server.connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
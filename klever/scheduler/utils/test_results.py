@@ -0,0 +1,70 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import logging
+import os
+import zipfile
+
+import klever.scheduler.utils as utils
+
+
+class FakeServer:
+
+    def __init__(self):
+        self.solutions = {}
+
+    def submit_solution(self, identifier, description, archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as zfp:
+            self.solutions[identifier] = (description, {name: zfp.read(name) for name in zfp.namelist()})
+        return True
+
+
+def test_submit_task_results(tmpdir, monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(utils, 'kv_upload_solution', lambda *args: uploaded.append(args[1]))
+    files = {
+        'output/benchmark.2020-01-01.results.xml': b'<result>' + b' ' * 1000 + b'</result>',
+        'output/benchmark.2020-01-01.logfiles/cil.i.log': b'l' * 1000,
+        'output/witness.1.graphml': b'witness',
+        'output/witness.2.graphml': b'w' * 1000,
+        'output/coverage.info': b'coverage',
+        'output/cil.i': b'int main(void) { return 0; }',
+        'benchmark.xml': b'<benchmark/>'
+    }
+    for name, content in files.items():
+        os.makedirs(os.path.dirname(str(tmpdir / name)), exist_ok=True)
+        with open(str(tmpdir / name), 'wb') as fp:
+            fp.write(content)
+
+    server = FakeServer()
+    decision_results = {'status': 'false'}
+    assert utils.submit_task_results(logging.getLogger('test'), server, 'Klever', '1', decision_results, str(tmpdir),
+                                     max_file_size=100)
+    utils.submit_task_results(logging.getLogger('test'), server, 'Klever', '2', {}, str(tmpdir), speculative=True)
+
+    # Only files necessary for Klever Core are uploaded, and large witnesses are skipped unlike reports and logs
+    description, archive = server.solutions['1']
+    assert description['truncated files'] == ['output/witness.2.graphml']
+    assert json.loads(archive.pop('decision results.json')) == description
+    assert archive == {name: content for name, content in files.items()
+                       if name.endswith(('.xml', '.log', '.1.graphml', '.info')) and name != 'benchmark.xml'}
+    assert not os.path.exists(str(tmpdir / 'decision result files.zip'))
+
+    assert list(server.solutions) == ['1']
+    assert uploaded == ['1', '2']
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2020 ISP RAS (http://www.ispras.ru)
+# Ivannikov Institute for System Programming of the Russian Academy of Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from klever.scheduler.schedulers.native import Native
+from klever.scheduler.utils.supervisor import Supervisor, SupervisedProcess
+
+
+def dummy_client(exit_code=0):
+    # This looks like a verifier that solves a task immediately
+    return ['sh', '-c', 'exit {}'.format(exit_code)]
+
+
+def test_supervisor():
+    manager = Supervisor()
+    try:
+        futures = [manager.submit(SupervisedProcess(str(i), dummy_client(i % 3))) for i in range(10)]
+        assert [future.result(timeout=30) for future in futures] == [str(i % 3) for i in range(10)]
+
+        process = SupervisedProcess('sleep', [sys.executable, '-c', 'import time; time.sleep(60)'])
+        future = manager.submit(process)
+        assert process.is_alive()
+        os.kill(process.pid, signal.SIGTERM)
+        process.join()
+        assert not process.is_alive()
+        assert future.result(timeout=30) == str(-signal.SIGTERM)
+
+        process = SupervisedProcess('missing', ['/nonexistent/client'])
+        assert isinstance(manager.submit(process).exception(timeout=30), OSError)
+    finally:
+        manager.stop()
+
+
+def test_supervisor_benchmark(tmpdir, monkeypatch):
+    # Clients of tasks are started like Native does it by default and directly
+    monkeypatch.chdir(tmpdir)
+    tasks_num = 100
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(Native._execute, 'info.log', multiprocessing.Process(
+            None, Native._process_starter, str(i), [None, dummy_client()])) for i in range(tasks_num)]
+        assert all(future.result() == '0' for future in futures)
+    reference_time = time.time() - start
+
+    start = time.time()
+    manager = Supervisor()
+    try:
+        futures = [manager.submit(SupervisedProcess(str(i), dummy_client())) for i in range(tasks_num)]
+        assert all(future.result(timeout=60) == '0' for future in futures)
+    finally:
+        manager.stop()
+    new_time = time.time() - start
+
+    logging.getLogger('test').info('Running of {} dummy clients takes {:.2f}s instead of {:.2f}s'
+                                   .format(tasks_num, new_time, reference_time))